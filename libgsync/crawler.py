@@ -42,6 +42,7 @@ class Crawler(object):
         self._src = None
         self._dst = None
         self._sync = None
+        self._batch = None
         
         force_dest_file = GsyncOptions.force_dest_file
 
@@ -126,6 +127,45 @@ class Crawler(object):
         return True
 
 
+    def _prefetch(self, dirpath):
+        """
+        Starts listing the remote folder that the local directory provided
+        is synchronised to, so that the files in the directory are looked up
+        in the listing, rather than one request at a time.  Listings of the
+        subdirectories are started before the files of their parent are
+        synchronised, so that they are fetched while the files are compared.
+
+        @param {String} dirpath   Local directory being walked.
+        """
+        if self._drive.is_drivepath(self._src) or \
+            not self._drive.is_drivepath(self._dst) or \
+            GsyncOptions.force_dest_file:
+            return
+
+        dst_path = self._sync.dst + self._sync.src.relative_to(dirpath)
+
+        try:
+            self._drive.prefetch(dst_path)
+        except Exception, ex:
+            debug("Prefetch failed: %s" % repr(ex))
+
+
+    def _flush_batch(self):
+        """
+        Sends the operations batched while synchronising a directory, so
+        that any that failed are reported against their paths before the
+        next directory is synchronised, rather than once the walk is done.
+        """
+        if self._batch is None:
+            return
+
+        self._batch.flush()
+
+        failures, self._batch.failures = self._batch.failures, []
+        for path, ex in failures:
+            print("Error: %s: %s" % (path, str(ex)))
+
+
     def _walk(self, path, generator, device_id):
         """
         Walks the path provided, calling the generator function on the path,
@@ -137,13 +177,15 @@ class Crawler(object):
         @param {int} device_id        Device ID for the path, None if device
                                       cannot be determined.
         """
-        for dirpath, _, files in generator(path):
+        for dirpath, dirs, files in generator(path):
             debug("Walking: %s" % repr(dirpath))
 
             if not self._dev_check(device_id, dirpath):
                 debug("Not on same device: %s" % repr(dirpath))
                 continue
 
+            self._prefetch(dirpath)
+
             if not GsyncOptions.force_dest_file:
                 if GsyncOptions.dirs or GsyncOptions.recursive:
 
@@ -154,6 +196,10 @@ class Crawler(object):
                     sys.stdout.write("skipping directory %s\n" % dirpath)
                     break
 
+            if GsyncOptions.recursive:
+                for dirname in dirs:
+                    self._prefetch(os.path.join(dirpath, dirname))
+
             for filename in files:
                 absfile = os.path.join(dirpath, filename)
                 if not self._dev_check(device_id, absfile):
@@ -162,6 +208,8 @@ class Crawler(object):
                 debug("Synchronising file: %s" % repr(absfile))
                 self._sync(absfile)
 
+            self._flush_batch()
+
             if not GsyncOptions.recursive:
                 break
 
@@ -190,7 +238,12 @@ class Crawler(object):
         debug("Enumerating: %s" % repr(srcpath))
 
         try:
-            self._walk(srcpath, self._walk_callback, self._dev)
+            with self._drive.batch() as batch:
+                self._batch = batch
+                try:
+                    self._walk(srcpath, self._walk_callback, self._dev)
+                finally:
+                    self._batch = None
 
         except KeyboardInterrupt, ex:
             print("\nInterrupted")
@@ -207,3 +260,23 @@ class Crawler(object):
                 self._sync.rate()
             ))
 
+            limiter = self._drive.rate_limit_stats()
+            if limiter is not None:
+                verbose("throttled %d of %d requests for %.2f seconds" % (
+                    limiter.throttles, limiter.requests, limiter.throttled
+                ))
+
+            if GsyncOptions.stats:
+                self._print_stats()
+
+    def _print_stats(self):
+        """Prints the stats of the requests made to the Drive"""
+        stats = self._drive.transport_stats()
+        if stats is None:
+            return
+
+        print("Drive requests: %d" % stats.requests)
+        print("Drive connections opened: %d" % stats.connections)
+        print("Drive requests on reused connections: %d" % stats.reused)
+        print("Drive connection waits: %d" % stats.waits)
+
@@ -5,16 +5,11 @@
 
 """The GSync Drive module that provides an interface to the Google Drive"""
 
-import os, sys, re, datetime, shelve, time, retrying
+import os, sys, re, datetime, time, atexit, threading
 
 from dateutil.tz import tzutc
 from contextlib import contextmanager
-
-# Setup default retryer.
-retryer = retrying.retry( # pylint: disable-msg=C0103
-    wait='fixed_sleep', wait_fixed=60000,
-    stop='stop_after_attempt', stop_max_attempt_number=2
-)
+from collections import deque
 
 try:
     import simplejson as json
@@ -27,9 +22,23 @@ oauth2client.util.positional_parameters_enforcement = \
 
 from oauth2client.client import OAuth2Credentials
 from apiclient.http import MediaUploadProgress
+from apiclient.errors import HttpError
 from libgsync.output import verbose, debug
 from libgsync.drive.mimetypes import MimeTypes
-from libgsync.drive.file import DriveFile
+from libgsync.drive.file import DriveFile, FILE_FIELDS
+from libgsync.drive.cache import DriveCacheStore
+from libgsync.drive.query import DriveCacheQuery
+from libgsync.drive.pathcache import DrivePathCache
+from libgsync.drive.changes import DriveChangeFeed
+from libgsync.drive.index import DriveFolderIndex, ROOT_ID, parent_ids
+from libgsync.drive.listing import DriveListingCache
+from libgsync.drive.batch import DriveBatch, DriveBatchError
+from libgsync.drive.pool import DriveWorkerPool, DriveLookahead, spawn
+from libgsync.drive.transport import DriveTransportPool, DriveHttp
+from libgsync.drive.retry import DriveRetryPolicy
+from libgsync.drive.ratelimit import DriveRateLimiter
+from libgsync.drive.chunks import DriveChunkSizer, DriveSizedUpload
+from libgsync.drive.sessions import DriveUploadSessions
 
 if debug.enabled(): # pragma: no cover
     import logging
@@ -124,9 +133,9 @@ class DriveFileObject(object):
         Obtains a list of file revisions for the file object.
         """
         with Drive().service() as service:
-            revisions = service.revisions().list(
+            revisions = Drive().execute(service.revisions().list(
                 fileId=self._info.id
-            ).execute()
+            ))
 
             return revisions.get('items', [])
 
@@ -195,9 +204,10 @@ class DriveFileObject(object):
             if length <= 0:
                 return ""
 
-            url = service.files().get(
-                fileId=self._info.id
-            ).execute().get('downloadUrl')
+            url = Drive().execute(service.files().get(
+                fileId=self._info.id,
+                fields='downloadUrl'
+            )).get('downloadUrl')
 
             if not url:
                 return ""
@@ -209,18 +219,25 @@ class DriveFileObject(object):
                 )
             }
 
-            res, data = http.request(url, headers=headers)
-            retry = res.status in [ 301, 302, 303, 307, 308 ] \
-                and 'location' in res
-
-            if retry: # pragma: no cover
-                url = res['location']
+            # The download is paced and retried like any other request,
+            # so failed responses are raised for the retry policy to see.
+            def __download():
                 res, data = http.request(url, headers=headers)
+                redirect = res.status in [ 301, 302, 303, 307, 308 ] \
+                    and 'location' in res
+
+                if redirect: # pragma: no cover
+                    res, data = http.request(res['location'], headers=headers)
+
+                if res.status not in [ 200, 206 ]:
+                    raise HttpError(res, data, uri=url)
 
-            if res.status in [ 200, 206 ]:
-                self._offset += length
                 return data
 
+            data = Drive().call(__download)
+            self._offset += length
+            return data
+
         return "" # pragma: no cover
 
     def write(self, data):
@@ -234,43 +251,32 @@ class DriveFileObject(object):
         self._required_modes([ "w", "a" ])
 
 
-class DrivePathCache(object):
-    """
-    Defines the Google Drive path caching class.
-    """
-    def __init__(self, data=None):
-        self.__data = {}
-
-        if data is not None:
-            for key, val in data.iteritems():
-                path = Drive().normpath(key)
-                if path is None or not isinstance(val, dict):
-                    continue
+class Drive(object):
+    """Defines the singleton Google Drive API interface class."""
 
-                self.__data[path] = val
+    # Seconds for which the cached API discovery document is used.
+    DISCOVERY_TTL = 86400
 
-    def put(self, path, data):
-        """Places an item in the path cache"""
-        path = Drive().normpath(path)
-        self.__data[path] = data
+    # Folders with more entities than this are not listed just to find one
+    # of them.
+    LARGE_FOLDER_SIZE = 1000
 
-    def get(self, path):
-        """Retrieves an item from the path cache"""
-        path = Drive().normpath(path)
-        return self.__data.get(path)
+    # Bytes of memory that the path cache and folder listings may hold,
+    # shared equally between them.
+    CACHE_MEMORY = 128 * 1024 * 1024
 
-    def clear(self, path):
-        """Removes an item from the path cache"""
-        path = Drive().normpath(path)
-        if self.__data.has_key(path):
-            del self.__data[path]
+    # Number of folders listed at once while walking the Drive.
+    LIST_WORKERS = 4
 
-    def __repr__(self):
-        return "DrivePathCache(%s)" % repr(self.__data)
+    # Listings fetched ahead of a walk, per list worker, before they are
+    # needed.  Bounds the listings held by a walk outside of the caches.
+    LIST_AHEAD = 2
 
+    # Limits on the persistent connections kept to the Drive, being their
+    # number and the seconds for which one may be idle and still be reused.
+    MAX_CONNECTIONS = 8
+    MAX_IDLE = 60
 
-class Drive(object):
-    """Defines the singleton Google Drive API interface class."""
     def __new__(cls, *args):
         if not hasattr(cls, "_instance"):
             cls._instance = object.__new__(cls, *args)
@@ -278,13 +284,35 @@ class Drive(object):
         return cls._instance
 
     def __init__(self):
+        # Every call to Drive() re-enters the constructor of the singleton,
+        # so only initialise once to preserve the service and the caches.
+        if hasattr(self, "_pcache"):
+            return
+
         debug("Initialising drive")
 
-        self._service = None
-        self._http = None
+        self._service_lock = threading.Lock()
+        self._transport = None
+        self._max_connections = self.MAX_CONNECTIONS
+        self._max_idle = self.MAX_IDLE
+        self._discovery = None
+        self._retry = DriveRetryPolicy()
+        self._limiter = None
+        self._chunks = None
+        self._sessions = None
         self._credentials = None
         self._credential_storage = None
-        self._pcache = DrivePathCache()
+        self._cache_memory = self.CACHE_MEMORY
+        self._pcache = DrivePathCache(max_bytes=self._share_memory())
+        self._store = None
+        self._findex = None
+        self._listings = DriveListingCache(max_bytes=self._share_memory())
+        self._folder_sizes = {}
+        self._snapshot = False
+        self._discovery_ttl = self.DISCOVERY_TTL
+        self._batch = None
+        self._list_workers = self.LIST_WORKERS
+        self._pool = None
 
         debug("Initialisation complete")
 
@@ -331,57 +359,324 @@ class Drive(object):
         """
         Establishes, caches and returns either a new or cached instance of a
         Google apiclient resource object, pertinent to a particular Google
-        API; in our case, the Drive API.
+        API; in our case, the Drive API.  The httplib2 object behind each
+        service is not thread safe, so the service is leased to the calling
+        thread from the transport pool for the duration of the context.
         """
-        if self._service is not None:
-            yield self._service
-            return
+        with self._transport_pool().lease() as service:
+            yield service
 
-        storage = self._get_credential_storage()
-        if storage is not None:
-            credentials = storage.get()
+    def execute(self, request):
+        """
+        Executes a Drive API request, retrying it according to the retry
+        policy should it fail with an error that may be temporary.
+        """
+        return self.call(request.execute)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Calls a function that sends a single request to the Drive, such as
+        the execute() method of a request, pacing each attempt to the rate
+        limit and retrying it according to the retry policy.
+        """
+        def __paced():
+            if self._limiter is not None:
+                self._limiter.acquire()
+            return func(*args, **kwargs)
+
+        return self._retry.call(__paced)
+
+    def set_rate_limit(self, rate, burst=None):
+        """
+        Paces the requests made to the Drive by all threads to 'rate' per
+        second, allowing bursts of up to 'burst' requests, or removes the
+        limit if 'rate' is None.
+        """
+        if rate is None:
+            self._limiter = None
         else:
-            credentials = None
+            self._limiter = DriveRateLimiter(rate, burst)
+
+    def rate_limit_stats(self):
+        """
+        Returns the DriveRateLimiter that requests are paced by, recording
+        the time spent throttled, or None if requests are not rate limited.
+        """
+        return self._limiter
+
+    def set_chunk_size(self, size=None, adaptive=False):
+        """
+        Sets the size of the chunks that resumable uploads are sent in,
+        rounded to a multiple of 256K.  Given 'adaptive', the size is only
+        where uploads start from, and is adapted to the throughput and the
+        failures measured as chunks are sent.  Given neither, the size
+        chosen by the uploader is used.
+        """
+        if size is None and not adaptive:
+            self._chunks = None
+        elif size is None:
+            self._chunks = DriveChunkSizer(adaptive=True)
+        else:
+            self._chunks = DriveChunkSizer(size, adaptive)
+
+    def set_partial_dir(self, path):
+        """
+        Persists the sessions of resumable uploads in 'path', relative to
+        the config directory unless absolute, so that uploads interrupted
+        by one run are continued by the next, or stops persisting them if
+        'path' is None.
+        """
+        if path is None:
+            self._sessions = None
+        else:
+            path = os.path.join(self._get_config_dir(), path)
+            self._sessions = DriveUploadSessions(path)
+
+    def set_retry_policy(self, policy):
+        """Sets the DriveRetryPolicy that failed requests are retried by"""
+        self._retry = policy
+
+    def set_transport(self, max_connections=None, max_idle=None):
+        """
+        Sets the limits on the persistent connections kept to the Drive,
+        being their number and the seconds for which one may be left idle
+        and still be reused.
+        """
+        if max_connections is not None:
+            self._max_connections = max(1, max_connections)
+        if max_idle is not None:
+            self._max_idle = max_idle
+
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def transport_stats(self):
+        """
+        Returns the DriveTransportStats of the transport pool, or None if
+        nothing has been sent to the Drive.
+        """
+        if self._transport is None:
+            return None
+
+        return self._transport.stats
+
+    def _transport_pool(self):
+        """Returns the pool of transports, creating it if necessary"""
+        with self._service_lock:
+            if self._transport is None:
+                self._transport = DriveTransportPool(
+                    self._new_transport, self._max_connections,
+                    self._max_idle
+                )
+
+        return self._transport
+
+    def _new_transport(self, stats):
+        """
+        Returns a new (http, service) pair for the transport pool, being an
+        instance of the Drive API service with an HTTP object of its own,
+        authorized using the credentials shared by all transports.
+        """
+        with self._service_lock:
+            return self._build_transport(stats)
+
+    def _build_transport(self, stats):
+        """Builds a transport, see _new_transport()"""
+        credentials = self._credentials
+
+        if credentials is None:
+            storage = self._get_credential_storage()
+            if storage is not None:
+                credentials = storage.get()
 
         if credentials is None:
             credentials = self._obtain_credentials()
 
+        self._credentials = credentials
+
         debug("Authenticating")
-        import httplib2
 
         #if debug.enabled(): httplib2.debuglevel = 4
 
         http = credentials.authorize(
-            httplib2.Http(cache = self._get_config_dir("http_cache"))
+            DriveHttp(stats, cache = self._get_config_dir("http_cache"))
         )
 
         debug("Loading Google Drive service from config")
 
         from apiclient.discovery import build_from_document, DISCOVERY_URI
 
+        if self._discovery is None:
+            self._discovery = self._get_discovery_document(http, DISCOVERY_URI)
+
+        debug("Building Google Drive service from document")
+        service = build_from_document(
+            self._discovery, http = http, base = DISCOVERY_URI
+        )
+
+        return http, service
+
+    @contextmanager
+    def batch(self):
+        """
+        Within the context, metadata only operations, being the creation of
+        directories, deletions and updates to attributes alone, are queued
+        and sent to the Drive in batches.  Anything left queued is sent on
+        leaving the context, raising a DriveBatchError if any of the batched
+        operations failed that the caller hasn't taken from its 'failures'.
+        Should the context be left by an exception, the operations still
+        queued are sent all the same and any failures are written to stderr,
+        as the exception is raised in place of a DriveBatchError.  Only if
+        interrupted are the operations still queued abandoned, which is also
+        written to stderr.
+        """
+        if self._batch is not None:
+            yield self._batch
+            return
+
+        batch = DriveBatch(self, policy=self._retry, limiter=self._limiter)
+        self._batch = batch
+
+        try:
+            yield batch
+
+        except Exception:
+            self._batch = None
+            exc_info = sys.exc_info()
+
+            try:
+                batch.flush()
+            except Exception, ex:
+                debug("Failed to send batch: %s" % repr(ex))
+
+            for path, ex in batch.failures:
+                sys.stderr.write(
+                    u"gsync: batched operation failed: %s (%s)\n" % (
+                        path, unicode(ex)
+                    )
+                )
+
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+        except BaseException:
+            for path in batch.abandon():
+                sys.stderr.write(
+                    u"gsync: batched operation abandoned: %s\n" % path
+                )
+            raise
+
+        finally:
+            self._batch = None
+
+        batch.flush()
+
+        if batch.failures:
+            raise DriveBatchError(batch.failures)
+
+    def set_cache_memory(self, max_bytes):
+        """
+        Sets the bytes of memory that the path cache and the folder listings
+        may hold between them, beyond which the least recently used entries
+        and listings are evicted.  Any entries cached so far in memory are
+        discarded.
+        """
+        self._cache_memory = max_bytes
+        self._pcache = DrivePathCache(
+            store=self._store, max_bytes=self._share_memory()
+        )
+        self._listings = DriveListingCache(max_bytes=self._share_memory())
+
+    def _share_memory(self):
+        """
+        Returns the bytes of memory that the path cache, or the folder
+        listings, may hold as their share of the cache memory.
+        """
+        if self._cache_memory is None:
+            return None
+
+        return self._cache_memory // 2
+
+    def set_list_workers(self, num):
+        """
+        Sets the number of folders listed at once while walking the Drive,
+        where one lists them one after the other.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+        self._list_workers = max(1, num)
+
+    def _list_pool(self):
+        """
+        Returns the pool of workers that list folders, or None if folders
+        are listed one after the other.
+        """
+        if self._pool is None and self._list_workers > 1:
+            self._pool = DriveWorkerPool(self._list_workers)
+
+        return self._pool
+
+    def set_discovery_ttl(self, ttl):
+        """
+        Sets the number of seconds for which the cached copy of the Drive
+        API discovery document is used, before downloading it again.
+        """
+        self._discovery_ttl = ttl
+
+    def _get_discovery_document(self, http, discovery_uri):
+        """
+        Returns the Drive API discovery document.  The copy cached in the
+        config directory is used while it is younger than the discovery TTL,
+        otherwise the document is downloaded and cached again.  Should the
+        download fail, any cached copy is used regardless of its age.
+        """
+        docfile = self._get_config_file("discovery.json")
+
+        cached = None
+        if os.path.exists(docfile):
+            with open(docfile, "r") as fd:
+                cached = fd.read()
+
+            age = time.time() - os.path.getmtime(docfile)
+            if cached and age < self._discovery_ttl:
+                debug("Using cached API service: %s" % repr(docfile))
+                return cached
+
         debug("Downloading API service")
 
         import uritemplate
-        url = uritemplate.expand(DISCOVERY_URI, {
+        url = uritemplate.expand(discovery_uri, {
             'api': 'drive',
             'apiVersion': 'v2'
         })
-        res, content = http.request(url)
 
         apistr = None
-        if res.status in [ 200, 202 ]:
-            # API expires every minute.
-            apistr = content
+        try:
+            res, content = http.request(url)
+
+            if res.status in [ 200, 202 ]:
+                apistr = content
+
+        except Exception, ex:
+            debug("Failed to download API service: %s" % repr(ex))
 
         if not apistr:
+            if cached:
+                debug("Falling back to cached API service")
+                return cached
+
             raise NoServiceError
 
-        debug("Building Google Drive service from document")
-        self._service = build_from_document(
-            apistr, http = http, base = DISCOVERY_URI
-        )
+        # Replace the cached copy atomically, so that a concurrent run never
+        # reads a partially written document.
+        tmpfile = "%s.%d" % (docfile, os.getpid())
+        with open(tmpfile, "w") as fd:
+            fd.write(apistr)
+        os.rename(tmpfile, docfile)
 
-        yield self._service
+        return apistr
 
     def __del__(self): # pragma: no cover
         debug("Saving credentials...")
@@ -393,6 +688,120 @@ class Drive(object):
 
         debug("My pid = %d" % os.getpid())
 
+    def persist_cache(self, ttl=None):
+        """
+        Backs the path cache with a persistent store in the config directory
+        so that remote metadata survives between runs.  The changes made to
+        the Drive since the previous run are replayed into the cache, which
+        keeps it valid; if that isn't possible, cached entries older than
+        'ttl' seconds are discarded and fetched again from the Drive.
+        """
+        storefile = self._get_config_file("pcache")
+        debug("Opening path cache store: %s (ttl: %s)" % (
+            repr(storefile), repr(ttl)
+        ))
+
+        try:
+            store = DriveCacheStore(storefile, ttl)
+        except Exception, ex:
+            debug("Failed to open path cache store: %s" % repr(ex))
+            return
+
+        self._pcache.close()
+        self._pcache = DrivePathCache(
+            store=store, max_bytes=self._share_memory()
+        )
+        self._store = store
+
+        atexit.register(self._pcache.close)
+
+        if DriveChangeFeed(self, store, self._pcache).replay():
+            store.validate()
+
+    def cache_query(self, ttl=None):
+        """
+        Returns a DriveCacheQuery of the remote metadata persisted by
+        previous runs, answering questions about the Drive without making
+        any requests of it.  Unlike 'persist_cache', the changes made to the
+        Drive since are not replayed, so the answers are only as fresh as
+        the store.  Returns None if there is no store to query.
+        """
+        if self._store is not None:
+            return DriveCacheQuery(self._store)
+
+        storefile = self._get_config_file("pcache")
+        debug("Opening path cache store: %s (ttl: %s)" % (
+            repr(storefile), repr(ttl)
+        ))
+
+        # The store is only read, expired entries being left for the next
+        # run that persists the cache to discard.
+        try:
+            store = DriveCacheStore(storefile, ttl, readonly=True)
+        except Exception, ex:
+            debug("Failed to open path cache store: %s" % repr(ex))
+            return None
+
+        atexit.register(store.close)
+
+        return DriveCacheQuery(store)
+
+    def index_folders(self):
+        """
+        Indexes every folder in the Drive using a few paginated queries, so
+        that paths can be resolved to folders without listing each of the
+        folders along the way.
+        """
+        debug("Indexing folders")
+
+        self._findex = DriveFolderIndex(self._iquery(mimetype=MimeTypes.FOLDER))
+
+        debug("Indexed %d folders" % len(self._findex))
+
+    def snapshot(self):
+        """
+        Lists every entity in the Drive using a few paginated queries and
+        rebuilds the tree of folders from their parents, holding the
+        complete listing of every folder.  For the rest of the run, walks,
+        directory listings and lookups are served from the snapshot, which
+        is kept up to date as changes are made, rather than asking the
+        Drive one folder at a time.
+        """
+        debug("Taking snapshot of the Drive")
+
+        children = { ROOT_ID: [] }
+        count = 0
+
+        for ent in self._iquery():
+            count += 1
+
+            # Folders are held even when empty, so that they are complete.
+            if ent.get('mimeType') == MimeTypes.FOLDER:
+                children.setdefault(ent['id'], [])
+
+            for parent_id in parent_ids(ent):
+                children.setdefault(parent_id, []).append(ent)
+
+        for folder_id, ents in children.iteritems():
+            self._set_folder_size(folder_id, len(ents))
+            self._listings.set(folder_id, ents)
+
+        self._snapshot = True
+
+        debug("Snapshot holds %d entities in %d folders" % (
+            count, len(children)
+        ))
+
+    def _snapshot_listing(self, folder_id):
+        """
+        Returns the entities in a folder as held by the snapshot, or None if
+        there is no snapshot to serve them from.
+        """
+        if self._snapshot and self._listings.complete(folder_id):
+            return self._listings.entities(folder_id)
+
+        return None
+
     def _get_config_dir(self, subdir = None):
         """Returns the path to the gsync config directory"""
         configdir = os.getenv('GSYNC_CONFIG_DIR',
@@ -496,20 +905,42 @@ class Drive(object):
 
         return credentials
 
-    def walk(self, top, topdown=True, onerror=None, followlinks=False):
+    def walk(self, top, topdown=True, onerror=None, followlinks=False,
+        breadth_first=False):
         """
         Walks the Google Drive directory structure one directory at a time
         and processes all files at each directory by yielding a tuple of
         the directory, list of directories and list of files.
         """
+        walker = self.walk_entities(
+            top, topdown, onerror, followlinks, breadth_first
+        )
 
-        join = os.path.join
-        names = None
+        for dirpath, dir_ents, file_ents in walker:
+            dirs = [ ent.title for ent in dir_ents ]
+            nondirs = [ ent.title for ent in file_ents ]
+
+            yield dirpath, dirs, nondirs
 
+            # Directories removed by the caller are not descended into.
+            if topdown:
+                dir_ents[:] = [ ent for ent in dir_ents if ent.title in dirs ]
+
+    def walk_entities(self, top, topdown=True, onerror=None,
+        followlinks=False, breadth_first=False):
+        """
+        Like 'walk', but yields the entities of the directories and files,
+        rather than their names.  Directories are told apart from files
+        using the directory listing alone, so no entity is stat'd along the
+        way.  The directories beneath each directory are listed at once by
+        the list workers, but are yielded in the order of a sequential walk,
+        being depth first unless 'breadth_first' is set.  The walk keeps its
+        own stack, so the depth of the tree is not limited by recursion.
+        """
         debug("Walking: %s" % repr(top))
 
         try:
-            names = self.listdir(top)
+            ents = self.listdir_entities(top)
         except Exception, ex:
             debug.exception()
             debug("Exception: %s" % repr(ex))
@@ -518,26 +949,172 @@ class Drive(object):
                 onerror(ex)
             return
 
-        debug("Separating directories from files...")
+        if breadth_first:
+            walker = self._walk_breadth(top, ents, topdown, onerror)
+        else:
+            walker = self._walk_depth(top, ents, topdown, onerror)
+
+        for vals in walker:
+            yield vals
+
+    @staticmethod
+    def _split_listing(ents):
+        """Separates the directories of a listing from the files"""
         dirs, nondirs = [], []
-        for name in names:
-            if self.isdir(join(top, name)):
-                dirs.append(name)
+        for ent in ents:
+            if ent.mimeType == MimeTypes.FOLDER:
+                dirs.append(ent)
             else:
-                nondirs.append(name)
+                nondirs.append(ent)
+
+        return dirs, nondirs
+
+    def _lookahead(self):
+        """
+        Returns the DriveLookahead through which a walk requests listings
+        from the list workers, or None if folders are to be listed one after
+        the other.
+        """
+        pool = self._list_pool()
+        if pool is None or self._snapshot:
+            return None
+
+        return DriveLookahead(pool, len(pool) * self.LIST_AHEAD)
 
+    def _list_dirs(self, lookahead, path, dirs, first=False):
+        """
+        Queues the listings of the directories beneath 'path' with the
+        lookahead of the walk, ahead of any queued already if 'first' is
+        given.  Only the requests are run by the workers; the caches are
+        left to the walking thread.
+        """
+        if lookahead is None:
+            return
+
+        if first:
+            dirs = reversed(dirs)
+
+        for ent in dirs:
+            # Titles may be duplicated, so listings are keyed by ID too.
+            lookahead.add(
+                (os.path.join(path, ent.title), ent.id), self._query,
+                { 'parent_id': str(ent.id) }, first
+            )
+
+    def _listed(self, path, ent, lookahead, onerror):
+        """
+        Returns the entities of the directory at 'path', given its entity
+        and the lookahead of the walk, or None if it could not be listed.
+        """
+        debug("Walking: %s" % repr(path))
+
+        listing = None
+        if lookahead is not None:
+            listing = lookahead.take((path, ent.id))
+
+        # Any listing fetched before the queued changes were made is out
+        # of date.
+        if self._flush_pending(path, beneath=True):
+            listing = None
+
+        try:
+            if listing is not None:
+                children = listing.result()
+            else:
+                children = self._snapshot_listing(ent.id)
+                if children is None:
+                    children = self._query(parent_id=str(ent.id))
+
+        except Exception, ex:
+            debug.exception()
+            debug("Exception: %s" % repr(ex))
+
+            if onerror is not None:
+                onerror(ex)
+            return None
+
+        return self._listing_entities(path, ent.id, children)
+
+    def _walk_depth(self, top, ents, topdown, onerror):
+        """
+        Walks depth first from the directory at 'top', given its listing.
+        Each frame on the stack holds a directory, its listing and the index
+        of the next of its directories.  The directories of the deepest
+        directory are walked next, so their listings are queued first.
+        """
+        join = os.path.join
+        lookahead = self._lookahead()
+        dirs, nondirs = self._split_listing(ents)
+
+        # Directories are only listed once the caller has had the chance to
+        # prune them.
         if topdown:
             yield top, dirs, nondirs
 
-        debug("Iterating directories...")
-        for name in dirs:
-            new_path = join(top, name)
-            for vals in self.walk(new_path, topdown, onerror, followlinks):
-                yield vals
+        self._list_dirs(lookahead, top, dirs, first=True)
+        stack = [ [ top, dirs, nondirs, 0 ] ]
 
-        debug("Yeilding on non-directories...")
-        if not topdown:
-            yield top, dirs, nondirs
+        while stack:
+            frame = stack[-1]
+            path, dirs, nondirs, i = frame
+
+            if i >= len(dirs):
+                stack.pop()
+                if not topdown:
+                    yield path, dirs, nondirs
+                continue
+
+            frame[3] += 1
+
+            ent = dirs[i]
+            new_path = join(path, ent.title)
+
+            ents = self._listed(new_path, ent, lookahead, onerror)
+            if ents is None:
+                continue
+
+            dirs, nondirs = self._split_listing(ents)
+            if topdown:
+                yield new_path, dirs, nondirs
+
+            self._list_dirs(lookahead, new_path, dirs, first=True)
+            stack.append([ new_path, dirs, nondirs, 0 ])
+
+    def _walk_breadth(self, top, ents, topdown, onerror):
+        """
+        Walks breadth first from the directory at 'top', given its listing.
+        Walking bottom up, every directory is held until the walk is done,
+        so that the deepest are yielded first.
+        """
+        join = os.path.join
+        lookahead = self._lookahead()
+        queue, visited = deque(), []
+
+        dirs, nondirs = self._split_listing(ents)
+        path = top
+
+        while True:
+            if topdown:
+                yield path, dirs, nondirs
+            else:
+                visited.append((path, dirs, nondirs))
+
+            self._list_dirs(lookahead, path, dirs)
+            for ent in dirs:
+                queue.append((join(path, ent.title), ent))
+
+            ents = None
+            while ents is None and queue:
+                path, ent = queue.popleft()
+                ents = self._listed(path, ent, lookahead, onerror)
+
+            if ents is None:
+                break
+
+            dirs, nondirs = self._split_listing(ents)
+
+        for vals in reversed(visited):
+            yield vals
 
     def is_rootpath(self, path):
         """
@@ -597,20 +1174,77 @@ class Drive(object):
 
     def _find_entity(self, name, ents):
         """
-        Finds an entity in a list of entities returned in a Drive query.
+        Finds an entity in the entities returned in a Drive query, which
+        may be a generator that fetches them a page at a time.
         """
-        debug("Iterating %d entities to find %s" % (len(ents), repr(name)))
+        debug("Iterating entities to find %s" % repr(name))
         name = Drive.unicode(name)
+        count = 0
         for ent in ents:
+            count += 1
             entname = ent.get('title', u"")
 
             debug("comparing %s to %s" % (repr(name), repr(entname)))
             if name == entname:
-                debug("Found %s" % repr(name))
+                debug("Found %s after %d entities" % (repr(name), count))
                 return ent
 
+        debug("Not found in %d entities" % count)
         return None
 
+    def _folder_size(self, folder_id):
+        """
+        Returns the number of entities in the folder when it was last
+        listed, or None if it hasn't been listed.
+        """
+        size = self._folder_sizes.get(folder_id)
+        if size is None and self._store is not None:
+            size = self._store.get("size:%s" % folder_id)
+
+        return size
+
+    def _set_folder_size(self, folder_id, size):
+        """Records the number of entities found by listing a folder"""
+        self._folder_sizes[folder_id] = size
+        if self._store is not None:
+            self._store.put("size:%s" % folder_id, size)
+
+    def _lookup(self, parent_id, name):
+        """
+        Finds the entity with the given name in the parent folder.  The
+        folder is listed, unless it is known to be large, in which case
+        the Drive is asked for entities with a matching title instead.
+        """
+        size = self._folder_size(parent_id)
+
+        if size is not None and size > self.LARGE_FOLDER_SIZE:
+            debug("Looking up %s in large folder" % repr(name))
+
+            # The first match will do, so the rest need not be fetched.
+            return self._find_entity(
+                name, self._iquery(parent_id=parent_id, title=name)
+            )
+
+        ents = self._query(parent_id=parent_id)
+        self._set_folder_size(parent_id, len(ents))
+        self._listings.set(parent_id, ents)
+
+        debug("Got %d entities back" % len(ents))
+
+        return self._find_entity(name, ents)
+
+    def _flush_pending(self, path, beneath=False):
+        """
+        Sends the batch being queued if the changes in it must be made
+        before the path can be stat'd or, given 'beneath', listed.  Returns
+        True if the batch was sent.
+        """
+        if self._batch is None or not self._batch.pending(path, beneath):
+            return False
+
+        self._batch.flush()
+        return True
+
     def stat(self, path):
         """
         Performs a remote 'stat' on the file at the given path.  Returns the
@@ -619,6 +1253,8 @@ class Drive(object):
         self.validatepath(path)
         path = self.normpath(path)
 
+        self._flush_pending(path)
+
         # If it is cached, we can obtain it there.
         debug("Checking pcache for path: %s" % repr(path))
         ent = self._pcache.get(path)
@@ -663,16 +1299,32 @@ class Drive(object):
 
             debug("Checking pcache for path: %s" % repr(search))
             ent = self._pcache.get(search)
-            if ent is None:
-                debug(" * nothing found")
-                ents = self._query(parent_id=parent_id)
 
-                debug("Got %d entities back" % len(ents))
+            if ent is None and self._listings.expecting(parent_id):
+                debug(" * collecting prefetched listing")
+                self._collect(parent_id)
 
-                if len(ents) == 0:
+            # A complete listing of the folder is authoritative.
+            if ent is None and self._listings.complete(parent_id):
+                debug(" * checking folder listing")
+                ent = self._listings.lookup(
+                    parent_id, Drive.unicode(searchname)
+                )
+                if ent is None:
                     return None
 
-                ent = self._find_entity(searchname, ents)
+            if ent is None and self._findex is not None:
+                debug(" * checking folder index")
+                ent = self._findex.lookup(parent_id, Drive.unicode(searchname))
+
+                # Only the last element of the path may be something other
+                # than a folder, so the index is authoritative up to there.
+                if ent is None and search != path:
+                    return None
+
+            if ent is None:
+                debug(" * nothing found")
+                ent = self._lookup(parent_id, searchname)
 
             if ent is None:
                 return None
@@ -692,10 +1344,13 @@ class Drive(object):
         # Finally, couldn't find anything, raise an error?
         return None
 
-    def mkdir(self, path):
+    def mkdir(self, path, properties=None, **kwargs):
         """
         Creates a directory at the specified path and any parent directories,
-        if the path specified does not already exist.
+        if the path specified does not already exist.  Given 'properties',
+        such as the description, they are set on the directory as it is
+        created.  Within a batch, the creation of the directory is queued
+        and None is returned.
         """
         debug("path = %s" % repr(path))
 
@@ -719,7 +1374,8 @@ class Drive(object):
 
             if not parent:
                 if normpath != dirname:
-                    parent = self.mkdir(dirname)
+                    self.mkdir(dirname)
+                    parent = self.stat(dirname)
 
                 if not parent:
                     debug("Failed to create parent: %s" % repr(dirname))
@@ -730,17 +1386,41 @@ class Drive(object):
 
         debug("Creating directory: %s" % repr(normpath))
 
+        def __created(info):
+            self._pcache.put(path, info)
+            if self._findex is not None:
+                self._findex.add(info)
+
+            # The new folder is known to be empty.
+            self._listings.add(info)
+            self._listings.set(info['id'], [])
+
+        body = {}
+        for key, val in (properties or {}).iteritems():
+            if val is not None and key != 'id':
+                body[key] = Drive.utf8(val)
+
+        options = kwargs.get('options', {})
+        if not options.get('setModifiedDate', False):
+            body.pop('modifiedDate', None)
+
+        body.update({
+            'title': basename,
+            'mimeType': MimeTypes.FOLDER,
+            'parents': [{ 'id': parent_id }]
+        })
+
         with self.service() as service:
-            info = service.files().insert(
-                body = {
-                    'title': basename,
-                    'mimeType': MimeTypes.FOLDER,
-                    'parents': [{ 'id': parent_id }]
-                }
-            ).execute()
+            req = service.files().insert(body = body, fields = FILE_FIELDS)
+
+            if self._batch is not None:
+                self._batch.add(normpath, req, __created)
+                return None
 
+            info = self.execute(req)
             if info:
-                self._pcache.put(path, info)
+                __created(info)
+
                 ent = DriveFile(path = Drive.unicode(normpath), **info)
                 return ent
 
@@ -753,14 +1433,140 @@ class Drive(object):
 
     def listdir(self, path):
         """Returns a list of directory contents at the specified location"""
-        ent = self.stat(path)
-        ents = self._query(parent_id=str(ent.id))
+        return [ ent.title for ent in self.listdir_entities(path) ]
 
-        names = []
-        for ent in ents:
-            names.append(ent['title'])
+    def listdir_entities(self, path):
+        """
+        Returns a list of the entities of the directory contents at the
+        specified location, as DriveFile objects.  Each entity is also
+        placed in the path cache, saving a query when it is stat'd.
+        """
+        path = self.normpath(path)
+        self._flush_pending(path, beneath=True)
+
+        info = self.stat(path)
+        if info is None:
+            raise FileNotFoundError(path)
+
+        children = self._snapshot_listing(info.id)
+        if children is None:
+            children = self._iquery(parent_id=str(info.id))
+
+        return self._listing_entities(path, info.id, children)
+
+    def scan(self, top, recursive=False):
+        """
+        Yields the entity at 'top' and, if it is a folder, the entities in
+        it as DriveFile objects, as each page of the listing is returned.
+        Given 'recursive', the folders beneath are scanned too, depth first.
+        Unlike 'walk', the listings are neither held nor cached, so only the
+        folders yet to be scanned are kept in memory.
+        """
+        top = self.normpath(top)
+        self._flush_pending(top, beneath=True)
+
+        info = self.stat(top)
+        if info is None:
+            raise FileNotFoundError(top)
+
+        yield info
+
+        if info.mimeType != MimeTypes.FOLDER:
+            return
+
+        join = os.path.join
+        stack = [ (top, str(info.id)) ]
+
+        while stack:
+            path, folder_id = stack.pop()
+            debug("Scanning: %s" % repr(path))
+
+            children = self._snapshot_listing(folder_id)
+            if children is None:
+                children = self._iquery(parent_id=folder_id)
+
+            folders = []
+            for ent in children:
+                ent = DriveFile(
+                    ent, path = Drive.unicode(join(path, ent['title']))
+                )
+                yield ent
+
+                if recursive and ent.mimeType == MimeTypes.FOLDER:
+                    folders.append((ent.path, str(ent.id)))
+
+            # Scan the folders in the order they were listed.
+            folders.reverse()
+            stack.extend(folders)
+
+    def _listing_entities(self, path, folder_id, children):
+        """
+        Returns the DriveFile objects of the entities listed in a folder,
+        placing each of them in the path cache.  The listing may be given as
+        an iterable that is consumed as it is processed.
+        """
+        ents, seen, listed = [], set(), []
+
+        for ent in children:
+            listed.append(ent)
+
+            entpath = os.path.join(path, ent['title'])
+
+            # Where titles are duplicated, stat finds the first of them.
+            if entpath not in seen:
+                seen.add(entpath)
+                self._pcache.put(entpath, ent)
+
+            ents.append(DriveFile(path = Drive.unicode(entpath), **ent))
+
+        self._set_folder_size(folder_id, len(listed))
+        self._listings.set(folder_id, listed)
+
+        return ents
+
+    def prefetch(self, path):
+        """
+        Starts listing the folder at the given path in the background, so
+        that the entities in it are found without waiting, once they are
+        looked up.  Does nothing if the path isn't a folder, or its listing
+        is already held or being fetched.
+        """
+        self._flush_pending(path, beneath=True)
+
+        info = self.stat(path)
+        if info is None or info.mimeType != MimeTypes.FOLDER:
+            return
+
+        folder_id = str(info.id)
+        if self._listings.complete(folder_id) or \
+            self._listings.expecting(folder_id):
+            return
+
+        debug("Prefetching folder listing: %s" % repr(info.path))
+
+        pool = self._list_pool()
+        if pool is not None:
+            future = pool.submit(self._query, parent_id=folder_id)
+        else:
+            future = spawn(self._query, parent_id=folder_id)
 
-        return names
+        self._listings.expect(folder_id, (info.path, future))
+
+    def _collect(self, folder_id):
+        """
+        Waits for the prefetched listing of a folder, placing it in the
+        caches.  A prefetch that failed is dropped, leaving the folder to be
+        looked up as though it had never been prefetched.
+        """
+        path, future = self._listings.collect(folder_id)
+
+        try:
+            children = future.result()
+        except Exception, ex:
+            debug("Prefetch failed: %s" % repr(ex))
+            return
+
+        self._listing_entities(path, folder_id, children)
 
     def open(self, path, mode = "r"):
         """
@@ -779,21 +1585,39 @@ class Drive(object):
         if info is None:
             return
 
+        self._pcache.clear_tree(path)
+        if self._findex is not None:
+            self._findex.remove(info.id)
+
+        self._listings.remove(info)
+        self._listings.discard(info.id)
+
         with self.service() as service:
             if skip_trash:
                 debug("Deleting: %s (id: %s)" % (repr(path), info.id))
-                service.files().delete(fileId=info.id).execute()
+                req = service.files().delete(fileId=info.id)
             else:
                 debug("Trashing: %s (id: %s)" % (repr(path), info.id))
-                service.files().trash(fileId=info.id).execute()
+                req = service.files().trash(fileId=info.id, fields='id')
+
+            if self._batch is not None:
+                self._batch.add(path, req)
+            else:
+                self.execute(req)
 
             return
 
         debug("Deletion failed")
 
-    def create(self, path, properties):
+    def create(self, path, properties, **kwargs):
         """
-        Creates an empty remote file at the specified location.
+        Creates a remote file at the specified location, with the content
+        given by 'media_body', if any, uploaded by the same request as the
+        metadata.  A file already at the location is updated in place, so
+        that it keeps its ID and revisions, unless it is a folder that is
+        being replaced by a file or vice versa.  Given the 'source' identity
+        of the content, an upload interrupted by a previous run may be
+        continued, if partial uploads are kept.
         """
         debug("Create file %s" % repr(path))
 
@@ -801,15 +1625,26 @@ class Drive(object):
         dirname = os.path.dirname(path)
         info = self.stat(dirname)
         if info is None:
+            # A folder that failed to be created in a batch is not the same
+            # as one that is missing.
+            ex = None if self._batch is None else self._batch.failed(dirname)
+            if ex is not None:
+                raise DriveBatchError([ (self.normpath(dirname), ex) ])
+
             return None
 
         parent_id = info.id
 
         debug(" * parent_id = %s" % repr(parent_id))
 
-        # Get the file info and delete existing file.
+        # Replace an existing file in place, where it is of the same kind.
         info = self.stat(path)
         if info is not None:
+            is_folder = properties.get('mimeType') == MimeTypes.FOLDER
+            if is_folder == (info.mimeType == MimeTypes.FOLDER):
+                debug(" * updating existing...")
+                return self.update(path, properties, **kwargs)
+
             debug(" * deleting existing...")
             self.delete(path)
 
@@ -819,6 +1654,12 @@ class Drive(object):
             if val is not None:
                 body[key] = Drive.utf8(val)
 
+        # As with an update, the modified date is only set if asked to be,
+        # otherwise the Drive records the time of the upload.
+        options = kwargs.get('options', {})
+        if not options.get('setModifiedDate', False):
+            body.pop('modifiedDate', None)
+
         # Retain the title from the path being created.
         body['title'] = Drive.utf8(os.path.basename(path))
 
@@ -827,13 +1668,20 @@ class Drive(object):
 
         debug(" * trying...")
         with self.service() as service:
-            ent = service.files().insert(
+            req = service.files().insert(
                 body = body,
-                media_body = ""
-            ).execute()
+                media_body = kwargs.get('media_body') or "",
+                fields = FILE_FIELDS
+            )
+
+            session = self._session("insert", path, parent_id, req, kwargs)
+            ent = self._upload(req, kwargs.get('progress_callback'), session)
+            if ent is None:
+                return None
 
             # Clear the cache and update the path cache
             self._pcache.put(path, ent)
+            self._listings.add(ent)
 
             debug(" * file created")
             return ent
@@ -843,7 +1691,9 @@ class Drive(object):
 
     def update(self, path, properties, **kwargs):
         """
-        Updates the content and attributes of a remote file.
+        Updates the content and attributes of a remote file.  Within a
+        batch, updates to the attributes alone are queued and None is
+        returned.
         """
         progress_callback = kwargs.get('progress_callback')
         options = kwargs.get('options', {})
@@ -864,68 +1714,249 @@ class Drive(object):
             setattr(info, key, Drive.utf8(val))
 
         with self.service() as service:
-            res = None
             req = service.files().update(
                 fileId=info.id,
                 body=info.copy(),
                 setModifiedDate=options.get('setModifiedDate', False),
                 newRevision=True,
-                media_body=kwargs.get('media_body')
+                media_body=kwargs.get('media_body'),
+                fields=FILE_FIELDS
             )
 
-            if progress_callback is None:
-                res = req.execute()
+            if self._batch is not None and kwargs.get('media_body') is None:
+                def __updated(info):
+                    self._pcache.put(path, info)
+                    self._listings.add(info)
 
-            else:
-                try:
-                    while res is None:
-                        debug(" * uploading next chunk...")
-
-                        status, res = req.next_chunk()
-                        if status:
-                            progress_callback(status)
-
-                        elif res:
-                            file_size = int(res['fileSize'])
-                            progress_callback(
-                                MediaUploadProgress(file_size, file_size)
-                            )
+                self._batch.add(path, req, __updated)
+                return None
 
-                except Exception, ex:
-                    debug("Exception: %s" % str(ex))
-                    debug.exception()
+            session = self._session("update", path, info.id, req, kwargs)
+            res = self._upload(req, progress_callback, session)
 
             # Refresh the cache with the latest revision
             self._pcache.put(path, res)
+            if res is not None:
+                self._listings.add(res)
 
             return res
 
         debug("Update failed")
         raise Exception("Update failed")
 
-    @retryer
+    def patch(self, path, properties, **kwargs):
+        """
+        Updates only the given attributes of a remote file, sending nothing
+        but them.  Within a batch, the patch is queued and None is returned.
+        """
+        options = kwargs.get('options', {})
+
+        info = self.stat(path)
+        if not info:
+            raise FileNotFoundError(path)
+
+        debug("Patching: %s" % repr(path))
+
+        body = {}
+        for key, val in properties.iteritems():
+            if key == 'id':
+                continue
+
+            debug(" * with: %s = %s" % (repr(key), repr(val)))
+            body[key] = Drive.utf8(val)
+
+        def __patched(info):
+            self._pcache.put(path, info)
+            self._listings.add(info)
+
+        with self.service() as service:
+            req = service.files().patch(
+                fileId=info.id,
+                body=body,
+                setModifiedDate=options.get('setModifiedDate', False),
+                fields=FILE_FIELDS
+            )
+
+            if self._batch is not None:
+                self._batch.add(path, req, __patched)
+                return None
+
+            res = self.execute(req)
+            __patched(res)
+
+            return res
+
+    def _session(self, method, path, file_id, req, kwargs):
+        """
+        Returns the identity by which the session of a resumable upload is
+        persisted, or None if it isn't to be.  The session is only resumed
+        by an upload of the same 'source' content, given in 'kwargs', by the
+        same method to the same file, or folder for an insert.
+        """
+        source = kwargs.get('source')
+        if self._sessions is None or source is None:
+            return None
+
+        if getattr(req, "resumable", None) is None:
+            return None
+
+        return {
+            'method': method,
+            'path': self.normpath(path),
+            'fileId': file_id,
+            'size': req.resumable.size(),
+            'source': source,
+        }
+
+    def _upload(self, req, progress_callback=None, session=None):
+        """
+        Executes a request that may carry content, reporting the progress
+        of the upload a chunk at a time to 'progress_callback', if given.
+        Content that isn't resumable is sent in one go, with the request.
+        Given the 'session' identity of a resumable upload, its session is
+        persisted as each chunk is confirmed, and an upload interrupted
+        before completing is continued from the last confirmed byte.
+        """
+        if getattr(req, "resumable", None) is None:
+            res = self.execute(req)
+            if res and progress_callback is not None:
+                file_size = int(res.get('fileSize', 0))
+                progress_callback(MediaUploadProgress(file_size, file_size))
+
+            return res
+
+        chunks = self._chunks
+        sessions = self._sessions if session is not None else None
+        resumed = False
+
+        if chunks is not None:
+            req.resumable = DriveSizedUpload(req.resumable, chunks)
+
+        def __next_chunk():
+            if chunks is None:
+                return req.next_chunk()
+
+            offset = req.resumable_progress
+            start = time.time()
+
+            try:
+                status, res = req.next_chunk()
+            except Exception:
+                chunks.failed()
+                raise
+
+            if res is not None:
+                sent = req.resumable.size() - offset
+            else:
+                sent = status.resumable_progress - offset
+
+            chunks.sent(sent, time.time() - start)
+            return status, res
+
+        def __recover(state):
+            # The uploader only asks the Drive how much of the content it
+            # has received while in its error state, which it doesn't expose.
+            if not hasattr(req, "_in_error_state"):
+                raise NotImplementedError(
+                    "Resuming uploads isn't supported by this apiclient"
+                )
+
+            req._in_error_state = state
+
+        def __keep():
+            if sessions is not None and req.resumable_uri is not None:
+                sessions.put(
+                    session, req.resumable_uri, req.resumable_progress
+                )
+
+        if sessions is not None:
+            record = sessions.get(session)
+            if record is not None:
+                req.resumable_uri, req.resumable_progress = record
+                debug("Resuming upload from byte %d" % req.resumable_progress)
+
+                # The next chunk asks the Drive how much of the content it
+                # has received before continuing from there.
+                __recover(True)
+                resumed = True
+
+        res = None
+        while res is None:
+            debug(" * uploading next chunk...")
+
+            try:
+                status, res = self.call(__next_chunk)
+
+            except HttpError, ex:
+                if not resumed or int(ex.resp.status) not in (404, 410):
+                    __keep()
+                    raise
+
+                debug("Upload session expired, starting again")
+                sessions.clear(session)
+                req.resumable_uri = None
+                req.resumable_progress = 0
+                __recover(False)
+                resumed = False
+                continue
+
+            except:
+                __keep()
+                raise
+
+            resumed = False
+
+            if status:
+                if sessions is not None:
+                    sessions.put(
+                        session, req.resumable_uri, status.resumable_progress
+                    )
+
+                if progress_callback is not None:
+                    progress_callback(status)
+
+            elif res and progress_callback is not None:
+                file_size = int(res.get('fileSize', 0))
+                progress_callback(MediaUploadProgress(file_size, file_size))
+
+        if sessions is not None:
+            sessions.clear(session)
+
+        return res
+
     def _query(self, **kwargs):
         """
         Performs a query against the Google Drive, returning an entity list
         that was returned by the server.  This function acts as a proxy to
-        the Google Drive, simplifying requests.
+        the Google Drive, simplifying requests.  See _iquery().
+        """
+        return list(self._iquery(**kwargs))
+
+    def _iquery(self, **kwargs):
+        """
+        Like _query(), but yields the entities a page at a time as they are
+        returned by the server.  Each following page is fetched in the
+        background while the entities of the current page are consumed.
         """
         parent_id = kwargs.get("parent_id")
         mimetype = kwargs.get("mimetype")
+        title = kwargs.get("title")
         file_id = kwargs.get("id")
         include_trash = kwargs.get("include_trash", False)
 
-        page_token = None
-        query, ents = [], []
-        param = {}
+        query, param = [], {}
 
         if file_id is not None:
             query.append('id = "%s"' % file_id)
         elif parent_id is not None:
             query.append('"%s" in parents' % parent_id)
 
-            if mimetype is not None:
-                query.append('mimetype = "%s"' % mimetype)
+        if file_id is None and mimetype is not None:
+            query.append('mimeType = "%s"' % mimetype)
+
+        if file_id is None and title is not None:
+            title = re.sub(r'(["\\])', r'\\\1', Drive.utf8(title))
+            query.append('title = "%s"' % title)
 
         if not include_trash:
             query.append('trashed = false')
@@ -933,21 +1964,37 @@ class Drive(object):
         if len(query) > 0:
             param['q'] = ' and '.join(query)
 
-        with self.service() as service:
-            while True:
-                if page_token:
-                    param['pageToken'] = page_token
+        # Ask for only the fields we use, and as many of them at a time as
+        # the API allows, to keep both the responses and their number down.
+        param['fields'] = 'nextPageToken,items(%s)' % FILE_FIELDS
+        param['maxResults'] = 1000
 
-                debug("Executing query: %s" % repr(param))
+        def __fetch(page_token):
+            page = dict(param)
+            if page_token:
+                page['pageToken'] = page_token
 
-                files = service.files().list(**param).execute()
+            debug("Executing query: %s" % repr(page))
 
-                debug("Query returned %d files" % len(files))
+            with self.service() as service:
+                return self.execute(service.files().list(**page))
 
-                ents.extend(files['items'])
-                page_token = files.get('nextPageToken')
+        files = __fetch(None)
+        while True:
+            page_token = files.get('nextPageToken')
 
-                if not page_token:
-                    break
+            # Should the caller stop early, the page being fetched is simply
+            # discarded once it arrives.
+            following = None
+            if page_token:
+                following = spawn(__fetch, page_token)
 
-        return ents
+            debug("Query returned %d files" % len(files.get('items', [])))
+
+            for ent in files.get('items', []):
+                yield ent
+
+            if following is None:
+                break
+
+            files = following.result()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the batching of Google Drive metadata operations, which are queued
+and sent together in multipart batch requests rather than one at a time.
+"""
+
+from __future__ import absolute_import
+
+from libgsync.output import debug
+
+
+class DriveBatchError(Exception):
+    """Raised when operations sent in a batch have failed"""
+    def __init__(self, failures):
+        super(DriveBatchError, self).__init__(
+            "%d batched operations failed: %s" % (
+                len(failures), ", ".join([
+                    "%s (%s)" % (repr(path), str(ex)) for path, ex in failures
+                ])
+            )
+        )
+
+        self.failures = failures
+
+
+class DriveBatch(object):
+    """
+    Queues requests against the paths they operate on and sends them in
+    batches of up to 'size' requests.  The callback of each request is
+    called with its response, while failed requests are recorded against
+    their path in 'failures', until the caller has reported them, and for
+    the life of the batch, to be looked up by 'failed'.  Given a
+    DriveRetryPolicy, requests that fail with errors that may be temporary
+    are sent again in another batch.  Given a DriveRateLimiter, each
+    request in a batch counts towards the rate limit, as it does towards
+    the quotas of the Drive.
+    """
+
+    # The Drive API accepts no more than this many requests in a batch.
+    MAX_SIZE = 100
+
+    def __init__(self, drive, size=MAX_SIZE, policy=None, limiter=None):
+        self._drive = drive
+        self._size = min(size, self.MAX_SIZE)
+        self._policy = policy
+        self._limiter = limiter
+        self._queue = []
+        self._failed = {}
+        self.failures = []
+
+    def __len__(self):
+        return len(self._queue)
+
+    def pending(self, path, beneath=False):
+        """
+        Returns True if a request is queued for the path, or for a folder
+        above it, in which case the path cannot be stat'd reliably until
+        the batch has been flushed.  Given 'beneath', requests queued for
+        anything in the folder at the path count too, as they must be made
+        before the folder can be listed.
+        """
+        path = self._drive.normpath(path)
+        prefix = path.rstrip("/") + "/"
+
+        for queued, _, _ in self._queue:
+            if path == queued or path.startswith(queued.rstrip("/") + "/"):
+                return True
+
+            if beneath and queued.startswith(prefix):
+                return True
+
+        return False
+
+    def failed(self, path):
+        """
+        Returns the exception raised by a failed request for the path, or
+        for a folder above it, or None if no such request failed.
+        """
+        path = self._drive.normpath(path)
+
+        for failed, ex in self._failed.iteritems():
+            if path == failed or path.startswith(failed.rstrip("/") + "/"):
+                return ex
+
+        return None
+
+    def _fail(self, path, ex):
+        """Records the failure of the request for a path"""
+        self._failed[path] = ex
+        self.failures.append((path, ex))
+
+    def abandon(self):
+        """Forgets the queued requests, returning the paths they were for"""
+        queue, self._queue = self._queue, []
+        return [ path for path, _, _ in queue ]
+
+    def add(self, path, request, callback=None):
+        """
+        Queues the request for the path, flushing the queue once it holds
+        as many requests as can be sent in one batch.
+        """
+        path = self._drive.normpath(path)
+
+        debug("Queueing batched request for %s" % repr(path))
+        self._queue.append((path, request, callback))
+
+        if len(self._queue) >= self._size:
+            self.flush()
+
+    def flush(self):
+        """Sends all queued requests to the Drive in one batch request"""
+        queue, self._queue = self._queue, []
+        attempt, waited = 0, 0.0
+
+        while queue:
+            retries = self._send(queue)
+            queue = []
+
+            if not retries:
+                break
+
+            # The longest of the delays asked for by the failed requests is
+            # waited for, before all of them are sent again.
+            delays = [
+                self._policy.delay(ex, attempt, waited)
+                for _, ex in retries
+            ]
+
+            if None in delays:
+                for item, ex in retries:
+                    self._fail(item[0], ex)
+                break
+
+            delay = max(delays)
+            debug("Retrying %d batched requests in %.1fs" % (
+                len(retries), delay
+            ))
+
+            self._policy.wait(delay)
+            waited += delay
+            attempt += 1
+
+            queue = [ item for item, _ in retries ]
+
+    def _send(self, queue):
+        """
+        Sends the queued requests in one batch request, returning the items
+        of those that failed and should be retried, with their exceptions.
+        """
+        retries = []
+
+        def __callback(request_id, response, exception):
+            item = queue[int(request_id)]
+            path, _, callback = item
+
+            if exception is not None:
+                debug("Batched request failed for %s: %s" % (
+                    repr(path), repr(exception)
+                ))
+
+                if self._policy is not None and \
+                    self._policy.retryable(exception):
+                    retries.append((item, exception))
+                else:
+                    self._fail(path, exception)
+
+            elif callback is not None:
+                callback(response)
+
+        debug("Sending %d batched requests" % len(queue))
+
+        with self._drive.service() as service:
+            if hasattr(service, "new_batch_http_request"):
+                batch = service.new_batch_http_request(callback=__callback)
+            else: # pragma: no cover
+                from apiclient.http import BatchHttpRequest
+                batch = BatchHttpRequest(callback=__callback)
+
+            for i, (_, request, _) in enumerate(queue):
+                batch.add(request, request_id=str(i))
+
+            # Without 'http', the batch is sent over the transport of the
+            # first request, which was leased when the request was built and
+            # may be in use by another thread by now.
+            def __execute():
+                if self._limiter is not None:
+                    self._limiter.acquire(len(queue))
+                batch.execute(http=service._http)
+
+            try:
+                if self._policy is not None:
+                    self._policy.call(__execute)
+                else:
+                    __execute()
+
+            except Exception, ex:
+                for path, _, _ in queue:
+                    self._fail(path, ex)
+                raise
+
+        return retries
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2013-2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the persistent storage used to keep Google Drive metadata between
+runs of gsync.
+"""
+
+from __future__ import absolute_import
+
+import shelve, time
+
+try:
+    import cPickle as pickle
+except ImportError: # pragma: no cover
+    import pickle
+
+from libgsync.output import debug
+
+
+class DriveCacheStore(object):
+    """
+    A shelve backed key/value store, where each value is stamped with the
+    time it was stored.  Values older than the time to live are treated as
+    though they do not exist and are removed on access.  Validating the
+    store, for example after replaying the changes made to the Drive,
+    renews every value held in it.
+
+    Given 'readonly', the store is opened for reading alone and is never
+    changed: expired values are only treated as though they do not exist,
+    and a store written by another version raises a ValueError.
+    """
+
+    # Bump this whenever the layout of stored values changes, so that stale
+    # stores written by older versions are discarded rather than misread.
+    VERSION = 2
+
+    def __init__(self, filename, ttl=None, readonly=False):
+        self._ttl = ttl
+        self._readonly = readonly
+        self._shelf = shelve.open(filename, flag="r" if readonly else "c",
+            protocol=pickle.HIGHEST_PROTOCOL
+        )
+
+        if self._shelf.get("__version__") != self.VERSION:
+            if readonly:
+                self.close()
+                raise ValueError("Stale cache store: %s" % repr(filename))
+
+            debug("Discarding cache store: %s" % repr(filename))
+            self._shelf.clear()
+            self._shelf["__version__"] = self.VERSION
+
+        self._validated = self._shelf.get("__validated__", 0)
+
+    @staticmethod
+    def _key(key):
+        """Shelve keys must be byte strings"""
+        if isinstance(key, unicode):
+            return key.encode("utf-8")
+        return key
+
+    def expired(self, stamp):
+        """Returns True if a value stored at 'stamp' has expired"""
+        if self._ttl is None:
+            return False
+
+        return bool(time.time() - max(stamp, self._validated) > self._ttl)
+
+    @property
+    def validated(self):
+        """The time the store was last validated, or 0 if it never was"""
+        return self._validated
+
+    def validate(self):
+        """Renews every value in the store as though it were just stored"""
+        self._validated = time.time()
+        self._shelf["__validated__"] = self._validated
+
+    def get(self, key):
+        """Retrieves a value from the store, or None if absent or expired"""
+        record = self.stamped(key)
+        if record is None:
+            return None
+
+        return record[1]
+
+    def stamped(self, key):
+        """
+        Like 'get', but returns a tuple of the time the value was stored and
+        the value, or None if absent or expired.
+        """
+        key = self._key(key)
+
+        record = self._shelf.get(key)
+        if record is None:
+            return None
+
+        if self.expired(record[0]):
+            debug("Expired cache entry: %s" % repr(key))
+            if not self._readonly:
+                del self._shelf[key]
+            return None
+
+        return record
+
+    def put(self, key, val):
+        """Places a value in the store"""
+        self._shelf[self._key(key)] = (time.time(), val)
+
+    def clear(self, key):
+        """Removes a value from the store"""
+        key = self._key(key)
+        if self._shelf.has_key(key):
+            del self._shelf[key]
+
+    def keys(self):
+        """Returns all keys held in the store"""
+        return [
+            key for key in self._shelf.keys()
+            if key not in ("__version__", "__validated__")
+        ]
+
+    def close(self):
+        """Flushes and closes the store"""
+        if self._shelf is not None:
+            self._shelf.close()
+            self._shelf = None
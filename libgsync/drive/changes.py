@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the replay of the Google Drive changes feed into the persistent
+path cache, so that cached metadata stays valid between runs without
+having to list the remote tree again.
+"""
+
+from __future__ import absolute_import
+
+from libgsync.output import debug
+from libgsync.drive.file import FILE_FIELDS
+from libgsync.drive.retry import DriveRetryPolicy
+
+
+class DriveChangeFeed(object):
+    """
+    Replays the changes made to the Drive since the position recorded in
+    the cache store by the previous run, and records the new position.
+    """
+
+    POSITION_KEY = "__change_id__"
+    FIELDS = ",".join([
+        "largestChangeId",
+        "nextPageToken",
+        "items(fileId,deleted,file(%s,labels(trashed)))" % FILE_FIELDS,
+    ])
+
+    def __init__(self, drive, store, pcache):
+        self._drive = drive
+        self._store = store
+        self._pcache = pcache
+
+    def position(self):
+        """Returns the change ID recorded by the previous run, or None"""
+        return self._store.get(self.POSITION_KEY)
+
+    def _largest_change_id(self):
+        """Returns the current largest change ID of the Drive"""
+        with self._drive.service() as service:
+            about = self._drive.execute(
+                service.about().get(fields="largestChangeId")
+            )
+            return long(about['largestChangeId'])
+
+    def _replay_from(self, start):
+        """
+        Applies each change made since the 'start' change ID, returning the
+        largest change ID of the Drive.
+        """
+        param = {
+            'startChangeId': start,
+            'includeDeleted': True,
+            'includeSubscribed': True,
+            'maxResults': 1000,
+            'fields': self.FIELDS,
+        }
+
+        count, largest = 0, start - 1
+        with self._drive.service() as service:
+            while True:
+                debug("Listing changes: %s" % repr(param))
+
+                res = self._drive.execute(service.changes().list(**param))
+                for change in res.get('items', []):
+                    self._apply(change)
+                    count += 1
+
+                largest = long(res.get('largestChangeId', largest))
+                param['pageToken'] = res.get('nextPageToken')
+                if not param['pageToken']:
+                    break
+
+        debug("Replayed %d changes since %d" % (count, start))
+        return largest
+
+    def _apply(self, change):
+        """Applies a single change to the path cache"""
+        file_id = change.get('fileId')
+        info = change.get('file')
+
+        paths = self._pcache.paths(file_id)
+        if not paths:
+            return
+
+        removed = change.get('deleted') or info is None or \
+            info.get('labels', {}).get('trashed', False)
+
+        if not removed:
+            # Metadata changes are applied in place, but a file that has
+            # been renamed or moved is dropped along with anything beneath
+            # it, to be looked up again when it is next needed.
+            old = self._pcache.get(paths[0]) or {}
+
+            def parent_ids(ent):
+                """Returns the set of parent IDs of an entity"""
+                return set([ p.get('id') for p in ent.get('parents', []) ])
+
+            if old.get('title') == info.get('title') and \
+                parent_ids(old) == parent_ids(info):
+
+                debug("Updating changed file: %s" % repr(paths))
+                for path in paths:
+                    self._pcache.put(path, info)
+                return
+
+        debug("Invalidating changed file: %s" % repr(paths))
+        self._pcache.clear_id(file_id)
+
+    def _discard(self):
+        """Discards all of the cached metadata"""
+        debug("Discarding cached metadata")
+        for key in self._store.keys():
+            self._store.clear(key)
+
+    def replay(self):
+        """
+        Applies all changes since the recorded position and records the
+        new position.  If there is no position to replay from, or the Drive
+        refuses to replay from it, the cached metadata can no longer be
+        trusted and is discarded.  Should the changes be unavailable for
+        the time being, such as when the Drive cannot be reached, the
+        replay is skipped and the cached metadata is kept, to be trusted
+        only until it expires.  Returns True if the changes were replayed.
+        """
+        start = self.position()
+
+        try:
+            if start is None:
+                self._discard()
+                largest = self._largest_change_id()
+            else:
+                largest = self._replay_from(start + 1)
+
+        except Exception, ex:
+            if DriveRetryPolicy().retryable(ex):
+                debug("Skipping replay of changes: %s" % repr(ex))
+                return False
+
+            debug("Failed to replay changes: %s" % repr(ex))
+
+            self._discard()
+            return False
+
+        self._store.put(self.POSITION_KEY, largest)
+        return True
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the sizing of the chunks that resumable uploads are sent in, which
+may be fixed or adapted to the throughput and reliability of the link.
+"""
+
+from __future__ import absolute_import
+
+from apiclient.http import MediaUpload
+from libgsync.output import debug
+
+# The Drive requires every chunk but the last to be a multiple of 256K.
+CHUNK_UNIT = 256 * 1024
+
+
+def round_chunk_size(size):
+    """Returns a chunk size rounded to the nearest multiple of CHUNK_UNIT"""
+    units = int(round(float(size) / CHUNK_UNIT))
+    return max(1, units) * CHUNK_UNIT
+
+
+class DriveChunkSizer(object):
+    """
+    Decides the size of the next chunk of a resumable upload.  The size is
+    fixed, unless 'adaptive' is given, in which case it is grown towards the
+    number of bytes that the measured throughput sends in 'target' seconds,
+    at most doubling per chunk, and halved whenever a chunk fails to be
+    sent.  While the recent failure rate exceeds 'max_error_rate', the size
+    is not grown, so that a flaky link resends little when it drops.
+    """
+
+    # The weight given to the latest chunk in the running failure rate.
+    ERROR_WEIGHT = 0.25
+
+    def __init__(self, size=CHUNK_UNIT * 4, adaptive=False, target=5.0,
+        min_size=CHUNK_UNIT, max_size=CHUNK_UNIT * 400, max_error_rate=0.1):
+
+        self.adaptive = adaptive
+        self.target = float(target)
+        self.min_size = round_chunk_size(min_size)
+        self.max_size = max(self.min_size, round_chunk_size(max_size))
+        self.max_error_rate = max_error_rate
+        self.error_rate = 0.0
+        self.chunks = 0
+        self.failures = 0
+
+        size = round_chunk_size(size)
+        if adaptive:
+            size = self._clamp(size)
+
+        self.size = size
+
+    def _clamp(self, size):
+        """Returns a size within the bounds of the sizer"""
+        return min(self.max_size, max(self.min_size, size))
+
+    def _observe(self, failed):
+        """Updates the running failure rate with the outcome of a chunk"""
+        self.error_rate += self.ERROR_WEIGHT * (float(failed) - self.error_rate)
+
+    def sent(self, nbytes, seconds):
+        """Records a chunk of 'nbytes' that took 'seconds' to send"""
+        self.chunks += 1
+        self._observe(False)
+
+        if not self.adaptive or nbytes <= 0:
+            return
+
+        # The last chunk of an upload is usually short, and says little
+        # about the throughput that larger chunks would achieve.
+        if nbytes < self.size:
+            return
+
+        ideal = self.target * nbytes / max(seconds, 0.001)
+        size = min(round_chunk_size(ideal), self.size * 2)
+
+        if size > self.size and self.error_rate > self.max_error_rate:
+            return
+
+        size = self._clamp(max(size, self.size // 2))
+        if size != self.size:
+            debug("Chunk size: %d -> %d (%.0f bytes/s)" % (
+                self.size, size, nbytes / max(seconds, 0.001)
+            ))
+
+        self.size = size
+
+    def failed(self):
+        """Records a chunk that failed to be sent"""
+        self.chunks += 1
+        self.failures += 1
+        self._observe(True)
+
+        if not self.adaptive:
+            return
+
+        size = self._clamp(round_chunk_size(self.size // 2))
+        if size != self.size:
+            debug("Chunk size: %d -> %d (failed)" % (self.size, size))
+
+        self.size = size
+
+
+class DriveSizedUpload(MediaUpload):
+    """
+    The media of a resumable upload, sent in chunks of the size decided by
+    a DriveChunkSizer.  The uploader asks the media for its chunk size as
+    each chunk is sent, so the size may change between chunks.
+    """
+    def __init__(self, media, sizer):
+        self._media = media
+        self._sizer = sizer
+
+    def chunksize(self):
+        return self._sizer.size
+
+    def mimetype(self):
+        return self._media.mimetype()
+
+    def size(self):
+        return self._media.size()
+
+    def resumable(self):
+        return self._media.resumable()
+
+    def getbytes(self, begin, length):
+        return self._media.getbytes(begin, length)
+
+    def has_stream(self):
+        return self._media.has_stream()
+
+    def stream(self):
+        return self._media.stream()
+
+    def __getattr__(self, name):
+        return getattr(self._media, name)
@@ -5,6 +5,19 @@
 
 """Drive file objects"""
 
+# The fields of the Drive file resource that gsync makes use of.  Requests
+# ask for only these fields, keeping responses and the path cache small.
+FILE_FIELDS = ",".join([
+    "id",
+    "title",
+    "mimeType",
+    "modifiedDate",
+    "description",
+    "fileSize",
+    "md5Checksum",
+    "parents(id,isRoot)",
+])
+
 class DriveFile(dict):
     """
     Defines the DriveFile adapter that provides an interface to a
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the in memory index of every folder in the Google Drive, used to
+resolve paths to folders without walking the Drive one level at a time.
+"""
+
+from __future__ import absolute_import
+
+ROOT_ID = "root"
+
+
+def parent_ids(ent):
+    """
+    Returns the IDs of the parents of an entity, with the root of the Drive
+    known by its 'root' alias.
+    """
+    ids = []
+    for parent in ent.get('parents') or []:
+        if parent.get('isRoot'):
+            ids.append(ROOT_ID)
+        else:
+            ids.append(parent.get('id'))
+
+    return ids
+
+
+class DriveFolderIndex(object):
+    """
+    A graph of folder entities keyed by ID, together with the titles of the
+    folders beneath each parent.  Folders beneath the root of the Drive are
+    indexed beneath the 'root' alias, since that is how the root is known
+    until its actual ID is seen.
+    """
+
+    ROOT_ID = ROOT_ID
+
+    def __init__(self, ents=None):
+        self._folders = {}
+        self._children = {}
+
+        for ent in ents or []:
+            self.add(ent)
+
+    def __len__(self):
+        return len(self._folders)
+
+    def add(self, ent):
+        """Adds a folder entity to the index"""
+        folder_id = ent['id']
+        if folder_id in self._folders:
+            self.remove(folder_id)
+
+        self._folders[folder_id] = ent
+
+        for parent_id in parent_ids(ent):
+            titles = self._children.setdefault(parent_id, {})
+            titles.setdefault(ent['title'], []).append(folder_id)
+
+    def remove(self, folder_id):
+        """Removes a folder from the index, if it is indexed"""
+        ent = self._folders.pop(folder_id, None)
+        if ent is None:
+            return
+
+        for parent_id in parent_ids(ent):
+            titles = self._children.get(parent_id, {})
+            ids = titles.get(ent['title'], [])
+
+            if folder_id in ids:
+                ids.remove(folder_id)
+            if not ids:
+                titles.pop(ent['title'], None)
+
+    def get(self, folder_id):
+        """Returns the folder entity with the given ID, or None"""
+        return self._folders.get(folder_id)
+
+    def lookup(self, parent_id, title):
+        """
+        Returns the entity of the folder with the given title beneath the
+        parent folder, or None if there is no such folder.  Where titles
+        are duplicated, the first folder indexed is returned.
+        """
+        ids = self._children.get(parent_id, {}).get(title)
+        if not ids:
+            return None
+
+        return self._folders[ids[0]]
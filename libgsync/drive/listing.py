@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the cache of complete folder listings, which answers whether an
+entity exists in a folder without asking the Drive again.
+"""
+
+from __future__ import absolute_import
+
+import sys
+from collections import OrderedDict
+
+from libgsync.output import debug
+from libgsync.drive.index import parent_ids
+from libgsync.drive.pathcache import _compact, _expand, _sizeof
+
+
+def _unicode(title):
+    """
+    Returns a title as unicode, decoding a byte string as UTF-8, or as
+    latin-1 where it isn't valid UTF-8, as Drive.unicode does.
+    """
+    if isinstance(title, unicode):
+        return title
+
+    try:
+        return title.decode("utf-8")
+    except UnicodeDecodeError:
+        return title.decode("latin-1")
+
+
+class DriveListingCache(object):
+    """
+    The complete listings of folders, keyed by folder ID, each indexing
+    the entities in the folder by title.  A listing is authoritative: a
+    title that isn't in the listing of a folder is not in the folder.  The
+    listings are kept up to date as entities are added to and removed from
+    the folders, and are only held for the folders gsync has listed in
+    full, or has created and so knows to be empty.
+
+    Listings still being fetched in the background may be recorded as
+    expected, until they are collected.  As the fetch may have started
+    before a change to the folder, any change forgets the expected listing.
+
+    Entities are held as compact records.  Given 'max_bytes', the least
+    recently used listings are forgotten to keep the estimated memory held
+    within it, after which those folders are listed again as needed.
+    """
+
+    def __init__(self, max_bytes=None):
+        self._listings = OrderedDict()
+        self._ids = {}
+        self._sizes = {}
+        self._expected = {}
+        self._max_bytes = max_bytes
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._listings)
+
+    @staticmethod
+    def _title(ent):
+        """Returns the title of an entity as unicode"""
+        return _unicode(ent.get('title') or u"")
+
+    @property
+    def size(self):
+        """The estimated bytes of memory held by the listings"""
+        return self._bytes
+
+    @staticmethod
+    def _sizeof(title, record):
+        """Estimates the bytes of memory held by an entity in a listing"""
+        return _sizeof(title, record) + sys.getsizeof(record[0])
+
+    def _touch(self, folder_id):
+        """Marks the listing of a folder as the most recently used"""
+        self._listings[folder_id] = self._listings.pop(folder_id)
+
+    def _resize(self, folder_id, delta):
+        """Accounts for a change in the memory held by a listing"""
+        self._sizes[folder_id] += delta
+        self._bytes += delta
+
+    def _evict(self):
+        """Forgets the least recently used listings, until within bounds"""
+        if self._max_bytes is None:
+            return
+
+        while self._bytes > self._max_bytes and self._listings:
+            folder_id = next(iter(self._listings))
+            debug("Evicting listing of folder: %s" % repr(folder_id), 3)
+            self.discard(folder_id)
+
+    def complete(self, folder_id):
+        """Returns True if the listing of the folder is held"""
+        return folder_id in self._listings
+
+    def set(self, folder_id, ents):
+        """Records the complete listing of a folder"""
+        self.discard(folder_id)
+
+        titles, ids, size = {}, {}, 0
+        for ent in ents:
+            title = self._title(ent)
+            record = _compact(ent)
+            titles.setdefault(title, []).append(record)
+            ids[record[0]] = title
+            size += self._sizeof(title, record)
+
+        self._listings[folder_id] = titles
+        self._ids[folder_id] = ids
+        self._sizes[folder_id] = size
+        self._bytes += size
+
+        self._evict()
+
+    def discard(self, folder_id):
+        """Forgets the listing of a folder, should it no longer be complete"""
+        self._listings.pop(folder_id, None)
+        self._ids.pop(folder_id, None)
+        self._bytes -= self._sizes.pop(folder_id, 0)
+        self._expected.pop(folder_id, None)
+
+    def expect(self, folder_id, fetch):
+        """Records the fetch of the listing of a folder, yet to complete"""
+        self._expected[folder_id] = fetch
+
+    def expecting(self, folder_id):
+        """Returns True if the listing of the folder is being fetched"""
+        return folder_id in self._expected
+
+    def collect(self, folder_id):
+        """
+        Returns the fetch of the listing of a folder, no longer expecting
+        it, or None if the listing isn't being fetched.
+        """
+        return self._expected.pop(folder_id, None)
+
+    def entities(self, folder_id):
+        """
+        Returns the entities in a folder whose listing is complete, ordered
+        by title.
+        """
+        titles = self._listings[folder_id]
+        self._touch(folder_id)
+
+        return [
+            _expand(record) for title in sorted(titles)
+            for record in titles[title]
+        ]
+
+    def lookup(self, folder_id, title):
+        """
+        Returns the entity with the given title in a folder whose listing
+        is complete, or None if there is no such entity.  Where titles are
+        duplicated, the first entity listed is returned.
+        """
+        records = self._listings[folder_id].get(_unicode(title))
+        self._touch(folder_id)
+
+        if not records:
+            return None
+
+        return _expand(records[0])
+
+    def remove(self, ent):
+        """Removes an entity from the listings of its parents"""
+        for parent_id in parent_ids(ent):
+            self._expected.pop(parent_id, None)
+
+            titles = self._listings.get(parent_id)
+            if titles is None:
+                continue
+
+            title = self._ids[parent_id].pop(ent.get('id'), None)
+            if title is None:
+                continue
+
+            records = []
+            for record in titles.get(title, []):
+                if record[0] == ent.get('id'):
+                    self._resize(parent_id, -self._sizeof(title, record))
+                else:
+                    records.append(record)
+
+            if records:
+                titles[title] = records
+            else:
+                titles.pop(title, None)
+
+    def add(self, ent):
+        """
+        Adds an entity to the listings of its parents, replacing any entity
+        listed with the same ID, for example where it has been renamed.
+        """
+        self.remove(ent)
+
+        for parent_id in parent_ids(ent):
+            titles = self._listings.get(parent_id)
+            if titles is not None:
+                title = self._title(ent)
+                record = _compact(ent)
+                titles.setdefault(title, []).append(record)
+                self._ids[parent_id][record[0]] = title
+                self._resize(parent_id, self._sizeof(title, record))
+
+        self._evict()
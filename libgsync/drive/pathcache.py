@@ -0,0 +1,495 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2013-2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the cache of Google Drive entities by path, held in memory as a
+trie of path components and optionally backed by a persistent store.
+"""
+
+from __future__ import absolute_import
+
+import sys
+from collections import OrderedDict
+
+from libgsync.output import debug
+
+
+# The fields held in the compact record of an entity, in record order.  Any
+# other fields are kept in a dictionary at the end of the record.
+RECORD_FIELDS = (
+    "id", "title", "mimeType", "modifiedDate", "description", "fileSize",
+    "md5Checksum", "parents",
+)
+
+PREFIX = "drive://"
+
+
+def _compact(data):
+    """Returns the compact record of an entity"""
+    values = []
+    for field in RECORD_FIELDS:
+        val = data.get(field)
+        if field == "parents" and val is not None:
+            val = tuple([ (p.get('id'), p.get('isRoot')) for p in val ])
+
+        values.append(val)
+
+    # The path of the entity is implied by where it is held.
+    extra = dict([
+        (key, val) for key, val in data.iteritems()
+        if key not in RECORD_FIELDS and key != "path"
+    ])
+    values.append(extra or None)
+
+    return tuple(values)
+
+
+def _expand(record):
+    """Returns the entity held in a compact record"""
+    data = {}
+    for field, val in zip(RECORD_FIELDS, record):
+        if val is None:
+            continue
+
+        if field == "parents":
+            parents = []
+            for parent_id, is_root in val:
+                parent = { 'id': parent_id }
+                if is_root is not None:
+                    parent['isRoot'] = is_root
+                parents.append(parent)
+            val = parents
+
+        data[field] = val
+
+    if record[-1]:
+        data.update(record[-1])
+
+    return data
+
+
+def _sizeof(name, record):
+    """Estimates the bytes of memory held by an entry"""
+    size = sys.getsizeof(name) + sys.getsizeof(record) + _Node.SIZE
+
+    for val in record:
+        if val is None:
+            continue
+
+        size += sys.getsizeof(val)
+        if isinstance(val, tuple):
+            for parent in val:
+                size += sys.getsizeof(parent) + sum([
+                    sys.getsizeof(v) for v in parent
+                ])
+        elif isinstance(val, dict):
+            size += sum([ sys.getsizeof(v) for v in val.itervalues() ])
+
+    return size
+
+
+class _Node(object):
+    """
+    A node of the trie, being one component of a path, which holds the
+    record of the entity at that path, if it is cached.  Nodes holding a
+    record are also linked into the least recently used list.
+    """
+    __slots__ = (
+        "name", "parent", "children", "record", "size", "prev", "next",
+    )
+
+    def __init__(self, name=None, parent=None):
+        self.name = name
+        self.parent = parent
+        self.children = None
+        self.record = None
+        self.size = 0
+        self.prev = self.next = None
+
+    def path(self):
+        """Returns the path of the node"""
+        names = []
+        node = self
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+
+        names.reverse()
+        return PREFIX + u"/".join(names)
+
+# Estimated per node overhead, including its slot in the parent's children.
+_Node.SIZE = sys.getsizeof(_Node()) + 64
+
+
+class DrivePathCache(object):
+    """
+    Defines the Google Drive path caching class.  The cache is held in
+    memory as a trie of path components, each entity as a compact record of
+    its fields.  Given 'max_bytes', the least recently used entries are
+    evicted to keep the estimated memory held by the cache within it.  The
+    cache may optionally be backed by a persistent store, in which case
+    every change is written through to the store and misses in memory are
+    satisfied from it.  Cached paths are also indexed by file ID, so that
+    entries can be found when all that is known is the ID.
+
+    The store also indexes the names held beneath each folder, so that a
+    tree is removed from it without looking at any other keys.  The index
+    of a folder is written through as soon as a name is added to it, and
+    before the entry itself is stored, so that an entry is never held in
+    the store without being indexed, however the run ends.  The indexes of
+    the folders most recently used are also held in memory.
+    """
+
+    # The number of folders whose child indexes are held in memory.
+    CHILD_INDEXES = 64
+
+    def __init__(self, data=None, store=None, max_bytes=None):
+        self.__root = _Node()
+        self.__lru = _Node()
+        self.__lru.prev = self.__lru.next = self.__lru
+        self.__ids = {}
+        self.__store = store
+        self.__children = OrderedDict()
+        self.__max_bytes = max_bytes
+        self.__bytes = 0
+        self.__count = 0
+
+        if data is not None:
+            for key, val in data.iteritems():
+                if isinstance(val, dict):
+                    self.__remember(key, val)
+
+    def __len__(self):
+        return self.__count
+
+    @property
+    def size(self):
+        """The estimated bytes of memory held by the cached entries"""
+        return self.__bytes
+
+    @staticmethod
+    def __components(path):
+        """
+        Returns the normalised components of a path beneath the root of the
+        Drive, or None if it isn't a Drive path.
+        """
+        from libgsync.drive import Drive
+
+        path = Drive().normpath(path)
+        if not path.startswith(PREFIX):
+            return None
+
+        return [
+            Drive.unicode(name) for name in path[len(PREFIX):].split("/")
+            if name
+        ]
+
+    def __find(self, names, create=False):
+        """Returns the node at the path of the components given"""
+        node = self.__root
+        for name in names:
+            children = node.children
+            if children is None or name not in children:
+                if not create:
+                    return None
+
+                if children is None:
+                    children = node.children = {}
+                children[name] = _Node(name, node)
+
+            node = children[name]
+
+        return node
+
+    def __unlink(self, node):
+        """Removes a node from the least recently used list"""
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        node.prev = node.next = None
+
+    def __touch(self, node):
+        """Moves a node to the most recently used end of the list"""
+        if node.prev is not None:
+            self.__unlink(node)
+
+        lru = self.__lru
+        node.prev, node.next = lru.prev, lru
+        lru.prev.next = node
+        lru.prev = node
+
+    def __prune(self, node):
+        """Removes nodes that hold nothing, from the node upwards"""
+        while node.parent is not None and node.record is None \
+            and not node.children:
+
+            del node.parent.children[node.name]
+            node = node.parent
+
+    def __drop(self, node):
+        """Removes the record held by a node, without pruning the node"""
+        if node.record is None:
+            return
+
+        file_id = node.record[0]
+        if file_id is not None:
+            nodes = self.__ids.get(file_id, [])
+            if node in nodes:
+                nodes.remove(node)
+            if not nodes:
+                self.__ids.pop(file_id, None)
+
+        self.__unlink(node)
+        self.__bytes -= node.size
+        self.__count -= 1
+        node.record = None
+        node.size = 0
+
+    def __evict(self):
+        """Evicts the least recently used entries, until within bounds"""
+        if self.__max_bytes is None:
+            return
+
+        lru = self.__lru
+        while self.__bytes > self.__max_bytes and lru.next is not lru:
+            node = lru.next
+            debug("Evicting path cache entry: %s" % repr(node.path()), 3)
+
+            self.__drop(node)
+            self.__prune(node)
+
+    def __remember(self, path, data):
+        """Adds an item to the in memory trie and ID index"""
+        names = self.__components(path)
+        if names is None:
+            return
+
+        node = self.__find(names, create=True)
+        self.__drop(node)
+
+        if not isinstance(data, dict):
+            self.__prune(node)
+            return
+
+        node.record = _compact(data)
+        node.size = _sizeof(node.name, node.record)
+        self.__bytes += node.size
+        self.__count += 1
+        self.__touch(node)
+
+        file_id = node.record[0]
+        if file_id is not None:
+            self.__ids.setdefault(file_id, []).append(node)
+
+        self.__evict()
+
+    def __forget(self, path):
+        """Removes an item from the in memory trie and ID index"""
+        names = self.__components(path)
+        node = None if names is None else self.__find(names)
+
+        if node is not None:
+            self.__drop(node)
+            self.__prune(node)
+
+    def __index(self, file_id, path, add=True):
+        """Adds or removes a path from the ID index of the store"""
+        key = "id:%s" % file_id
+        paths = set(self.__store.get(key) or [])
+
+        if add:
+            paths.add(path)
+        else:
+            paths.discard(path)
+
+        if paths:
+            self.__store.put(key, list(paths))
+        else:
+            self.__store.clear(key)
+
+    @staticmethod
+    def __join(parent, name):
+        """Returns the path of a name held beneath a folder"""
+        if parent == PREFIX:
+            return parent + name
+
+        return parent + u"/" + name
+
+    def __child_index(self, parent):
+        """Returns the set of names held beneath a folder in the store"""
+        names = self.__children.pop(parent, None)
+        if names is None:
+            names = set(self.__store.get(u"dir:%s" % parent) or [])
+
+        self.__children[parent] = names
+
+        while len(self.__children) > self.CHILD_INDEXES:
+            self.__children.popitem(last=False)
+
+        return names
+
+    def __index_child(self, path, add=True):
+        """Adds or removes a path from the child index of its folder"""
+        components = self.__components(path)
+        if not components:
+            return
+
+        parent = PREFIX + u"/".join(components[:-1])
+        names = self.__child_index(parent)
+
+        if add == (components[-1] in names):
+            return
+
+        if add:
+            names.add(components[-1])
+        else:
+            names.discard(components[-1])
+
+        key = u"dir:%s" % parent
+        if names:
+            self.__store.put(key, list(names))
+        else:
+            self.__store.clear(key)
+
+    def put(self, path, data):
+        """Places an item in the path cache"""
+        from libgsync.drive import Drive
+        path = Drive().normpath(path)
+
+        if self.__store is not None:
+            old = self.get(path)
+            if isinstance(old, dict) and old.get('id') is not None:
+                self.__index(old['id'], path, add=False)
+
+            self.__index_child(path)
+            self.__store.put(path, data)
+
+            if isinstance(data, dict) and data.get('id') is not None:
+                self.__index(data['id'], path)
+
+        self.__remember(path, data)
+
+    def get(self, path):
+        """Retrieves an item from the path cache"""
+        names = self.__components(path)
+        node = None if names is None else self.__find(names)
+
+        if node is not None and node.record is not None:
+            self.__touch(node)
+            return _expand(node.record)
+
+        if names is None or self.__store is None:
+            return None
+
+        from libgsync.drive import Drive
+        path = Drive().normpath(path)
+
+        data = self.__store.get(path)
+        if data is not None:
+            self.__remember(path, data)
+
+        return data
+
+    def paths(self, file_id):
+        """Returns all of the cached paths of the file with the given ID"""
+        from libgsync.drive import Drive
+
+        paths = set([ node.path() for node in self.__ids.get(file_id, []) ])
+
+        if self.__store is not None:
+            paths.update([
+                Drive.unicode(path)
+                for path in self.__store.get("id:%s" % file_id) or []
+            ])
+
+        return sorted(paths)
+
+    def clear(self, path):
+        """Removes an item from the path cache"""
+        from libgsync.drive import Drive
+        path = Drive().normpath(path)
+
+        data = self.get(path)
+        self.__forget(path)
+
+        if self.__store is not None:
+            self.__store.clear(path)
+            self.__index_child(path, add=False)
+
+            if isinstance(data, dict) and data.get('id') is not None:
+                self.__index(data['id'], path, add=False)
+
+    def clear_tree(self, path):
+        """
+        Removes an item and everything beneath it from the path cache, at a
+        cost of no more than the number of entries removed.
+        """
+        from libgsync.drive import Drive
+        path = Drive().normpath(path)
+
+        self.clear(path)
+
+        names = self.__components(path)
+        top = None if names is None else self.__find(names)
+
+        if top is not None:
+            stack = [ top ]
+            while stack:
+                node = stack.pop()
+                self.__drop(node)
+                if node.children:
+                    stack.extend(node.children.values())
+
+            if top.parent is not None:
+                del top.parent.children[top.name]
+                self.__prune(top.parent)
+            else:
+                top.children = None
+
+        if self.__store is not None and names is not None:
+            stack = [ PREFIX + u"/".join(names) ]
+            while stack:
+                parent = stack.pop()
+                children = self.__children.pop(parent, None)
+                if children is None:
+                    children = self.__store.get(u"dir:%s" % parent) or []
+
+                self.__store.clear(u"dir:%s" % parent)
+
+                for name in children:
+                    child = self.__join(parent, name)
+                    data = self.__store.get(child)
+                    self.__store.clear(child)
+
+                    if isinstance(data, dict) and data.get('id') is not None:
+                        self.__index(data['id'], child, add=False)
+
+                    stack.append(child)
+
+    def clear_id(self, file_id):
+        """
+        Removes every path of the file with the given ID, and everything
+        beneath them, from the path cache.
+        """
+        for path in self.paths(file_id):
+            self.clear_tree(path)
+
+    def close(self):
+        """Closes the backing store, if there is one"""
+        if self.__store is not None:
+            self.__children.clear()
+            self.__store.close()
+            self.__store = None
+
+    def __repr__(self):
+        data = {}
+        stack = [ self.__root ]
+        while stack:
+            node = stack.pop()
+            if node.record is not None:
+                data[node.path()] = _expand(node.record)
+            if node.children:
+                stack.extend(node.children.values())
+
+        return "DrivePathCache(%s)" % repr(data)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the bounded pool of worker threads used to run Google Drive
+requests concurrently, such as the listing of several folders at once.
+"""
+
+from __future__ import absolute_import
+
+import sys, threading, Queue
+from collections import deque
+
+from libgsync.output import debug
+
+
+class DriveFuture(object):
+    """
+    The pending result of a call submitted to a DriveWorkerPool.  Retrieving
+    the result blocks until the call has completed, re-raising anything the
+    call raised.
+    """
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exc_info = None
+
+    def done(self):
+        """Returns True once the call has completed"""
+        return self._done.is_set()
+
+    def set_result(self, result):
+        """Completes the future with the value returned by the call"""
+        self._result = result
+        self._done.set()
+
+    def set_exception(self, exc_info):
+        """Completes the future with the exception raised by the call"""
+        self._exc_info = exc_info
+        self._done.set()
+
+    def result(self):
+        """Waits for the call to complete and returns its result"""
+        # Waiting without a timeout cannot be interrupted in Python 2.
+        while not self._done.wait(1):
+            pass
+
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+
+        return self._result
+
+
+def spawn(func, *args, **kwargs):
+    """
+    Runs a call in a daemon thread of its own, returning the DriveFuture of
+    its result.  For one off calls that must not wait for a pool worker.
+    """
+    future = DriveFuture()
+
+    def __run():
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception:
+            future.set_exception(sys.exc_info())
+
+    thread = threading.Thread(target=__run, name="DriveSpawn")
+    thread.daemon = True
+    thread.start()
+
+    return future
+
+
+class DriveWorkerPool(object):
+    """
+    A fixed number of daemon threads that run submitted calls in the order
+    they were submitted.  Threads are started on the first submission, so a
+    pool that is never used costs nothing.
+    """
+    def __init__(self, size):
+        self._size = max(1, int(size))
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _start(self):
+        """Starts the worker threads, if not already started"""
+        with self._lock:
+            if self._threads:
+                return
+
+            debug("Starting %d workers" % self._size)
+
+            for i in xrange(self._size):
+                thread = threading.Thread(
+                    target=self._work, name="DriveWorker-%d" % i
+                )
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        """Runs submitted calls until a shutdown sentinel is received"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            future, func, args, kwargs = item
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception:
+                future.set_exception(sys.exc_info())
+
+    def submit(self, func, *args, **kwargs):
+        """Schedules a call, returning the DriveFuture of its result"""
+        self._start()
+
+        future = DriveFuture()
+        self._queue.put((future, func, args, kwargs))
+
+        return future
+
+    def shutdown(self):
+        """Stops the workers once the calls already submitted have run"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+
+            for _ in threads:
+                self._queue.put(None)
+
+        for thread in threads:
+            thread.join()
+
+
+class DriveLookahead(object):
+    """
+    Submits calls to a DriveWorkerPool ahead of their results being taken,
+    keeping no more than 'limit' of them submitted and not yet taken, so
+    that the results held at once are bounded however many calls are
+    queued.  Calls are queued by key and submitted in the order of the
+    queue, more being submitted as results are taken.
+    """
+    def __init__(self, pool, limit):
+        self._pool = pool
+        self._limit = max(1, int(limit))
+        self._order = deque()
+        self._calls = {}
+        self._futures = {}
+
+    def __len__(self):
+        return len(self._futures)
+
+    def add(self, key, func, kwargs, first=False):
+        """
+        Queues a call under 'key', at the front of the queue if 'first' is
+        given, or at the back otherwise.
+        """
+        self._calls[key] = (func, kwargs)
+        if first:
+            self._order.appendleft(key)
+        else:
+            self._order.append(key)
+
+        self._fill()
+
+    def take(self, key):
+        """
+        Returns the DriveFuture of the call queued under 'key', or None if
+        the call hasn't been submitted, in which case it is no longer
+        queued and is left to the caller to make.
+        """
+        self._calls.pop(key, None)
+        future = self._futures.pop(key, None)
+        self._fill()
+
+        return future
+
+    def _fill(self):
+        """Submits queued calls until the limit is reached"""
+        while self._order and len(self._futures) < self._limit:
+            key = self._order.popleft()
+            call = self._calls.pop(key, None)
+            if call is None:
+                continue
+
+            func, kwargs = call
+            self._futures[key] = self._pool.submit(func, **kwargs)
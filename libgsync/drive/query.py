@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the queries answered from the remote metadata held in the
+persistent cache store, without making any requests of the Google Drive.
+"""
+
+from __future__ import absolute_import
+
+import re, fnmatch, calendar, dateutil.parser
+
+from libgsync.drive.file import DriveFile
+from libgsync.drive.mimetypes import MimeTypes
+from libgsync.drive.pathcache import PREFIX
+
+GLOB = re.compile(r'[*?[]')
+
+
+def modified_time(ent):
+    """Returns the modified date of an entity in seconds since the epoch"""
+    date = dateutil.parser.parse(ent['modifiedDate'])
+    if date.tzinfo is not None:
+        return calendar.timegm(date.utctimetuple())
+
+    return calendar.timegm(date.timetuple())
+
+
+class DriveCacheQuery(object):
+    """
+    Lists the entities held in the cache store at, or beneath, a path that
+    may contain glob patterns, optionally filtered by size and modified
+    date.  The store only holds the entities gsync has seen, so the answers
+    are only as complete as the previous runs made them, and only as fresh
+    as the time the store was stored or last validated against the Drive
+    changes feed.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    @property
+    def validated(self):
+        """The time the cached metadata was last validated, or 0"""
+        return self._store.validated
+
+    @staticmethod
+    def _top(pattern):
+        """Returns the part of a path pattern that precedes any globs"""
+        names = pattern[len(PREFIX):].split("/")
+
+        fixed = []
+        for name in names:
+            if GLOB.search(name):
+                break
+            fixed.append(name)
+
+        return PREFIX + "/".join(fixed)
+
+    def _paths(self, top):
+        """Returns the cached paths at or beneath 'top', parents first"""
+        prefix = top.rstrip("/") + "/"
+        paths = []
+
+        for key in self._store.keys():
+            if isinstance(key, str):
+                key = key.decode("utf-8")
+
+            if key == top or key.startswith(prefix):
+                paths.append(key)
+
+        paths.sort(key=lambda path: path[len(PREFIX):].split("/"))
+        return paths
+
+    @staticmethod
+    def _matches(path, pattern):
+        """Returns True if each name in the path matches the pattern"""
+        names, globs = path.split("/"), pattern.split("/")
+        if len(names) != len(globs):
+            return False
+
+        for name, glob in zip(names, globs):
+            if not fnmatch.fnmatchcase(name, glob):
+                return False
+
+        return True
+
+    def _listed(self, path, top, pattern, recursive):
+        """
+        Returns True if the path matches the pattern, or is in a folder that
+        does: directly, or at any depth if 'recursive' is given.
+        """
+        depth = 0
+        while True:
+            if self._matches(path, pattern):
+                return depth <= 1 or recursive
+
+            if path == top or path == PREFIX:
+                return False
+
+            path = path.rsplit("/", 1)[0]
+            if len(path) < len(PREFIX):
+                path = PREFIX
+
+            depth += 1
+
+    def entities(self, pattern, recursive=False, min_size=None,
+        max_size=None, newer=None, older=None):
+        """
+        Yields a tuple of the time each matching entity was cached and its
+        DriveFile, parents before their children.  The entities listed are
+        those matching 'pattern' and the contents of the folders matching
+        it, recursively if 'recursive' is given.  Given any of the size or
+        modified date bounds, in bytes and seconds since the epoch, only the
+        files within them are listed.
+        """
+        if pattern != PREFIX:
+            pattern = pattern.rstrip("/")
+
+        top = self._top(pattern)
+        filtered = not (
+            min_size is None and max_size is None and
+            newer is None and older is None
+        )
+
+        for path in self._paths(top):
+            if not self._listed(path, top, pattern, recursive):
+                continue
+
+            record = self._store.stamped(path)
+            if record is None:
+                continue
+
+            stamp, ent = record
+            if not isinstance(ent, dict):
+                continue
+
+            if filtered:
+                if ent.get('mimeType') == MimeTypes.FOLDER:
+                    continue
+
+                size = int(ent.get('fileSize') or 0)
+                if min_size is not None and size < min_size:
+                    continue
+                if max_size is not None and size > max_size:
+                    continue
+
+                mtime = modified_time(ent)
+                if newer is not None and mtime < newer:
+                    continue
+                if older is not None and mtime > older:
+                    continue
+
+            yield max(stamp, self.validated), DriveFile(ent, path = path)
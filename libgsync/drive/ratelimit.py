@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the client side rate limiting of Google Drive requests, pacing
+them to stay within the request quotas of the Drive rather than having
+requests rejected once a quota is exceeded.
+"""
+
+from __future__ import absolute_import
+
+import time, threading
+
+from libgsync.output import debug
+
+
+class DriveRateLimiter(object):
+    """
+    A token bucket that is refilled at 'rate' tokens per second up to a
+    capacity of 'burst' tokens, shared by all threads.  Each request takes
+    a token, waiting for one if the bucket is empty.  Tokens are reserved
+    before waiting, so that concurrent callers queue up behind each other
+    rather than all waking at once.  The time spent waiting is recorded in
+    'throttled', against the number of requests made to wait.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.time, sleep=time.sleep):
+        self.rate = float(rate)
+        if self.rate <= 0:
+            raise ValueError("Invalid rate: %s" % repr(rate))
+
+        if burst is None:
+            burst = max(1.0, self.rate)
+
+        self.burst = max(1.0, float(burst))
+        self.requests = 0
+        self.throttles = 0
+        self.throttled = 0.0
+
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._stamp = clock()
+
+    def acquire(self, tokens=1):
+        """
+        Takes 'tokens' from the bucket, waiting until they are available,
+        and returns the number of seconds waited.  Requests for more tokens
+        than the bucket holds wait for a full bucket and leave it in debt.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._stamp) * self.rate
+            )
+            self._stamp = now
+
+            needed = min(tokens, self.burst)
+            delay = max(0.0, (needed - self._tokens) / self.rate)
+            self._tokens -= tokens
+
+            self.requests += tokens
+            if delay > 0:
+                self.throttles += 1
+                self.throttled += delay
+
+        if delay > 0:
+            debug("Throttling request for %.3fs" % delay)
+            self._sleep(delay)
+
+        return delay
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the policy by which failed Google Drive requests are retried,
+backing off exponentially between attempts.
+"""
+
+from __future__ import absolute_import
+
+import sys, time, random, socket, httplib, email.utils
+
+try:
+    import simplejson as json
+except ImportError: # pragma: no cover
+    import json
+
+from apiclient.errors import HttpError
+from libgsync.output import debug
+
+
+class DriveRetryPolicy(object):
+    """
+    Retries calls that fail with errors that are expected to go away by
+    themselves, being server errors, rate limiting and connection failures,
+    while anything else is raised straight away.  The delay before each
+    retry grows exponentially with a random jitter, so that concurrent
+    callers do not retry in step, unless the server has asked for a longer
+    delay with a Retry-After header.  A call is given up on once it has
+    been attempted 'attempts' times, or would have been delayed by more
+    than 'max_delay' seconds in total.
+    """
+
+    RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+    # Reasons given by the Drive for 403 errors that are only temporary.
+    RETRYABLE_REASONS = (
+        "rateLimitExceeded", "userRateLimitExceeded", "backendError",
+    )
+
+    def __init__(self, attempts=6, base=1.0, cap=32.0, max_delay=300.0,
+        sleep=time.sleep, rand=random.random):
+
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._rand = rand
+
+    @staticmethod
+    def _reasons(ex):
+        """Returns the reasons given in the content of an HttpError"""
+        try:
+            error = json.loads(ex.content)['error']
+            return [ err.get('reason') for err in error.get('errors', []) ]
+        except Exception:
+            return []
+
+    def retryable(self, ex):
+        """Returns True if the call that raised 'ex' should be retried"""
+        if isinstance(ex, HttpError):
+            status = int(ex.resp.status)
+
+            if status in self.RETRYABLE_STATUSES:
+                return True
+
+            if status == 403:
+                for reason in self._reasons(ex):
+                    if reason in self.RETRYABLE_REASONS:
+                        return True
+
+            return False
+
+        return isinstance(ex, (socket.error, httplib.HTTPException))
+
+    @staticmethod
+    def retry_after(ex):
+        """
+        Returns the seconds to wait as given by the Retry-After header of
+        the response that raised 'ex', or None.
+        """
+        resp = getattr(ex, "resp", None)
+        if resp is None or not hasattr(resp, "get"):
+            return None
+
+        value = resp.get("retry-after")
+        if value is None:
+            return None
+
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+
+        date = email.utils.parsedate_tz(value)
+        if date is None:
+            return None
+
+        return max(0.0, email.utils.mktime_tz(date) - time.time())
+
+    def backoff(self, attempt):
+        """
+        Returns the delay before retrying after the given number of failed
+        attempts, with full jitter.
+        """
+        return self._rand() * min(self.cap, self.base * (2 ** attempt))
+
+    def delay(self, ex, attempt, waited):
+        """
+        Returns the seconds to wait before retrying a call that has raised
+        'ex' on its 'attempt'th attempt, counting from zero, having already
+        waited for 'waited' seconds; or None if it should not be retried.
+        """
+        if attempt + 1 >= self.attempts or not self.retryable(ex):
+            return None
+
+        delay = self.backoff(attempt)
+
+        retry_after = self.retry_after(ex)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        if waited + delay > self.max_delay:
+            debug("Retry delay exceeded: %.1fs" % (waited + delay))
+            return None
+
+        return delay
+
+    def wait(self, delay):
+        """Waits before a retry"""
+        self._sleep(delay)
+
+    def call(self, func, *args, **kwargs):
+        """Calls 'func', retrying it according to the policy"""
+        attempt, waited = 0, 0.0
+
+        while True:
+            try:
+                return func(*args, **kwargs)
+
+            except Exception, ex:
+                exc_info = sys.exc_info()
+
+                delay = self.delay(ex, attempt, waited)
+                if delay is None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+
+                debug("Retrying in %.1fs after: %s" % (delay, repr(ex)))
+
+                self.wait(delay)
+                waited += delay
+                attempt += 1
+
+    def execute(self, request):
+        """Executes an API request, retrying it according to the policy"""
+        return self.call(request.execute)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the persistent record of resumable upload sessions, so that an
+upload interrupted in one run of gsync can be continued by the next.
+"""
+
+from __future__ import absolute_import
+
+import os, hashlib, tempfile
+
+try:
+    import simplejson as json
+except ImportError: # pragma: no cover
+    import json
+
+from libgsync.output import debug
+
+
+class DriveUploadSessions(object):
+    """
+    Records the session URI of each resumable upload in progress and the
+    offset up to which the Drive has confirmed receiving its content, one
+    file per upload in 'directory'.  Uploads are identified by a dictionary
+    describing both the destination and the content being sent, such that
+    a session is only resumed to send the very same content to the very
+    same place.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @staticmethod
+    def _key(identity):
+        """Returns the canonical form of the identity of an upload"""
+        return json.dumps(identity, sort_keys=True)
+
+    def _filename(self, identity):
+        """Returns the file holding the session of an upload"""
+        digest = hashlib.sha1(self._key(identity)).hexdigest()
+        return os.path.join(self.directory, "%s.json" % digest)
+
+    def get(self, identity):
+        """
+        Returns the session URI and confirmed offset of an upload, or None
+        if no session of the upload was recorded.
+        """
+        filename = self._filename(identity)
+
+        try:
+            with open(filename, "r") as fd:
+                record = json.load(fd)
+
+        except IOError:
+            return None
+
+        except ValueError, ex:
+            debug("Discarding unreadable upload session: %s" % repr(ex))
+            self.clear(identity)
+            return None
+
+        if record.get('identity') != json.loads(self._key(identity)):
+            return None
+
+        return record['uri'], int(record['offset'])
+
+    def put(self, identity, uri, offset):
+        """Records the session URI and confirmed offset of an upload"""
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory, 0700)
+
+        record = {
+            'identity': identity, 'uri': uri, 'offset': offset,
+        }
+
+        # Replace the record in one step, so that an interruption never
+        # leaves a partly written record behind.
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as tmp:
+                json.dump(record, tmp)
+
+            os.rename(tmpname, self._filename(identity))
+
+        except Exception:
+            os.unlink(tmpname)
+            raise
+
+    def clear(self, identity):
+        """Forgets the session of an upload"""
+        try:
+            os.unlink(self._filename(identity))
+        except OSError:
+            pass
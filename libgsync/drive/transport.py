@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Defines the HTTP transport to the Google Drive, being a pool of persistent
+connections that are leased to threads for the duration of a request, so
+that connections, along with their TCP and TLS setup, are reused.
+"""
+
+from __future__ import absolute_import
+
+import time, threading
+from contextlib import contextmanager
+
+import httplib2
+
+from libgsync.output import debug
+
+
+class DriveTransportStats(object):
+    """Counts the use made of the transports of a DriveTransportPool"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.transports = 0
+        self.leases = 0
+        self.waits = 0
+        self.requests = 0
+        self.connections = 0
+
+    def record(self, name, count=1):
+        """Adds to one of the counters"""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    @property
+    def reused(self):
+        """The number of requests sent over an existing connection"""
+        return max(0, self.requests - self.connections)
+
+    def __repr__(self): # pragma: no cover
+        return "DriveTransportStats(%s)" % repr(self.__dict__)
+
+
+class DriveHttp(httplib2.Http):
+    """
+    An httplib2.Http object that records each request it sends, and each
+    connection it has to open to send one, in a DriveTransportStats.
+    """
+    def __init__(self, stats, *args, **kwargs):
+        super(DriveHttp, self).__init__(*args, **kwargs)
+        self._stats = stats
+
+    def _conn_request(self, conn, *args, **kwargs):
+        # Every request is sent through here, with the connection that is
+        # to carry it, which is only connected if it isn't kept alive.
+        self._stats.record("requests")
+        if getattr(conn, "sock", None) is None:
+            self._stats.record("connections")
+
+        return super(DriveHttp, self)._conn_request(conn, *args, **kwargs)
+
+
+class DriveTransportPool(object):
+    """
+    A pool of up to 'size' transports, each being an (http, service) pair
+    created by 'factory', which is passed the stats of the pool.  A thread
+    leases a transport for as long as it needs one; nested leases by the
+    same thread share it.  The most recently used transport is leased first,
+    since its connections are the most likely to still be alive, while the
+    connections of a transport left idle for more than 'max_idle' seconds
+    are closed rather than risk reusing connections closed by the server.
+    """
+
+    def __init__(self, factory, size, max_idle=None):
+        self._factory = factory
+        self._size = max(1, int(size))
+        self._max_idle = max_idle
+        self._idle = []
+        self._count = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self.stats = DriveTransportStats()
+
+    def __len__(self):
+        return self._count
+
+    def _acquire(self):
+        """Takes an idle transport, creating one if the pool isn't full"""
+        with self._cond:
+            if not self._idle and self._count >= self._size:
+                debug("Waiting for a transport")
+                self.stats.record("waits")
+
+                while not self._idle and self._count >= self._size:
+                    self._cond.wait(1)
+
+            if self._idle:
+                released, transport = self._idle.pop()
+
+                if self._max_idle is not None and \
+                    time.time() - released > self._max_idle:
+                    debug("Closing idle connections")
+                    self._disconnect(transport)
+
+                return transport
+
+            self._count += 1
+
+        try:
+            transport = self._factory(self.stats)
+        except Exception:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+
+        self.stats.record("transports")
+        return transport
+
+    @staticmethod
+    def _disconnect(transport):
+        """Closes the persistent connections of a transport"""
+        http = transport[0]
+
+        for conn in getattr(http, "connections", {}).values():
+            conn.close()
+
+    def _release(self, transport):
+        """Returns a transport to the pool"""
+        with self._cond:
+            self._idle.append((time.time(), transport))
+            self._cond.notify()
+
+    @contextmanager
+    def lease(self):
+        """Leases a transport to the calling thread, yielding its service"""
+        transport = getattr(self._local, "transport", None)
+        if transport is not None:
+            yield transport[1]
+            return
+
+        transport = self._acquire()
+        self.stats.record("leases")
+        self._local.transport = transport
+
+        try:
+            yield transport[1]
+        finally:
+            self._local.transport = None
+            self._release(transport)
+
+    def close(self):
+        """Closes the connections of every idle transport"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+
+        for _, transport in idle:
+            self._disconnect(transport)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf8 -*-
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+"""
+Lister module which provides the --list-only listing of local and remote
+file systems, without synchronising anything.
+"""
+
+import os, sys, time, stat
+from libgsync.output import verbose, debug
+from libgsync.options import GsyncOptions, parse_size, parse_time
+from libgsync.drive import Drive
+from libgsync.drive.mimetypes import MimeTypes
+from libgsync.sync.file import SyncFileInfo
+
+
+def filemode(mode):
+    """
+    Returns the 'ls -l' style string of the type and permissions in a
+    stat mode, such as 'drwxr-xr-x'.
+    """
+    if stat.S_ISDIR(mode):
+        kind = "d"
+    elif stat.S_ISLNK(mode):
+        kind = "l"
+    else:
+        kind = "-"
+
+    perms = [ "-" ] * 9
+    for i, char in enumerate("rwxrwxrwx"):
+        if mode & (0400 >> i):
+            perms[i] = char
+
+    return kind + "".join(perms)
+
+
+def format_entry(mode, size, mtime, name):
+    """Returns the rsync --list-only style line of an entry"""
+    return u"%10s %11d %s %s\n" % (
+        filemode(mode), size,
+        time.strftime("%Y/%m/%d %H:%M:%S", time.localtime(mtime)),
+        Drive.unicode(name)
+    )
+
+
+class Lister(object):
+    """
+    Lister class that lists the files at a local or remote path in the
+    style of 'rsync --list-only'.  Each line is written as soon as the
+    entry is known, straight from the folder listings in the case of the
+    Drive, so nothing is stat'd one file at a time and the memory used does
+    not grow with the number of files listed.
+    """
+    def __init__(self, src):
+        self._drive = Drive()
+
+        if self._drive.is_drivepath(src):
+            self._src = self._drive.normpath(src)
+            base = self._drive.strippath(src)
+        else:
+            self._src = os.path.normpath(src)
+            base = self._src
+
+        # As with rsync, a trailing slash lists the contents of a directory
+        # relative to the directory itself, rather than its parent.
+        if src[-1] != "/":
+            base = os.path.dirname(base)
+
+        self._base = base or os.curdir
+
+        self._files = 0
+        self._bytes = 0
+        self._stamp = None
+
+    def _entry(self, ent):
+        """Returns the mode, size, mtime and name of a remote entity"""
+        info = SyncFileInfo(**ent)
+        mode, mtime = None, None
+
+        # Files not uploaded by gsync have no stat info in the description.
+        st_info = info.statInfo
+        if st_info is not None:
+            mode, mtime = st_info.st_mode, st_info.st_mtime
+
+        if not mode:
+            if info.mimeType == MimeTypes.FOLDER:
+                mode = stat.S_IFDIR | 0755
+            else:
+                mode = stat.S_IFREG | 0644
+
+        mtime = mtime or int(info.modifiedDate)
+        name = self._relative(self._drive.strippath(info.path))
+
+        return mode, info.fileSize, mtime, name
+
+    def _remote_entries(self):
+        """Yields the mode, size, mtime and name of each remote entry"""
+        walker = self._drive.scan(self._src, bool(GsyncOptions.recursive))
+
+        for ent in walker:
+            yield self._entry(ent)
+
+    def _cached_entries(self):
+        """
+        Yields the mode, size, mtime and name of each remote entry held in
+        the metadata cached by previous runs, keeping count of the files
+        and bytes listed and the time of the oldest metadata.
+        """
+        ttl = GsyncOptions.cache_ttl
+        query = self._drive.cache_query(None if ttl is None else int(ttl))
+        if query is None:
+            raise IOError("No cached metadata to list")
+
+        bounds = {}
+        for option, parse in [
+            ("min_size", parse_size), ("max_size", parse_size),
+            ("newer", parse_time), ("older", parse_time),
+        ]:
+            value = getattr(GsyncOptions, option)
+            if value is not None:
+                bounds[option] = parse(value)
+
+        entities = query.entities(
+            self._src, bool(GsyncOptions.recursive), **bounds
+        )
+
+        for stamp, ent in entities:
+            if self._stamp is None or stamp < self._stamp:
+                self._stamp = stamp
+
+            if ent.mimeType != MimeTypes.FOLDER:
+                self._files += 1
+                self._bytes += int(ent.fileSize or 0)
+
+            yield self._entry(ent)
+
+    def _local_entries(self):
+        """Yields the mode, size, mtime and name of each local entry"""
+        top = self._src
+        paths = [ top ]
+
+        if os.path.isdir(top):
+            if GsyncOptions.recursive:
+                paths = self._local_walk(top)
+            else:
+                names = sorted(os.listdir(top))
+                paths = [ top ] + [ os.path.join(top, n) for n in names ]
+
+        for path in paths:
+            st_info = os.lstat(path)
+            name = self._relative(path)
+            if stat.S_ISLNK(st_info.st_mode):
+                name = "%s -> %s" % (name, os.readlink(path))
+
+            yield st_info.st_mode, st_info.st_size, st_info.st_mtime, name
+
+    @staticmethod
+    def _local_walk(top):
+        """Yields the paths of a local directory and everything beneath it"""
+        yield top
+
+        for dirpath, dirs, files in os.walk(top):
+            dirs.sort()
+            for name in sorted(dirs + files):
+                yield os.path.join(dirpath, name)
+
+    def _relative(self, path):
+        """Returns the name of an entry as listed, relative to the base"""
+        return os.path.relpath(path, self._base)
+
+    def run(self):
+        """
+        Writes the listing to stdout.  Returns True if the listing was
+        written in full, or False if it failed, having written the error.
+        """
+        debug("Listing: %s" % repr(self._src))
+
+        cached = GsyncOptions.cached and self._drive.is_drivepath(self._src)
+
+        if cached:
+            entries = self._cached_entries()
+        elif self._drive.is_drivepath(self._src):
+            entries = self._remote_entries()
+        else:
+            entries = self._local_entries()
+
+        try:
+            for mode, size, mtime, name in entries:
+                sys.stdout.write(format_entry(mode, size, mtime, name))
+
+        except KeyboardInterrupt, ex:
+            print("\nInterrupted")
+            raise
+
+        except Exception, ex:
+            debug.exception(ex)
+            print("Error: %s" % repr(ex))
+            return False
+
+        if cached:
+            self._print_cached_stats()
+
+        return True
+
+    def _print_cached_stats(self):
+        """Prints the totals listed and how old the cached metadata is"""
+        if self._stamp is None:
+            age = "unknown"
+        else:
+            age = "%d seconds" % max(0, time.time() - self._stamp)
+
+        if GsyncOptions.stats:
+            print("Number of files: %d" % self._files)
+            print("Total file size: %d bytes" % self._bytes)
+            print("Cached metadata age: %s" % age)
+        else:
+            verbose("cached metadata age: %s" % age)
@@ -53,7 +53,9 @@ static singlton values.
 So this actually means that GsyncOptions is actually a static proxy class...
 """
 
-__all__ = [ "GsyncOptions" ]
+import re
+
+__all__ = [ "GsyncOptions", "parse_size", "parse_time" ]
 
 class Options(object):
     """The actual class where the options data are stored."""
@@ -128,3 +130,37 @@ class GsyncOptionsType(GsyncListOptionsType):
 class GsyncOptions(object):
     """A singlton abstract proxy class for accessing options."""
     __metaclass__ = GsyncOptionsType
+
+
+def parse_size(value):
+    """
+    Parses a size given on the command line, being a number of bytes with
+    an optional K, M or G suffix for multiples of 1024, into bytes.
+    """
+    match = re.match(r'^\s*(\d+(?:\.\d*)?)\s*([KMG]?)B?\s*$', str(value), re.I)
+    if match is None:
+        raise ValueError("Invalid size: %s" % repr(value))
+
+    number, suffix = match.groups()
+    scale = 1024 ** " KMG".index(suffix.upper() or " ")
+
+    return int(float(number) * scale)
+
+
+def parse_time(value):
+    """
+    Parses a date and time given on the command line, such as 2014-05-10
+    or "2014-05-10 12:34:56", into seconds since the epoch.  Times without
+    a time zone are taken to be local.
+    """
+    import time, calendar, dateutil.parser
+
+    try:
+        date = dateutil.parser.parse(str(value))
+    except (ValueError, OverflowError):
+        raise ValueError("Invalid time: %s" % repr(value))
+
+    if date.tzinfo is not None:
+        return calendar.timegm(date.utctimetuple())
+
+    return int(time.mktime(date.timetuple()))
@@ -17,15 +17,17 @@ The only functional difference is that gsync is intended to be used for
 synchronising between a source directory and remote Google Drive directory.
 
 Usage:
- gsync [--debug] ( --authenticate | [options]... <path> <path>... )
+ gsync [--debug] ( --authenticate | [options]... <path>... )
 
 Arguments:
  <path>                      path to a local file, directory, remote file or 
                              remote directory.  The last argument in the list
                              of provided paths is considered the destination.
                              The destination must be specified along with at
-                             least one source.  If a source or destination is
-                             remote, then it must be specified in the form:
+                             least one source, unless a single source is to
+                             be listed, as with --list-only.  If a source or
+                             destination is remote, then it must be specified
+                             in the form:
 
                                 drive:///some/folder
 
@@ -82,12 +84,43 @@ Options:
      --max-delete=NUM        don't delete more than NUM files
      --max-size=SIZE         don't transfer any file larger than SIZE
      --min-size=SIZE         don't transfer any file smaller than SIZE
-     --partial               keep partially transferred files
-     --partial-dir=DIR       put a partially transferred file into DIR
+     --partial               keep the sessions of partially transferred files,
+                             to continue them on the next run
+     --resumable-threshold=SIZE
+                             upload files larger than SIZE a piece at a time,
+                             and smaller files in a single request
+                             (default: 5M)
+     --chunk-size=SIZE       send those pieces SIZE at a time, rounded to a
+                             multiple of 256K, or 'auto' to size them to the
+                             throughput and errors measured as they are sent
+     --partial-dir=DIR       keep those sessions in DIR, relative to the
+                             configuration directory (default: partial)
      --delay-updates         put all updated files into place at transfer's end
  -m, --prune-empty-dirs      prune empty directory chains from the file-list
      --timeout=SECONDS       set I/O timeout in seconds
      --contimeout=SECONDS    set daemon connection timeout in seconds
+     --cache-ttl=SECONDS     keep remote metadata cached between runs, kept
+                             current from the Drive changes feed, discarding
+                             it if not validated within SECONDS
+     --cache-memory=SIZE     hold no more than SIZE of remote metadata in memory
+                             (default: 128M)
+     --folder-index          index all remote folders up front and resolve
+                             remote paths from the index
+     --snapshot              list the whole Drive up front and serve remote
+                             walks and lookups from the snapshot
+     --list-workers=NUM      list up to NUM remote folders at once while
+                             walking the Drive (default: 4)
+     --max-connections=NUM   keep up to NUM persistent connections to the Drive
+                             (default: 8)
+     --max-idle=SECONDS      close connections to the Drive left idle for more
+                             than SECONDS, rather than reuse them (default: 60)
+     --max-qps=RATE          pace requests to the Drive to RATE per second
+     --qps-burst=NUM         allow bursts of up to NUM requests above the paced
+                             rate (default: RATE)
+     --discovery-ttl=SECONDS
+                             reuse the cached Drive API description for up to
+                             SECONDS before downloading it again (default: one
+                             day)
  -I, --ignore-times          don't skip files that match in size and mod-time
      --size-only             skip files that match in size
      --modify-window=NUM     compare mod-times with reduced accuracy
@@ -116,6 +149,11 @@ Options:
      --log-file=FILE         log what we're doing to the specified FILE
      --log-file-format=FMT   log updates using the specified FMT
      --list-only             list the files instead of copying them
+     --cached                list remote files from the metadata cached with
+                             --cache-ttl, without contacting the Drive
+     --newer=DATE            with --cached, only list files modified since DATE
+     --older=DATE            with --cached, only list files modified before
+                             DATE; --min-size and --max-size also apply
      --bwlimit=KBPS          limit I/O bandwidth; KBytes per second
      --version               print version number
      --proxy                 use http_proxy or https_proxy environment
@@ -134,4 +172,11 @@ Environment variables:
    non-alphanumeric character in the filename with an underscore and adding
    the GSYNC_ prefix.  For example, to override the client.json configuration
    file, specify an environment variable named GSYNC_CLIENT_JSON.
+
+   Remote metadata cached with --cache-ttl is stored in the pcache file in
+   the configuration directory, which can be overridden with GSYNC_PCACHE.
+
+   The Drive API description is cached in the discovery.json file in the
+   configuration directory, which can be overridden with
+   GSYNC_DISCOVERY_JSON.
 """
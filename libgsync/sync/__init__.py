@@ -311,13 +311,17 @@ class Sync(object):
             verbose(rel_path)
 
         try:
+            attrs_updated = False
+
             if action & CREATE:
                 self.dst.create(dst_path, src_file)
 
             elif action & UPDATE_DATA:
-                self.dst.update_data(dst_path, src_file)
+                attrs_updated = self.dst.update_data(
+                    dst_path, src_file, bool(action & UPDATE_ATTRS)
+                )
 
-            if action & UPDATE_ATTRS:
+            if action & UPDATE_ATTRS and not attrs_updated:
                 self.dst.update_attrs(dst_path, src_file)
 
         finally:
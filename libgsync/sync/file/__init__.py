@@ -26,7 +26,12 @@ except ImportError: # pragma: no cover
 
 from libgsync.output import verbose, debug, itemize
 from libgsync.drive.mimetypes import MimeTypes
-from libgsync.options import GsyncOptions
+from libgsync.options import GsyncOptions, parse_size
+
+# Files up to this size are uploaded with their metadata in a single
+# multipart request, saving larger files to be uploaded by the resumable
+# protocol, which costs a request of its own to start the session.
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024
 
 
 class EUnknownSourceType(Exception): # pragma: no cover
@@ -306,6 +311,21 @@ class SyncFile(object):
         debug("Joining: %s with %s" % (repr(self._path), repr(path)))
         return os.path.join(self._path, path)
 
+    @staticmethod
+    def resumable(file_size):
+        """Returns True if a file of the given size is to be uploaded by the
+        resumable protocol, rather than in a single request.
+
+        @param {long} file_size
+        """
+        threshold = GsyncOptions.resumable_threshold
+        if threshold is None:
+            threshold = RESUMABLE_THRESHOLD
+        else:
+            threshold = parse_size(threshold)
+
+        return bool(file_size > threshold)
+
     def get_uploader(self, path = None): # pragma: no cover
         """Returns the uploader (e.g. MediaUpload) for synchronisation.
 
@@ -348,7 +368,30 @@ class SyncFile(object):
         """Pure virtual function"""
         raise NotImplementedError
 
+    def _create_file_data(self, path, src, attrs):
+        """Creates a file with its data and attributes in a single step.
+        Returns False where the file must instead be created, written and
+        have its attributes updated one step at a time.
+        """
+        return False
+
+    def _create_dir_attrs(self, path, src, attrs):
+        """Creates a directory with its attributes in a single step.
+        Returns False where the attributes must be updated separately.
+        """
+        return False
+
+    def _update_data_attrs(self, path, src, attrs):
+        """Updates the data and attributes of a file in a single step.
+        Returns False where the attributes must be updated separately.
+        """
+        return False
+
     def __create_file(self, path, src = None):
+        if src is not None and \
+            self._create_file_data(path, src, self.__attrs(src)):
+            return
+
         self._create_file(path, src)
         self._update_data(path, src)
         self.__update_attrs(path, src)
@@ -357,11 +400,19 @@ class SyncFile(object):
         self._create_symlink(path, src)
 
     def __create_dir(self, path, src = None):
+        if src is not None and \
+            self._create_dir_attrs(path, src, self.__attrs(src)):
+            return
+
         self._create_dir(path, src)
         self.__update_attrs(path, src)
 
-    def __update_data(self, path, src):
+    def __update_data(self, path, src, attrs=False):
+        if attrs and self._update_data_attrs(path, src, self.__attrs(src)):
+            return True
+
         self._update_data(path, src)
+        return False
 
     def __update_dir(self, path, src):
         self._update_dir(path, src)
@@ -370,13 +421,17 @@ class SyncFile(object):
         if src is None:
             return
 
+        debug("Updating: %s" % repr(path))
+
+        self._update_attrs(path, src, self.__attrs(src))
+
+    def __attrs(self, src):
+        """Returns the SyncFileAttrs to be given to a copy of the source"""
         src_info = src.get_info()
         src_stat_info = src_info.statInfo
 
         attrs = SyncFileAttrs()
 
-        debug("Updating: %s" % repr(path))
-
         if src_stat_info is not None:
             if GsyncOptions.perms:
                 attrs.mode = src_stat_info.st_mode
@@ -397,7 +452,7 @@ class SyncFile(object):
         else:
             attrs.atime = attrs.mtime
 
-        self._update_attrs(path, src, attrs)
+        return attrs
 
 
     def _normalise_source(self, src):
@@ -452,16 +507,19 @@ class SyncFile(object):
 
         self.__create_file(path, src_obj)
 
-    def update_data(self, path, src):
-        """Updates a file's data at the designated path"""
+    def update_data(self, path, src, attrs=False):
+        """Updates a file's data at the designated path.  Given 'attrs', the
+        attributes are updated along with the data where that can be done
+        in one step, in which case True is returned.
+        """
 
         _, src_info, src_obj = self._normalise_source(src)
 
         if src_info is None or src_info.mimeType == MimeTypes.FOLDER:
             self.__update_dir(path, src_obj)
-            return
+            return False
 
-        self.__update_data(path, src_obj)
+        return self.__update_data(path, src_obj, attrs)
 
     def update_attrs(self, path, src):
         """Updates a file's attributes at the designated path"""
@@ -33,7 +33,8 @@ class SyncFileLocal(SyncFile):
         open(path, "r").close()
 
         return MediaFileUpload(
-            path, mimetype = info.mimeType, resumable = True
+            path, mimetype = info.mimeType,
+            resumable = self.resumable(info.fileSize)
         )
 
     def get_info(self, path = None):
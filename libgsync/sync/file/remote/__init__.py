@@ -71,7 +71,9 @@ class SyncFileRemote(SyncFile):
         if fd is None:
             raise Exception("Open failed: %s" % path)
 
-        return MediaIoBaseUpload(fd, info.mimeType, resumable=True)
+        return MediaIoBaseUpload(
+            fd, info.mimeType, resumable=self.resumable(info.fileSize)
+        )
 
 
     def get_info(self, path = None):
@@ -102,6 +104,21 @@ class SyncFileRemote(SyncFile):
             drive.mkdir(path)
 
 
+    def _create_dir_attrs(self, path, src, attrs):
+        debug("Creating remote directory with attrs: %s" % repr(path))
+
+        # Sending the attributes with the directory, rather than updating
+        # them afterwards, saves a request and leaves the creation of the
+        # directory free to be batched with others.
+        if not GsyncOptions.dry_run:
+            Drive().mkdir(
+                path, self._attrs_properties(src.get_info(), attrs),
+                options = { 'setModifiedDate': GsyncOptions.times }
+            )
+
+        return True
+
+
     def _create_symlink(self, path, src):
         debug("Creating remote symlink: %s" % repr(path))
 
@@ -111,17 +128,18 @@ class SyncFileRemote(SyncFile):
             pass
 
 
-    def _create_file(self, path, src):
-        debug("Creating remote file: %s" % repr(path))
+    def _create_file_data(self, path, src, attrs):
+        debug("Creating remote file with data: %s" % repr(path))
 
-        if GsyncOptions.dry_run:
-            return
+        self._send_data(path, src, attrs, Drive().create)
+        return True
 
-        drive = Drive()
-        info = drive.create(path, src.get_info())
 
-        if info is None:
-            debug("Creation failed")
+    def _update_data_attrs(self, path, src, attrs):
+        debug("Updating remote file data and attrs: %s" % repr(path))
+
+        self._send_data(path, src, attrs, Drive().update)
+        return True
 
 
     def _update_dir(self, path, src):
@@ -131,9 +149,49 @@ class SyncFileRemote(SyncFile):
     def _update_data(self, path, src):
         debug("Updating remote file: %s" % repr(path))
 
+        self._send_data(path, src, None, Drive().update)
+
+
+    def _send_data(self, path, src, attrs, method):
+        """Uploads the data of the source along with its metadata, using
+        the Drive method given, being Drive.create or Drive.update.  Given
+        'attrs', the attributes are worked out beforehand and sent with the
+        data, rather than updated by another request.
+        """
+        info = src.get_info()
+        options = {}
+
+        properties = dict(info.iteritems())
+        if attrs is not None:
+            properties.update(self._attrs_properties(info, attrs))
+            options['setModifiedDate'] = GsyncOptions.times
+
+        # Identifies the content sent, so that an interrupted upload is
+        # only continued if the source hasn't changed since.
+        source = {
+            'path': info.path, 'size': info.fileSize,
+            'modified': int(info.modifiedDate), 'md5': info.md5Checksum,
+        }
+
+        def __send(progress):
+            return method(
+                path, properties, media_body=src.get_uploader(),
+                progress_callback=progress, options=options, source=source
+            )
+
+        self._upload(info.fileSize, __send)
+
+
+    def _upload(self, file_size, send):
+        """Uploads data to the Drive by calling 'send' with the Progress
+        to report to, counting the bytes written.  Nothing is sent on a dry
+        run.
+
+        @param {long} file_size      The number of bytes to be sent.
+        @param {Function} send       Sends the data, returning the entity.
+        """
         total_bytes_written = self.bytes_written
         bytes_written = 0
-        info = src.get_info()
 
         def __callback(status):
             bytes_written = int(status.resumable_progress)
@@ -142,16 +200,12 @@ class SyncFileRemote(SyncFile):
         progress = Progress(GsyncOptions.progress, __callback)
 
         if GsyncOptions.dry_run:
-            bytes_written = info.fileSize
+            bytes_written = file_size
             progress(MediaUploadProgress(bytes_written, bytes_written))
         else:
-            progress.bytesTotal = info.fileSize
+            progress.bytesTotal = file_size
 
-            drive = Drive()
-            info = drive.update(
-                path, info, media_body=src.get_uploader(),
-                progress_callback=progress
-            )
+            info = send(progress)
 
             if info is not None:
                 bytes_written = long(info.get('fileSize', '0'))
@@ -163,16 +217,10 @@ class SyncFileRemote(SyncFile):
         self.bytes_written = total_bytes_written + bytes_written
 
 
-    def _update_attrs(self, path, src, attrs):
-        debug("Updating remote file attrs: %s" % repr(path))
-
-        if GsyncOptions.dry_run:
-            return
-
-        info = self.get_info(path)
-        if not info:
-            return
-
+    def _attrs_properties(self, info, attrs):
+        """Applies the attributes given to the stat info of a file, and
+        returns the description and modified date that record them.
+        """
         st_info = list(tuple(info.statInfo))
 
         if attrs.mode is not None:
@@ -191,9 +239,25 @@ class SyncFileRemote(SyncFile):
             #attrs.mtime).replace(tzinfo=tzutc()).isoformat()
             attrs.mtime).replace(tzinfo=tzutc()).strftime("%Y-%m-%dT%H:%M:%S.%f%z")
 
-        Drive().update(path, properties = {
+        return {
             'description': info.description,
             'modifiedDate': mtime_utc,
-        }, options = {
-            'setModifiedDate': GsyncOptions.times
-        })
+        }
+
+
+    def _update_attrs(self, path, src, attrs):
+        debug("Updating remote file attrs: %s" % repr(path))
+
+        if GsyncOptions.dry_run:
+            return
+
+        info = self.get_info(path)
+        if not info:
+            return
+
+        Drive().patch(
+            path, properties = self._attrs_properties(info, attrs),
+            options = {
+                'setModifiedDate': GsyncOptions.times
+            }
+        )
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, httplib2
+from contextlib import contextmanager
+from apiclient.errors import HttpError
+from libgsync.drive import Drive
+from libgsync.drive.retry import DriveRetryPolicy
+from libgsync.drive.batch import DriveBatch, DriveBatchError
+
+
+class FakeRequest(object):
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeBatchHttpRequest(object):
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        self.service.batches.append(len(self.requests))
+        self.service.transports.append(http)
+
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except Exception, ex:
+                self.callback(request_id, None, ex)
+
+
+class FakeService(object):
+    def __init__(self):
+        self.batches = []
+        self.transports = []
+        self._http = object()
+
+    def new_batch_http_request(self, callback):
+        return FakeBatchHttpRequest(self, callback)
+
+
+class FakeDrive(object):
+    def __init__(self):
+        self.fake = FakeService()
+
+    def normpath(self, path):
+        return Drive().normpath(path)
+
+    @contextmanager
+    def service(self):
+        yield self.fake
+
+
+class TestCaseDriveBatch(unittest.TestCase):
+    def setUp(self):
+        self.drive = FakeDrive()
+
+    def test_pending(self):
+        batch = DriveBatch(self.drive)
+        batch.add("drive://a/b", FakeRequest({}))
+
+        self.assertTrue(batch.pending("drive://a/b"))
+        self.assertTrue(batch.pending("drive://a/b/c"))
+        self.assertFalse(batch.pending("drive://a"))
+        self.assertTrue(batch.pending("drive://a", beneath=True))
+        self.assertTrue(batch.pending("drive://", beneath=True))
+        self.assertFalse(batch.pending("drive://a/bc"))
+        self.assertFalse(batch.pending("drive://c"))
+
+        batch.flush()
+        self.assertFalse(batch.pending("drive://a/b"))
+
+    def test_results_map_to_callbacks(self):
+        results = {}
+
+        def callback(path):
+            def __callback(response):
+                results[path] = response
+            return __callback
+
+        batch = DriveBatch(self.drive)
+        batch.add("drive://a", FakeRequest({ 'id': 'a' }), callback("a"))
+        batch.add("drive://b", FakeRequest(IOError("failed")), callback("b"))
+        batch.add("drive://c", FakeRequest({ 'id': 'c' }), callback("c"))
+        batch.add("drive://d", FakeRequest({ 'id': 'd' }))
+        self.assertEqual(len(batch), 4)
+
+        batch.flush()
+        self.assertEqual(len(batch), 0)
+        self.assertEqual(self.drive.fake.batches, [ 4 ])
+        self.assertEqual(results, { 'a': { 'id': 'a' }, 'c': { 'id': 'c' } })
+
+        self.assertEqual(len(batch.failures), 1)
+        self.assertEqual(batch.failures[0][0], "drive://b")
+
+        ex = DriveBatchError(batch.failures)
+        self.assertTrue("drive://b" in str(ex))
+
+        self.assertIsInstance(batch.failed("drive://b/c"), IOError)
+        self.assertIsNone(batch.failed("drive://a"))
+
+    def test_abandon(self):
+        batch = DriveBatch(self.drive)
+        batch.add("drive://a", FakeRequest({}))
+        batch.add("drive://b", FakeRequest({}))
+
+        self.assertEqual(batch.abandon(), [ "drive://a", "drive://b" ])
+        self.assertEqual(len(batch), 0)
+
+        batch.flush()
+        self.assertEqual(self.drive.fake.batches, [])
+
+    def test_batches_are_limited_in_size(self):
+        batch = DriveBatch(self.drive, size=1000)
+
+        for i in xrange(0, 250):
+            batch.add("drive://%d" % i, FakeRequest({}))
+
+        batch.flush()
+        self.assertEqual(self.drive.fake.batches, [ 100, 100, 50 ])
+
+    def test_temporary_failures_are_retried(self):
+        delays = []
+        policy = DriveRetryPolicy(sleep=delays.append, rand=lambda: 1.0)
+        unavailable = HttpError(httplib2.Response({ 'status': 503 }), "")
+        results = []
+
+        class FlakyRequest(object):
+            def __init__(self, failures):
+                self.failures = failures
+
+            def execute(self):
+                if self.failures:
+                    self.failures -= 1
+                    raise unavailable
+                return { 'id': 'ok' }
+
+        batch = DriveBatch(self.drive, policy=policy)
+        batch.add("drive://a", FlakyRequest(1), results.append)
+        batch.add("drive://b", FakeRequest({ 'id': 'b' }), results.append)
+        batch.add("drive://c", FlakyRequest(10), results.append)
+        batch.add("drive://d", FakeRequest(IOError("failed")))
+        batch.flush()
+
+        self.assertEqual(self.drive.fake.batches, [ 4, 2, 1, 1, 1, 1 ])
+        self.assertEqual(delays, [ 1.0, 2.0, 4.0, 8.0, 16.0 ])
+        self.assertEqual(results, [ { 'id': 'b' }, { 'id': 'ok' } ])
+        self.assertEqual(sorted([ path for path, _ in batch.failures ]), [
+            "drive://c", "drive://d"
+        ])
+
+    def test_batches_use_the_leased_transport(self):
+        batch = DriveBatch(self.drive)
+        batch.add("drive://a", FakeRequest({}))
+        batch.flush()
+
+        self.assertEqual(self.drive.fake.transports, [ self.drive.fake._http ])
+
+    def test_empty_flush(self):
+        batch = DriveBatch(self.drive)
+        batch.flush()
+        self.assertEqual(self.drive.fake.batches, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
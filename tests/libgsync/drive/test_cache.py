@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, tempfile, shutil, os, time
+from libgsync.drive.cache import DriveCacheStore
+
+
+class TestCaseDriveCacheStore(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, "pcache")
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_values_persist_between_instances(self):
+        store = DriveCacheStore(self.filename)
+        store.put("drive://gsync_unittest", { 'id': 'abc' })
+        store.close()
+
+        store = DriveCacheStore(self.filename)
+        self.assertEqual(store.get("drive://gsync_unittest"), { 'id': 'abc' })
+        store.close()
+
+    def test_unicode_keys(self):
+        store = DriveCacheStore(self.filename)
+        store.put(u"drive://unicode_\xf3_file.txt", {})
+
+        self.assertEqual(store.get(u"drive://unicode_\xf3_file.txt"), {})
+        self.assertEqual(store.keys(), [ "drive://unicode_\xc3\xb3_file.txt" ])
+
+        store.clear(u"drive://unicode_\xf3_file.txt")
+        self.assertIsNone(store.get(u"drive://unicode_\xf3_file.txt"))
+        store.close()
+
+    def test_expired_values_are_discarded(self):
+        store = DriveCacheStore(self.filename, ttl=60)
+        store.put("drive://gsync_unittest", {})
+        self.assertEqual(store.get("drive://gsync_unittest"), {})
+
+        self.assertFalse(store.expired(time.time() - 30))
+        self.assertTrue(store.expired(time.time() - 90))
+
+        store._shelf["drive://gsync_unittest"] = (time.time() - 90, {})
+        self.assertIsNone(store.get("drive://gsync_unittest"))
+        self.assertEqual(store.keys(), [])
+        store.close()
+
+    def test_readonly(self):
+        store = DriveCacheStore(self.filename)
+        store.put("drive://fresh", {})
+        store._shelf["drive://expired"] = (time.time() - 90, {})
+        store.close()
+
+        store = DriveCacheStore(self.filename, ttl=60, readonly=True)
+        self.assertEqual(store.get("drive://fresh"), {})
+        self.assertIsNone(store.get("drive://expired"))
+        self.assertEqual(sorted(store.keys()), [
+            "drive://expired", "drive://fresh"
+        ])
+        store.close()
+
+        store = DriveCacheStore(self.filename)
+        store._shelf["__version__"] = DriveCacheStore.VERSION - 1
+        store.close()
+
+        self.assertRaises(ValueError,
+            DriveCacheStore, self.filename, readonly=True
+        )
+
+    def test_stamped(self):
+        store = DriveCacheStore(self.filename)
+        self.assertEqual(store.validated, 0)
+
+        store.put("drive://gsync_unittest", {})
+        stamp, val = store.stamped("drive://gsync_unittest")
+
+        self.assertEqual(val, {})
+        self.assertTrue(time.time() - stamp < 60)
+        self.assertIsNone(store.stamped("drive://missing"))
+
+        store.validate()
+        self.assertTrue(store.validated >= stamp)
+        store.close()
+
+    def test_validate_renews_values(self):
+        store = DriveCacheStore(self.filename, ttl=60)
+        store._shelf["drive://gsync_unittest"] = (time.time() - 90, {})
+
+        store.validate()
+        self.assertEqual(store.get("drive://gsync_unittest"), {})
+        store.close()
+
+        store = DriveCacheStore(self.filename, ttl=60)
+        self.assertEqual(store.get("drive://gsync_unittest"), {})
+        store.close()
+
+    def test_stale_versions_are_discarded(self):
+        store = DriveCacheStore(self.filename)
+        store.put("drive://gsync_unittest", {})
+        store._shelf["__version__"] = DriveCacheStore.VERSION - 1
+        store.close()
+
+        store = DriveCacheStore(self.filename)
+        self.assertIsNone(store.get("drive://gsync_unittest"))
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, tempfile, shutil, os, socket, httplib2
+from contextlib import contextmanager
+from apiclient.errors import HttpError
+from libgsync.drive import DrivePathCache
+from libgsync.drive.cache import DriveCacheStore
+from libgsync.drive.changes import DriveChangeFeed
+
+
+class FakeRequest(object):
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeService(object):
+    def __init__(self, pages, largest=10):
+        self.pages = pages
+        self.largest = largest
+        self.requests = []
+
+    def about(self):
+        return self
+
+    def changes(self):
+        return self
+
+    def get(self, **kwargs):
+        return FakeRequest({ 'largestChangeId': str(self.largest) })
+
+    def list(self, **kwargs):
+        self.requests.append(kwargs)
+        return FakeRequest(self.pages.pop(0))
+
+
+class FakeDrive(object):
+    def __init__(self, service):
+        self._service = service
+
+    @contextmanager
+    def service(self):
+        yield self._service
+
+    def execute(self, request):
+        return request.execute()
+
+
+class TestCaseDriveChangeFeed(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.store = DriveCacheStore(os.path.join(self.tempdir, "pcache"))
+        self.pcache = DrivePathCache(store=self.store)
+
+        self.pcache.put("drive://a", {
+            'id': 'a', 'title': 'a', 'parents': [ { 'id': 'root' } ]
+        })
+        self.pcache.put("drive://a/b", {
+            'id': 'b', 'title': 'b', 'parents': [ { 'id': 'a' } ]
+        })
+        self.pcache.put("drive://c", {
+            'id': 'c', 'title': 'c', 'parents': [ { 'id': 'root' } ]
+        })
+
+    def tearDown(self):
+        self.pcache.close()
+        shutil.rmtree(self.tempdir)
+
+    def feed(self, pages):
+        return DriveChangeFeed(FakeDrive(FakeService(pages)),
+            self.store, self.pcache
+        )
+
+    def test_first_replay_records_position_and_discards_cache(self):
+        feed = self.feed([])
+
+        self.assertIsNone(feed.position())
+        self.assertTrue(feed.replay())
+        self.assertEqual(feed.position(), 10)
+        self.assertIsNone(self.store.get("drive://a"))
+
+    def test_replay_applies_changes(self):
+        self.store.put(DriveChangeFeed.POSITION_KEY, 5)
+
+        feed = self.feed([
+            {
+                'largestChangeId': '7',
+                'nextPageToken': 'next',
+                'items': [
+                    { 'fileId': 'c', 'deleted': True },
+                ]
+            },
+            {
+                'largestChangeId': '8',
+                'items': [
+                    { 'fileId': 'b', 'file': {
+                        'id': 'b', 'title': 'b', 'description': 'new',
+                        'parents': [ { 'id': 'a' } ]
+                    } },
+                    { 'fileId': 'unknown', 'file': { 'id': 'unknown' } },
+                ]
+            },
+        ])
+
+        self.assertTrue(feed.replay())
+        self.assertEqual(feed.position(), 8)
+        self.assertEqual(feed._drive._service.requests[0]['startChangeId'], 6)
+
+        self.assertIsNone(self.pcache.get("drive://c"))
+        self.assertEqual(self.pcache.get("drive://a/b")['description'], 'new')
+        self.assertEqual(self.pcache.get("drive://a")['id'], 'a')
+
+    def test_renamed_folders_are_invalidated(self):
+        self.store.put(DriveChangeFeed.POSITION_KEY, 5)
+
+        feed = self.feed([
+            {
+                'largestChangeId': '6',
+                'items': [
+                    { 'fileId': 'a', 'file': {
+                        'id': 'a', 'title': 'renamed',
+                        'parents': [ { 'id': 'root' } ]
+                    } },
+                ]
+            },
+        ])
+
+        self.assertTrue(feed.replay())
+        self.assertIsNone(self.pcache.get("drive://a"))
+        self.assertIsNone(self.pcache.get("drive://a/b"))
+        self.assertEqual(self.pcache.paths('b'), [])
+        self.assertEqual(self.pcache.get("drive://c")['id'], 'c')
+
+    def test_failed_replay_discards_cache(self):
+        self.store.put(DriveChangeFeed.POSITION_KEY, 5)
+
+        feed = self.feed([
+            HttpError(httplib2.Response({ 'status': 404 }), "Not Found"),
+        ])
+
+        self.assertFalse(feed.replay())
+        self.assertIsNone(feed.position())
+        self.assertIsNone(self.store.get("drive://c"))
+
+    def test_unavailable_replay_keeps_cache(self):
+        self.store.put(DriveChangeFeed.POSITION_KEY, 5)
+
+        for ex in (
+            socket.error("Connection refused"),
+            HttpError(httplib2.Response({ 'status': 503 }), "Unavailable"),
+        ):
+            feed = self.feed([ ex ])
+
+            self.assertFalse(feed.replay())
+            self.assertEqual(feed.position(), 5)
+            self.assertEqual(self.store.get("drive://c")['id'], 'c')
+
+
+if __name__ == "__main__":
+    unittest.main()
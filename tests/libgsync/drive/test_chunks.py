@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest
+from apiclient.http import MediaInMemoryUpload
+from libgsync.drive.chunks import DriveChunkSizer, DriveSizedUpload, \
+    CHUNK_UNIT, round_chunk_size
+
+
+class TestCaseDriveChunkSizer(unittest.TestCase):
+    def test_round_chunk_size(self):
+        self.assertEqual(round_chunk_size(1), CHUNK_UNIT)
+        self.assertEqual(round_chunk_size(CHUNK_UNIT * 2.4), CHUNK_UNIT * 2)
+        self.assertEqual(round_chunk_size(CHUNK_UNIT * 2.6), CHUNK_UNIT * 3)
+
+    def test_fixed_size_is_not_adapted(self):
+        sizer = DriveChunkSizer(CHUNK_UNIT * 3)
+
+        sizer.sent(sizer.size, 0.001)
+        sizer.failed()
+
+        self.assertEqual(sizer.size, CHUNK_UNIT * 3)
+        self.assertEqual(sizer.chunks, 2)
+        self.assertEqual(sizer.failures, 1)
+
+    def test_fast_link_grows_chunks(self):
+        sizer = DriveChunkSizer(CHUNK_UNIT, adaptive=True, target=1.0)
+
+        # At 4M/s, a chunk sent in a second is 16 units.
+        sizes = []
+        for _ in xrange(6):
+            sizer.sent(sizer.size, float(sizer.size) / (16 * CHUNK_UNIT))
+            sizes.append(sizer.size / CHUNK_UNIT)
+
+        self.assertEqual(sizes, [ 2, 4, 8, 16, 16, 16 ])
+
+    def test_slow_link_shrinks_chunks(self):
+        sizer = DriveChunkSizer(CHUNK_UNIT * 16, adaptive=True, target=1.0)
+
+        sizer.sent(sizer.size, 16.0)
+        self.assertEqual(sizer.size, CHUNK_UNIT * 8)
+
+        sizer.sent(sizer.size, 8.0)
+        self.assertEqual(sizer.size, CHUNK_UNIT * 4)
+
+    def test_short_chunks_are_ignored(self):
+        sizer = DriveChunkSizer(CHUNK_UNIT * 4, adaptive=True, target=1.0)
+
+        sizer.sent(CHUNK_UNIT, 100.0)
+        self.assertEqual(sizer.size, CHUNK_UNIT * 4)
+
+    def test_failures_shrink_and_hold_chunks(self):
+        sizer = DriveChunkSizer(CHUNK_UNIT * 8, adaptive=True, target=1.0)
+
+        sizer.failed()
+        self.assertEqual(sizer.size, CHUNK_UNIT * 4)
+        self.assertTrue(sizer.error_rate > sizer.max_error_rate)
+
+        # A fast chunk straight after a failure doesn't grow the size.
+        sizer.sent(sizer.size, 0.001)
+        self.assertEqual(sizer.size, CHUNK_UNIT * 4)
+
+        while sizer.error_rate > sizer.max_error_rate:
+            sizer.sent(sizer.size, 1.0)
+
+        sizer.sent(sizer.size, 0.001)
+        self.assertEqual(sizer.size, CHUNK_UNIT * 8)
+
+    def test_bounds(self):
+        sizer = DriveChunkSizer(
+            CHUNK_UNIT * 2, adaptive=True, max_size=CHUNK_UNIT * 4
+        )
+
+        for _ in xrange(4):
+            sizer.failed()
+        self.assertEqual(sizer.size, CHUNK_UNIT)
+
+        sizer.error_rate = 0.0
+        for _ in xrange(4):
+            sizer.sent(sizer.size, 0.001)
+        self.assertEqual(sizer.size, CHUNK_UNIT * 4)
+
+
+class TestCaseDriveSizedUpload(unittest.TestCase):
+    def test_chunksize_follows_sizer(self):
+        media = MediaInMemoryUpload("data", mimetype="text/plain",
+            chunksize=CHUNK_UNIT, resumable=True
+        )
+        sizer = DriveChunkSizer(CHUNK_UNIT, adaptive=True)
+        upload = DriveSizedUpload(media, sizer)
+
+        self.assertEqual(upload.chunksize(), CHUNK_UNIT)
+        sizer.size = CHUNK_UNIT * 2
+        self.assertEqual(upload.chunksize(), CHUNK_UNIT * 2)
+
+        self.assertEqual(upload.size(), 4)
+        self.assertEqual(upload.mimetype(), "text/plain")
+        self.assertTrue(upload.resumable())
+        self.assertEqual(upload.getbytes(1, 2), "at")
+
+
+if __name__ == "__main__":
+    unittest.main()
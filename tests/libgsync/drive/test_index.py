@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest
+from libgsync.drive.index import DriveFolderIndex
+
+
+def folder(folder_id, title, *parent_ids):
+    parents = []
+    for parent_id in parent_ids:
+        if parent_id == "root_id":
+            parents.append({ 'id': parent_id, 'isRoot': True })
+        else:
+            parents.append({ 'id': parent_id, 'isRoot': False })
+
+    return { 'id': folder_id, 'title': title, 'parents': parents }
+
+
+class TestCaseDriveFolderIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = DriveFolderIndex([
+            folder("a", "a", "root_id"),
+            folder("b", "b", "a"),
+            folder("c", "c", "b", "a"),
+        ])
+
+    def test_len(self):
+        self.assertEqual(len(self.index), 3)
+
+    def test_root_is_aliased(self):
+        self.assertEqual(self.index.lookup("root", "a")['id'], "a")
+        self.assertIsNone(self.index.lookup("root_id", "a"))
+
+    def test_lookup(self):
+        self.assertEqual(self.index.lookup("a", "b")['id'], "b")
+        self.assertEqual(self.index.lookup("b", "c")['id'], "c")
+        self.assertEqual(self.index.lookup("a", "c")['id'], "c")
+        self.assertIsNone(self.index.lookup("a", "d"))
+        self.assertIsNone(self.index.lookup("d", "a"))
+
+    def test_duplicate_titles(self):
+        self.index.add(folder("b2", "b", "a"))
+        self.assertEqual(self.index.lookup("a", "b")['id'], "b")
+
+        self.index.remove("b")
+        self.assertEqual(self.index.lookup("a", "b")['id'], "b2")
+
+    def test_remove(self):
+        self.index.remove("c")
+        self.assertIsNone(self.index.get("c"))
+        self.assertIsNone(self.index.lookup("b", "c"))
+        self.assertIsNone(self.index.lookup("a", "c"))
+
+        self.index.remove("c")
+        self.assertEqual(len(self.index), 2)
+
+    def test_readding_moves_a_folder(self):
+        self.index.add(folder("b", "renamed", "root_id"))
+
+        self.assertIsNone(self.index.lookup("a", "b"))
+        self.assertEqual(self.index.lookup("root", "renamed")['id'], "b")
+        self.assertEqual(len(self.index), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
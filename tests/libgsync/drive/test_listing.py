@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest
+from libgsync.drive.listing import DriveListingCache
+
+
+def entity(file_id, title, parent_id):
+    if parent_id == "root_id":
+        parents = [ { 'id': parent_id, 'isRoot': True } ]
+    else:
+        parents = [ { 'id': parent_id, 'isRoot': False } ]
+
+    return { 'id': file_id, 'title': title, 'parents': parents }
+
+
+class TestCaseDriveListingCache(unittest.TestCase):
+    def setUp(self):
+        self.listings = DriveListingCache()
+        self.listings.set("a", [
+            entity("f1", "f1", "a"),
+            entity("f2", u"f\xe9", "a"),
+            entity("f3", "dup", "a"),
+            entity("f4", "dup", "a"),
+        ])
+
+    def test_complete(self):
+        self.assertTrue(self.listings.complete("a"))
+        self.assertFalse(self.listings.complete("b"))
+        self.assertEqual(len(self.listings), 1)
+
+        self.listings.discard("a")
+        self.assertFalse(self.listings.complete("a"))
+
+    def test_lookup(self):
+        self.assertEqual(self.listings.lookup("a", "f1")['id'], "f1")
+        self.assertEqual(self.listings.lookup("a", "f\xc3\xa9")['id'], "f2")
+        self.assertEqual(self.listings.lookup("a", "dup")['id'], "f3")
+        self.assertIsNone(self.listings.lookup("a", "missing"))
+        self.assertRaises(KeyError, self.listings.lookup, "b", "f1")
+
+    def test_lookup_latin1_title(self):
+        self.assertEqual(self.listings.lookup("a", "f\xe9")['id'], "f2")
+        self.assertIsNone(self.listings.lookup("a", "caf\xe9"))
+
+    def test_entities(self):
+        self.assertEqual([
+            ent['id'] for ent in self.listings.entities("a")
+        ], [ "f3", "f4", "f1", "f2" ])
+        self.assertRaises(KeyError, self.listings.entities, "b")
+
+    def test_add(self):
+        self.listings.add(entity("f5", "f5", "a"))
+        self.listings.add(entity("b1", "b1", "b"))
+
+        self.assertEqual(self.listings.lookup("a", "f5")['id'], "f5")
+        self.assertFalse(self.listings.complete("b"))
+
+    def test_add_renamed(self):
+        self.listings.add(entity("f1", "renamed", "a"))
+
+        self.assertIsNone(self.listings.lookup("a", "f1"))
+        self.assertEqual(self.listings.lookup("a", "renamed")['id'], "f1")
+
+    def test_remove(self):
+        self.listings.remove(entity("f1", "f1", "a"))
+        self.listings.remove(entity("f3", "dup", "a"))
+
+        self.assertIsNone(self.listings.lookup("a", "f1"))
+        self.assertEqual(self.listings.lookup("a", "dup")['id'], "f4")
+
+    def test_expect(self):
+        self.listings.expect("b", "fetch")
+        self.assertTrue(self.listings.expecting("b"))
+        self.assertEqual(self.listings.collect("b"), "fetch")
+        self.assertFalse(self.listings.expecting("b"))
+        self.assertIsNone(self.listings.collect("b"))
+
+    def test_change_forgets_expected(self):
+        self.listings.expect("b", "fetch")
+        self.listings.add(entity("b1", "b1", "b"))
+        self.assertFalse(self.listings.expecting("b"))
+
+        self.listings.expect("b", "fetch")
+        self.listings.set("b", [])
+        self.assertFalse(self.listings.expecting("b"))
+
+    def test_size(self):
+        size = self.listings.size
+        self.assertTrue(size > 0)
+
+        self.listings.add(entity("f5", "f5", "a"))
+        self.assertTrue(self.listings.size > size)
+
+        self.listings.remove(entity("f5", "f5", "a"))
+        self.assertEqual(self.listings.size, size)
+
+        self.listings.discard("a")
+        self.assertEqual(self.listings.size, 0)
+
+    def test_least_recently_used_listings_are_evicted(self):
+        size = self.listings.size
+        listings = DriveListingCache(max_bytes=size * 2)
+
+        for folder_id in ("a", "b", "c"):
+            listings.set(folder_id, [
+                entity("%s%d" % (folder_id, i), "f%d" % i, folder_id)
+                for i in xrange(1, 5)
+            ])
+
+            if folder_id == "b":
+                listings.lookup("a", "f1")
+
+        self.assertTrue(listings.complete("a"))
+        self.assertFalse(listings.complete("b"))
+        self.assertTrue(listings.complete("c"))
+        self.assertTrue(listings.size <= size * 2)
+
+    def test_root_alias(self):
+        self.listings.set("root", [])
+        self.listings.add(entity("r1", "r1", "root_id"))
+
+        self.assertEqual(self.listings.lookup("root", "r1")['id'], "r1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, threading
+from libgsync.drive.pool import DriveWorkerPool, DriveLookahead
+
+
+class TestCaseDriveWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = DriveWorkerPool(2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_result(self):
+        future = self.pool.submit(lambda a, b=0: a + b, 1, b=2)
+
+        self.assertEqual(future.result(), 3)
+        self.assertTrue(future.done())
+
+    def test_exception(self):
+        def fail():
+            raise KeyError("missing")
+
+        future = self.pool.submit(fail)
+
+        self.assertRaises(KeyError, future.result)
+
+    def test_concurrent(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def first():
+            started.set()
+            release.wait(5)
+            return "first"
+
+        def second():
+            # Only reachable while the first call is still running.
+            self.assertTrue(started.wait(5))
+            release.set()
+            return "second"
+
+        futures = [ self.pool.submit(first), self.pool.submit(second) ]
+
+        self.assertEqual([ f.result() for f in futures ], [ "first", "second" ])
+
+    def test_threads_started_on_demand(self):
+        self.assertEqual(len(self.pool), 2)
+        self.assertEqual(self.pool._threads, [])
+
+        self.pool.submit(int).result()
+        self.assertEqual(len(self.pool._threads), 2)
+
+        self.pool.shutdown()
+        self.assertEqual(self.pool._threads, [])
+
+
+class TestCaseDriveLookahead(unittest.TestCase):
+    class FakePool(object):
+        def __init__(self):
+            self.submitted = []
+
+        def submit(self, func, **kwargs):
+            self.submitted.append(kwargs['key'])
+            return kwargs['key']
+
+    def test_calls_are_submitted_as_results_are_taken(self):
+        pool = self.FakePool()
+        lookahead = DriveLookahead(pool, 2)
+
+        for key in "abc":
+            lookahead.add(key, None, { 'key': key })
+        lookahead.add("d", None, { 'key': "d" }, first=True)
+
+        self.assertEqual(pool.submitted, [ "a", "b" ])
+        self.assertEqual(len(lookahead), 2)
+
+        self.assertEqual(lookahead.take("a"), "a")
+        self.assertEqual(pool.submitted, [ "a", "b", "d" ])
+
+        # A call taken before it is submitted is left to the caller.
+        self.assertIsNone(lookahead.take("c"))
+        self.assertEqual(lookahead.take("b"), "b")
+        self.assertEqual(lookahead.take("d"), "d")
+        self.assertEqual(pool.submitted, [ "a", "b", "d" ])
+        self.assertEqual(len(lookahead), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
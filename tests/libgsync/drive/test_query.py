@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, tempfile, shutil, os, time
+from libgsync.drive.cache import DriveCacheStore
+from libgsync.drive.query import DriveCacheQuery, modified_time
+from libgsync.drive.mimetypes import MimeTypes
+
+
+def entity(title, mimetype=MimeTypes.BINARY_FILE, size=0,
+    modified="2014-05-10T12:00:00.000Z"):
+
+    ent = { 'id': title, 'title': title, 'mimeType': mimetype,
+        'modifiedDate': modified }
+    if mimetype != MimeTypes.FOLDER:
+        ent['fileSize'] = str(size)
+
+    return ent
+
+
+class TestCaseDriveCacheQuery(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.store = DriveCacheStore(os.path.join(self.tempdir, "pcache"))
+
+        for path, ent in [
+            ("drive://backups", entity("backups", MimeTypes.FOLDER)),
+            ("drive://backups/2014", entity("2014", MimeTypes.FOLDER)),
+            ("drive://backups/2014/a.tar", entity("a.tar", size=2048,
+                modified="2014-01-01T00:00:00.000Z")),
+            ("drive://backups/2014/b.txt", entity("b.txt", size=10)),
+            ("drive://backups/old.tar", entity("old.tar", size=4096)),
+            ("drive://backupsX", entity("backupsX")),
+        ]:
+            self.store.put(path, ent)
+
+        self.store.put("id:a.tar", [ "drive://backups/2014/a.tar" ])
+        self.store.put("__change_id__", 10)
+        self.query = DriveCacheQuery(self.store)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tempdir)
+
+    def paths(self, *args, **kwargs):
+        return [ ent.path for _, ent in self.query.entities(*args, **kwargs) ]
+
+    def test_listing(self):
+        self.assertEqual(self.paths("drive://backups"), [
+            "drive://backups",
+            "drive://backups/2014",
+            "drive://backups/old.tar",
+        ])
+
+        self.assertEqual(self.paths("drive://backups/", True), [
+            "drive://backups",
+            "drive://backups/2014",
+            "drive://backups/2014/a.tar",
+            "drive://backups/2014/b.txt",
+            "drive://backups/old.tar",
+        ])
+
+        self.assertEqual(self.paths("drive://"), [
+            "drive://backups", "drive://backupsX",
+        ])
+        self.assertEqual(self.paths("drive://missing"), [])
+
+    def test_glob(self):
+        self.assertEqual(self.paths("drive://backups/*/*.tar"), [
+            "drive://backups/2014/a.tar",
+        ])
+        self.assertEqual(self.paths("drive://backups/*.tar"), [
+            "drive://backups/old.tar",
+        ])
+
+    def test_predicates(self):
+        self.assertEqual(self.paths("drive://", True, min_size=1024), [
+            "drive://backups/2014/a.tar", "drive://backups/old.tar",
+        ])
+        self.assertEqual(self.paths("drive://", True, max_size=1024), [
+            "drive://backups/2014/b.txt", "drive://backupsX",
+        ])
+
+        newer = modified_time(entity("x", modified="2014-02-01T00:00:00Z"))
+        self.assertEqual(
+            self.paths("drive://backups/2014", True, older=newer), [
+                "drive://backups/2014/a.tar",
+            ]
+        )
+        self.assertEqual(
+            self.paths("drive://backups/2014", True, newer=newer), [
+                "drive://backups/2014/b.txt",
+            ]
+        )
+
+    def test_freshness(self):
+        self.assertEqual(self.query.validated, 0)
+
+        stamps = [ stamp for stamp, _ in self.query.entities("drive://") ]
+        for stamp in stamps:
+            self.assertTrue(time.time() - stamp < 60)
+
+        self.store.validate()
+        stamps = [ stamp for stamp, _ in self.query.entities("drive://") ]
+        self.assertEqual(stamps, [ self.query.validated ] * 2)
+
+    def test_modified_time(self):
+        self.assertEqual(
+            modified_time({ 'modifiedDate': "1970-01-02T00:00:00.000Z" }),
+            86400
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
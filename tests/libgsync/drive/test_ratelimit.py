@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest
+from libgsync.drive.ratelimit import DriveRateLimiter
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestCaseDriveRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def limiter(self, rate, burst=None):
+        return DriveRateLimiter(
+            rate, burst, clock=self.clock, sleep=self.clock.sleep
+        )
+
+    def test_burst_is_not_throttled(self):
+        limiter = self.limiter(10, 5)
+
+        for _ in xrange(5):
+            self.assertEqual(limiter.acquire(), 0)
+
+        self.assertEqual(limiter.throttles, 0)
+        self.assertEqual(limiter.requests, 5)
+
+    def test_requests_are_paced(self):
+        limiter = self.limiter(10, 1)
+        start = self.clock.now
+
+        for _ in xrange(11):
+            limiter.acquire()
+
+        self.assertAlmostEqual(self.clock.now - start, 1.0)
+        self.assertEqual(limiter.throttles, 10)
+        self.assertAlmostEqual(limiter.throttled, 1.0)
+
+    def test_bucket_refills(self):
+        limiter = self.limiter(2, 2)
+        limiter.acquire(2)
+
+        self.clock.now += 10
+        self.assertEqual(limiter.acquire(2), 0)
+        self.assertAlmostEqual(limiter.acquire(), 0.5)
+
+    def test_large_requests_leave_debt(self):
+        limiter = self.limiter(10, 10)
+
+        self.assertEqual(limiter.acquire(30), 0)
+        self.assertAlmostEqual(limiter.acquire(), 2.1)
+
+    def test_default_burst(self):
+        self.assertEqual(self.limiter(0.5).burst, 1.0)
+        self.assertEqual(self.limiter(20).burst, 20.0)
+        self.assertRaises(ValueError, self.limiter, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
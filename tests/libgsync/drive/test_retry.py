@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, socket, time, email.utils, httplib2
+from apiclient.errors import HttpError
+from libgsync.drive.retry import DriveRetryPolicy
+
+
+def http_error(status, reason=None, headers=None):
+    resp = httplib2.Response(dict(headers or {}, status=status))
+    content = ""
+    if reason is not None:
+        content = '{"error": {"errors": [{"reason": "%s"}]}}' % reason
+
+    return HttpError(resp, content)
+
+
+class FakeRequest(object):
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def execute(self):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestCaseDriveRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.delays = []
+        self.policy = DriveRetryPolicy(
+            sleep=self.delays.append, rand=lambda: 0.5
+        )
+
+    def test_retryable(self):
+        retryable = self.policy.retryable
+
+        self.assertTrue(retryable(http_error(429)))
+        self.assertTrue(retryable(http_error(500)))
+        self.assertTrue(retryable(http_error(503)))
+        self.assertTrue(retryable(http_error(403, "userRateLimitExceeded")))
+        self.assertTrue(retryable(http_error(403, "rateLimitExceeded")))
+        self.assertTrue(retryable(socket.timeout("timed out")))
+        self.assertTrue(retryable(socket.error(104, "reset")))
+
+        self.assertFalse(retryable(http_error(403, "insufficientPermissions")))
+        self.assertFalse(retryable(http_error(403)))
+        self.assertFalse(retryable(http_error(404)))
+        self.assertFalse(retryable(http_error(400)))
+        self.assertFalse(retryable(ValueError("bug")))
+
+    def test_backoff_is_exponential_with_jitter(self):
+        self.assertEqual(
+            [ self.policy.backoff(i) for i in xrange(7) ],
+            [ 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 16.0 ]
+        )
+
+    def test_execute_retries(self):
+        req = FakeRequest(http_error(503), socket.timeout(), { 'id': 'a' })
+
+        self.assertEqual(self.policy.execute(req), { 'id': 'a' })
+        self.assertEqual(req.calls, 3)
+        self.assertEqual(self.delays, [ 0.5, 1.0 ])
+
+    def test_fatal_errors_are_raised(self):
+        req = FakeRequest(http_error(404), { 'id': 'a' })
+
+        self.assertRaises(HttpError, self.policy.execute, req)
+        self.assertEqual(req.calls, 1)
+        self.assertEqual(self.delays, [])
+
+    def test_attempts_are_limited(self):
+        self.policy.attempts = 3
+        req = FakeRequest(*([ http_error(500) ] * 5))
+
+        self.assertRaises(HttpError, self.policy.execute, req)
+        self.assertEqual(req.calls, 3)
+
+    def test_retry_after(self):
+        req = FakeRequest(
+            http_error(429, headers={ 'retry-after': '7' }), { 'id': 'a' }
+        )
+
+        self.assertEqual(self.policy.execute(req), { 'id': 'a' })
+        self.assertEqual(self.delays, [ 7.0 ])
+
+    def test_retry_after_date(self):
+        date = email.utils.formatdate(time.time() + 30, usegmt=True)
+        delay = self.policy.retry_after(
+            http_error(503, headers={ 'retry-after': date })
+        )
+
+        self.assertTrue(25 < delay <= 30)
+
+    def test_total_delay_is_capped(self):
+        self.policy.max_delay = 10
+        req = FakeRequest(
+            http_error(429, headers={ 'retry-after': '60' }), { 'id': 'a' }
+        )
+
+        self.assertRaises(HttpError, self.policy.execute, req)
+        self.assertEqual(self.delays, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
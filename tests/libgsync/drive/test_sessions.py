@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, os, tempfile, shutil
+from libgsync.drive.sessions import DriveUploadSessions
+
+
+class TestCaseDriveUploadSessions(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.sessions = DriveUploadSessions(
+            os.path.join(self.tempdir, "partial")
+        )
+        self.identity = {
+            'method': "update", 'path': u"drive://a/f", 'fileId': "f",
+            'size': 1024, 'source': { 'path': u"/tmp/f", 'modified': 1 },
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_put_get_clear(self):
+        self.assertEqual(self.sessions.get(self.identity), None)
+
+        self.sessions.put(self.identity, "http://upload/1", 512)
+        self.assertEqual(
+            self.sessions.get(self.identity), ("http://upload/1", 512)
+        )
+
+        self.sessions.put(self.identity, "http://upload/1", 768)
+        self.assertEqual(
+            self.sessions.get(self.identity), ("http://upload/1", 768)
+        )
+        self.assertEqual(len(os.listdir(self.sessions.directory)), 1)
+
+        self.sessions.clear(self.identity)
+        self.assertEqual(self.sessions.get(self.identity), None)
+        self.sessions.clear(self.identity)
+
+    def test_changed_source_is_not_resumed(self):
+        self.sessions.put(self.identity, "http://upload/1", 512)
+
+        self.identity['source']['modified'] = 2
+        self.assertEqual(self.sessions.get(self.identity), None)
+
+    def test_unreadable_session_is_discarded(self):
+        self.sessions.put(self.identity, "http://upload/1", 512)
+
+        for name in os.listdir(self.sessions.directory):
+            with open(os.path.join(self.sessions.directory, name), "w") as fd:
+                fd.write("{")
+
+        self.assertEqual(self.sessions.get(self.identity), None)
+        self.assertEqual(os.listdir(self.sessions.directory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
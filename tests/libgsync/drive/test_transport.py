@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, threading, time
+import BaseHTTPServer
+from libgsync.drive.transport import DriveTransportPool, DriveTransportStats
+from libgsync.drive.transport import DriveHttp
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeHttp(object):
+    def __init__(self):
+        self.connections = { 'https:www.googleapis.com': FakeConnection() }
+
+
+class TestCaseDriveTransportPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+        def factory(stats):
+            transport = (FakeHttp(), "service%d" % len(self.created))
+            self.created.append(transport)
+            return transport
+
+        self.pool = DriveTransportPool(factory, 2, max_idle=60)
+
+    def test_lease_reuses_transport(self):
+        with self.pool.lease() as service:
+            self.assertEqual(service, "service0")
+
+        with self.pool.lease() as service:
+            self.assertEqual(service, "service0")
+
+        self.assertEqual(len(self.pool), 1)
+        self.assertEqual(self.pool.stats.leases, 2)
+        self.assertEqual(self.pool.stats.transports, 1)
+
+    def test_nested_lease_shares_transport(self):
+        with self.pool.lease() as outer:
+            with self.pool.lease() as inner:
+                self.assertEqual(inner, outer)
+
+        self.assertEqual(self.pool.stats.leases, 1)
+
+    def test_threads_lease_separate_transports(self):
+        services = []
+        leased = threading.Event()
+        release = threading.Event()
+
+        def lease():
+            with self.pool.lease() as service:
+                services.append(service)
+                leased.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=lease)
+        thread.start()
+        self.assertTrue(leased.wait(5))
+
+        with self.pool.lease() as service:
+            services.append(service)
+
+        release.set()
+        thread.join()
+
+        self.assertEqual(sorted(services), [ "service0", "service1" ])
+
+    def test_lease_waits_when_full(self):
+        leased = threading.Semaphore(0)
+        release = threading.Event()
+
+        def lease():
+            with self.pool.lease():
+                leased.release()
+                release.wait(5)
+
+        threads = [ threading.Thread(target=lease) for _ in xrange(2) ]
+        for thread in threads:
+            thread.start()
+            leased.acquire()
+
+        timer = threading.Timer(0.1, release.set)
+        timer.start()
+
+        with self.pool.lease() as service:
+            self.assertTrue(release.is_set())
+            self.assertTrue(service in [ "service0", "service1" ])
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.pool), 2)
+        self.assertEqual(self.pool.stats.waits, 1)
+
+    def test_idle_connections_closed(self):
+        with self.pool.lease():
+            pass
+
+        conn = self.created[0][0].connections.values()[0]
+
+        with self.pool.lease():
+            self.assertFalse(conn.closed)
+
+        self.pool._idle = [ (time.time() - 61, self.created[0]) ]
+
+        with self.pool.lease():
+            self.assertTrue(conn.closed)
+
+    def test_factory_failure(self):
+        def factory(stats):
+            raise ValueError("no credentials")
+
+        pool = DriveTransportPool(factory, 1)
+
+        for _ in xrange(2):
+            try:
+                with pool.lease():
+                    pass
+            except ValueError:
+                pass
+            else:
+                self.fail("ValueError not raised")
+
+        self.assertEqual(len(pool), 0)
+
+
+class KeepAliveHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write("ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCaseDriveHttp(unittest.TestCase):
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(
+            ("127.0.0.1", 0), KeepAliveHandler
+        )
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reused(self):
+        stats = DriveTransportStats()
+        http = DriveHttp(stats)
+        url = "http://127.0.0.1:%d/" % self.server.server_port
+
+        for _ in xrange(3):
+            res, content = http.request(url)
+            self.assertEqual(content, "ok")
+
+        for conn in http.connections.values():
+            conn.close()
+
+        self.assertEqual(stats.requests, 3)
+        self.assertEqual(stats.connections, 1)
+        self.assertEqual(stats.reused, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
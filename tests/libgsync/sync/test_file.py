@@ -3,7 +3,8 @@
 # Copyright (C) 2014 Craig Phillips.  All rights reserved.
 
 import unittest
-from libgsync.sync.file import SyncFile
+from libgsync.options import GsyncOptions
+from libgsync.sync.file import SyncFile, RESUMABLE_THRESHOLD
 
 class TestSyncFile(unittest.TestCase):
     def test_SyncFile_relative_to(self):
@@ -13,3 +14,16 @@ class TestSyncFile(unittest.TestCase):
             f.relative_to("/gsync_unittest/open_for_read.txt"),
             "open_for_read.txt"
         )
+
+    def test_SyncFile_resumable(self):
+        threshold = GsyncOptions.resumable_threshold
+        try:
+            GsyncOptions.resumable_threshold = None
+            self.assertFalse(SyncFile.resumable(2048))
+            self.assertFalse(SyncFile.resumable(RESUMABLE_THRESHOLD))
+            self.assertTrue(SyncFile.resumable(RESUMABLE_THRESHOLD + 1))
+
+            GsyncOptions.resumable_threshold = "1K"
+            self.assertTrue(SyncFile.resumable(2048))
+        finally:
+            GsyncOptions.resumable_threshold = threshold
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, os, sys, tempfile, shutil
+from StringIO import StringIO
+from libgsync.crawler import Crawler, os_walk_wrapper, GsyncOptions
+from libgsync.sync.file.factory import SyncFileFactory
+
+
+class FakeDrive(object):
+    """A Drive that records the folders it is asked to prefetch"""
+    def __init__(self, events):
+        self.events = events
+
+    def is_drivepath(self, path):
+        return path.startswith("drive://")
+
+    def prefetch(self, path):
+        self.events.append(("prefetch", path))
+
+
+class FakeBatch(object):
+    """A batch that records when it is flushed, failing the paths given"""
+    def __init__(self, events, failures):
+        self.events = events
+        self.failures = []
+        self._failures = failures
+
+    def flush(self):
+        self.events.append(("flush",))
+        self.failures.extend(self._failures)
+        self._failures = []
+
+
+class FakeDestination(object):
+    def __add__(self, path):
+        return "drive://dst/%s" % path
+
+
+class FakeSync(object):
+    """A Sync that records the paths it is asked to synchronise"""
+    def __init__(self, src, events):
+        self.src = SyncFileFactory.create(src)
+        self.dst = FakeDestination()
+        self.events = events
+
+    def __call__(self, path):
+        self.events.append(("sync", os.path.basename(path)))
+
+
+class TestCrawler(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.options = dict(
+            (name, getattr(GsyncOptions, name))
+            for name in ("recursive", "dirs", "force_dest_file")
+        )
+
+        os.makedirs(os.path.join(self.tempdir, "src", "sub"))
+        for name in ("f1", os.path.join("sub", "f2")):
+            open(os.path.join(self.tempdir, "src", name), "w").close()
+
+    def tearDown(self):
+        for name, value in self.options.iteritems():
+            setattr(GsyncOptions, name, value)
+
+        shutil.rmtree(self.tempdir)
+
+    def test_directories_are_prefetched_and_flushed_in_turn(self):
+        GsyncOptions.recursive = True
+        GsyncOptions.dirs = False
+        GsyncOptions.force_dest_file = False
+
+        events = []
+        src = os.path.join(self.tempdir, "src")
+
+        crawler = Crawler.__new__(Crawler)
+        crawler._src = src
+        crawler._dst = "drive://dst"
+        crawler._drive = FakeDrive(events)
+        crawler._sync = FakeSync(self.tempdir, events)
+        crawler._batch = FakeBatch(events, [
+            ("drive://dst/src/f1", IOError("failed")),
+        ])
+
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            crawler._walk(src, os_walk_wrapper, None)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+
+        self.assertEqual(events, [
+            ("prefetch", "drive://dst/src"),
+            ("sync", "src"),
+            ("prefetch", "drive://dst/src/sub"),
+            ("sync", "f1"),
+            ("flush",),
+            ("prefetch", "drive://dst/src/sub"),
+            ("sync", "sub"),
+            ("sync", "f2"),
+            ("flush",),
+        ])
+
+        # Failures are reported once, as soon as their directory is done.
+        self.assertEqual(output, "Error: drive://dst/src/f1: failed\n")
+        self.assertEqual(crawler._batch.failures, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
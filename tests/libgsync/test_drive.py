@@ -3,11 +3,22 @@
 
 # Copyright (C) 2014 Craig Phillips.  All rights reserved.
 
-import unittest, os, inspect
+import unittest, os, sys, inspect, tempfile, shutil, threading, time
+from StringIO import StringIO
 from libgsync.output import debug
-from libgsync.drive import Drive, DriveFile, DrivePathCache
+from libgsync.drive import Drive, DriveFile, DrivePathCache, NoServiceError
+from libgsync.drive.cache import DriveCacheStore
+from libgsync.drive.chunks import CHUNK_UNIT
+from libgsync.drive.sessions import DriveUploadSessions
+from libgsync.drive.file import FILE_FIELDS
+from libgsync.drive.listing import DriveListingCache
+from libgsync.drive.retry import DriveRetryPolicy
+from libgsync.drive.batch import DriveBatchError
+from contextlib import contextmanager
 from libgsync.drive.mimetypes import MimeTypes
-from apiclient.http import MediaFileUpload
+from apiclient.http import MediaFileUpload, MediaUploadProgress
+from apiclient.errors import HttpError
+import httplib2
 
 # This decorator is used to skip tests that require authentication and a
 # connection to a user's drive account.  Rather than fail setup or tests,
@@ -45,6 +56,143 @@ def setup_drive_data(testcase):
     )
 
 
+class FakeRequest(object):
+    """A request answered with the response it was made with, or raising it"""
+    def __init__(self, response):
+        self.response = response
+
+    def execute(self):
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+class FakeBatch(object):
+    """A batch request that records its size as it is executed"""
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self, http=None):
+        self.service.batches.append(len(self.requests))
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except Exception, ex:
+                self.callback(request_id, None, ex)
+
+
+class FakeService(object):
+    """
+    A Drive service that records the calls made to the files collection,
+    answering each with the entity the Drive would return, but for the
+    insertion of the titles in 'failing'.
+    """
+    def __init__(self):
+        self.calls = []
+        self.batches = []
+        self.failing = set()
+        self._http = None
+
+    def files(self):
+        return self
+
+    def insert(self, body, fields, media_body=None):
+        self.calls.append(("insert", body['title'], media_body))
+        if body['title'] in self.failing:
+            return FakeRequest(IOError("insert failed"))
+        return FakeRequest(dict(body, id=body['title']))
+
+    def update(self, fileId, body, media_body=None, **kwargs):
+        self.calls.append(("update", fileId, media_body))
+        return FakeRequest(dict(body, id=fileId))
+
+    def patch(self, fileId, body, setModifiedDate, fields):
+        self.calls.append(("patch", fileId, body, setModifiedDate))
+        return FakeRequest(dict(
+            body, id=fileId, title=fileId, parents=[ { 'id': "a" } ]
+        ))
+
+    def trash(self, fileId, fields=None):
+        self.calls.append(("trash", fileId))
+        return FakeRequest({ 'id': fileId })
+
+    def get(self, fileId, fields):
+        self.calls.append(("get", fileId, fields))
+        return FakeRequest({ 'downloadUrl': "http://download/%s" % fileId })
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+class FakeHttp(object):
+    """An http transport answering requests with the responses given"""
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def request(self, url, headers=None):
+        self.requests.append((url, headers))
+        status, data = self.responses.pop(0)
+        return httplib2.Response({ 'status': status }), data
+
+
+class FakeResumableRequest(object):
+    """
+    A resumable upload of 'size' bytes, sent in chunks of the size set on
+    its media, that is interrupted at the offset 'interrupt_at',
+    or whose session has expired if 'expired' is given.
+    """
+    class Media(object):
+        def __init__(self, size):
+            self._size = size
+
+        def size(self):
+            return self._size
+
+        def chunksize(self):
+            return CHUNK_UNIT
+
+    def __init__(self, size=CHUNK_UNIT * 3, interrupt_at=None, expired=False):
+        self.resumable = self.Media(size)
+        self.resumable_uri = None
+        self.resumable_progress = 0
+        self._in_error_state = False
+        self.interrupt_at = interrupt_at
+        self.expired = expired
+        self.queried = []
+        self.sizes = []
+
+    def next_chunk(self):
+        if self._in_error_state:
+            self.queried.append(self.resumable_uri)
+            if self.expired:
+                raise HttpError(httplib2.Response({ 'status': 404 }), "")
+
+            self._in_error_state = False
+
+        if self.resumable_uri is None:
+            self.resumable_uri = "http://upload/%d" % len(self.queried)
+
+        if self.resumable_progress == self.interrupt_at:
+            self._in_error_state = True
+            raise KeyboardInterrupt()
+
+        size = self.resumable.chunksize()
+        self.sizes.append(size / CHUNK_UNIT)
+
+        total = self.resumable.size()
+        self.resumable_progress = min(total, self.resumable_progress + size)
+        if self.resumable_progress < total:
+            return MediaUploadProgress(self.resumable_progress, total), None
+
+        return None, { 'id': "f", 'fileSize': str(total) }
+
+
 class TestDrivePathCache(unittest.TestCase):
     def test_constructor(self):
         dpc = DrivePathCache({
@@ -96,6 +244,150 @@ class TestDrivePathCache(unittest.TestCase):
         self.assertEqual(dpc.get("drive://gsync_unittest/2"), None)
         self.assertEqual(dpc.get("drive://gsync_unittest/3"), None)
 
+    def test_clear_tree(self):
+        dpc = DrivePathCache()
+
+        dpc.put("drive://gsync_unittest", {})
+        dpc.put("drive://gsync_unittest/a", {})
+        dpc.put("drive://gsync_unittest/a/b", {})
+        dpc.put("drive://gsync_unittest/ab", {})
+
+        dpc.clear_tree("drive://gsync_unittest/a")
+        self.assertEqual(dpc.get("drive://gsync_unittest"), {})
+        self.assertEqual(dpc.get("drive://gsync_unittest/a"), None)
+        self.assertEqual(dpc.get("drive://gsync_unittest/a/b"), None)
+        self.assertEqual(dpc.get("drive://gsync_unittest/ab"), {})
+
+    def test_compact_records(self):
+        dpc = DrivePathCache()
+        ent = {
+            'id': '1', 'title': 'a', 'mimeType': MimeTypes.FOLDER,
+            'parents': [ { 'id': 'r', 'isRoot': True }, { 'id': 'p' } ],
+            'labels': { 'trashed': False },
+        }
+
+        dpc.put("drive://a", DriveFile(path="drive://a", **ent))
+        self.assertEqual(dpc.get("drive://a"), ent)
+        self.assertEqual(len(dpc), 1)
+
+    def test_paths(self):
+        dpc = DrivePathCache()
+
+        dpc.put("drive://a", { 'id': '1' })
+        dpc.put(u"drive://b/\xe9", { 'id': '1' })
+        dpc.put("drive://c", { 'id': '2' })
+        self.assertEqual(dpc.paths('1'), [ "drive://a", u"drive://b/\xe9" ])
+
+        dpc.clear_id('1')
+        self.assertEqual(dpc.paths('1'), [])
+        self.assertEqual(dpc.get("drive://c"), { 'id': '2' })
+        self.assertEqual(len(dpc), 1)
+
+    def test_clear_tree_root(self):
+        dpc = DrivePathCache()
+
+        dpc.put("drive://", { 'id': 'root' })
+        dpc.put("drive://a/b", { 'id': 'b' })
+        dpc.clear_tree("drive://")
+
+        self.assertEqual(dpc.get("drive://a/b"), None)
+        self.assertEqual(len(dpc), 0)
+        self.assertEqual(dpc.size, 0)
+
+    def test_lru_eviction(self):
+        dpc = DrivePathCache()
+        dpc.put("drive://a/0", { 'id': '0' })
+        entry_size = dpc.size
+
+        dpc = DrivePathCache(max_bytes=entry_size * 3)
+        for i in xrange(3):
+            dpc.put("drive://a/%d" % i, { 'id': str(i) })
+
+        # Using the oldest entry saves it from eviction.
+        self.assertEqual(dpc.get("drive://a/0"), { 'id': '0' })
+        dpc.put("drive://a/3", { 'id': '3' })
+
+        self.assertEqual(len(dpc), 3)
+        self.assertTrue(dpc.size <= entry_size * 3)
+        self.assertEqual(dpc.get("drive://a/1"), None)
+        self.assertEqual(dpc.paths('1'), [])
+        self.assertEqual(dpc.get("drive://a/0"), { 'id': '0' })
+        self.assertEqual(dpc.get("drive://a/3"), { 'id': '3' })
+
+    def test_store(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, "pcache")
+
+            dpc = DrivePathCache(store=DriveCacheStore(filename))
+            dpc.put("drive://gsync_unittest/1", { 'id': '1' })
+            dpc.put("drive://gsync_unittest/1/2", { 'id': '2' })
+            dpc.close()
+
+            dpc = DrivePathCache(store=DriveCacheStore(filename))
+            self.assertEqual(dpc.get("drive://gsync_unittest/1"), { 'id': '1' })
+
+            dpc.clear_tree("drive://gsync_unittest/1")
+            dpc.close()
+
+            dpc = DrivePathCache(store=DriveCacheStore(filename))
+            self.assertEqual(dpc.get("drive://gsync_unittest/1"), None)
+            self.assertEqual(dpc.get("drive://gsync_unittest/1/2"), None)
+            dpc.close()
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_store_clear_tree_visits_only_the_tree(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            class Store(DriveCacheStore):
+                def keys(self):
+                    raise AssertionError("The whole store was scanned")
+
+            filename = os.path.join(tempdir, "pcache")
+
+            dpc = DrivePathCache(store=Store(filename))
+            dpc.CHILD_INDEXES = 1
+            dpc.put("drive://a", { 'id': 'a' })
+            dpc.put("drive://a/b", { 'id': 'b' })
+            dpc.put("drive://a/b/c", { 'id': 'c' })
+            dpc.put("drive://ab", { 'id': 'ab' })
+            dpc.close()
+
+            dpc = DrivePathCache(store=Store(filename))
+            dpc.clear_tree("drive://a")
+            dpc.close()
+
+            dpc = DrivePathCache(store=Store(filename))
+            self.assertEqual(dpc.get("drive://a/b/c"), None)
+            self.assertEqual(dpc.paths('c'), [])
+            self.assertEqual(dpc.get("drive://ab"), { 'id': 'ab' })
+            dpc.close()
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_store_child_indexes_survive_without_close(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, "pcache")
+
+            # The store is closed, as it would be flushed should gsync be
+            # killed, but the path cache never is.
+            store = DriveCacheStore(filename)
+            dpc = DrivePathCache(store=store)
+            dpc.put("drive://a", { 'id': 'a' })
+            dpc.put("drive://a/b", { 'id': 'b' })
+            dpc.put("drive://a/b/c", { 'id': 'c' })
+            store.close()
+
+            dpc = DrivePathCache(store=DriveCacheStore(filename))
+            dpc.clear_tree("drive://a")
+            self.assertEqual(dpc.get("drive://a/b/c"), None)
+            self.assertEqual(dpc.paths('c'), [])
+            dpc.close()
+        finally:
+            shutil.rmtree(tempdir)
+
     def test_repr(self):
         dpc = DrivePathCache()
         self.assertEqual(repr(dpc), "DrivePathCache({})")
@@ -262,7 +554,7 @@ class TestDrive(unittest.TestCase):
         info2 = drive.create("drive://gsync_unittest/create_test", {
             "description": "This file will replace the first one"
         })
-        self.assertNotEqual(info['id'], info2['id'])
+        self.assertEqual(info['id'], info2['id'])
         self.assertEqual(info2['title'], "create_test")
         self.assertEqual(info2['description'], "This file will replace the first one")
 
@@ -293,6 +585,813 @@ class TestDrive(unittest.TestCase):
         self.assertTrue(progress_callback.called)
 
 
+class TestDriveListing(unittest.TestCase):
+    listing = {
+        'root': [
+            { 'id': 'a', 'title': 'a', 'mimeType': MimeTypes.FOLDER },
+            { 'id': 'f1', 'title': 'f1', 'mimeType': MimeTypes.BINARY_FILE },
+        ],
+        'a': [
+            { 'id': 'b', 'title': 'b', 'mimeType': MimeTypes.FOLDER },
+            { 'id': 'f2', 'title': 'f2', 'mimeType': MimeTypes.BINARY_FILE },
+        ],
+        'b': [],
+    }
+
+    def setUp(self):
+        self.drive = Drive()
+        self.pcache = self.drive._pcache
+        self.queries = []
+
+        def _query(**kwargs):
+            self.queries.append(kwargs['parent_id'])
+            return [ dict(ent) for ent in self.listing[kwargs['parent_id']] ]
+
+        self.drive._iquery = _query
+        self.drive._pcache = DrivePathCache()
+        self.drive._listings = DriveListingCache()
+        self.drive._folder_sizes = {}
+
+    def tearDown(self):
+        del self.drive._iquery
+        self.drive._pcache = self.pcache
+        self.drive._listings = DriveListingCache()
+        self.drive._folder_sizes = {}
+
+    @contextmanager
+    def fake_service(self):
+        fake = FakeService()
+
+        @contextmanager
+        def service():
+            yield fake
+
+        self.drive.service = service
+        try:
+            yield fake
+        finally:
+            del self.drive.service
+
+    def test_listdir_entities(self):
+        ents = self.drive.listdir_entities("drive://a")
+
+        self.assertEqual([ ent.title for ent in ents ], [ "b", "f2" ])
+        self.assertEqual(ents[0].path, "drive://a/b")
+        self.assertEqual(self.drive._pcache.get("drive://a/f2")['id'], "f2")
+
+        self.assertEqual(self.drive.stat("drive://a/f2").id, "f2")
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+    def test_stat_missing_from_complete_listing(self):
+        self.assertEqual(self.drive.stat("drive://a/f2").id, "f2")
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+        self.assertIsNone(self.drive.stat("drive://a/missing"))
+        self.assertIsNone(self.drive.stat("drive://a/missing/f3"))
+        self.assertIsNone(self.drive.stat("drive://missing"))
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+    def test_stat_latin1_name_in_complete_listing(self):
+        self.drive.listdir_entities("drive://a")
+
+        self.assertIsNone(self.drive.stat("drive://a/caf\xe9"))
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+    def test_created_folders_are_complete_and_empty(self):
+        with self.fake_service() as fake:
+            self.drive.mkdir("drive://a/new/sub")
+
+        self.assertEqual(fake.calls, [
+            ("insert", "new", None), ("insert", "sub", None),
+        ])
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+        self.assertEqual(self.drive.stat("drive://a/new").id, "new")
+        self.assertEqual(self.drive.stat("drive://a/new/sub").id, "sub")
+        self.assertIsNone(self.drive.stat("drive://a/new/f3"))
+        self.assertIsNone(self.drive.stat("drive://a/new/sub/f3"))
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+    def test_create_with_content(self):
+        with self.fake_service() as fake:
+            info = self.drive.create("drive://a/new", {
+                'description': "desc", 'mimeType': MimeTypes.BINARY_FILE,
+            }, media_body="content")
+
+            self.assertEqual(info['id'], "new")
+            self.assertEqual(info['description'], "desc")
+            self.assertEqual(fake.calls, [ ("insert", "new", "content") ])
+
+            # An existing file is replaced in place, keeping its ID.
+            del fake.calls[:]
+            info = self.drive.create("drive://a/f2", {
+                'mimeType': MimeTypes.BINARY_FILE,
+            }, media_body="content")
+
+            self.assertEqual(info['id'], "f2")
+            self.assertEqual(fake.calls, [ ("update", "f2", "content") ])
+
+            # Whereas a folder is replaced by a new file.
+            del fake.calls[:]
+            info = self.drive.create("drive://a/b", {
+                'mimeType': MimeTypes.BINARY_FILE,
+            })
+
+            self.assertEqual(fake.calls, [
+                ("trash", "b"), ("insert", "b", ""),
+            ])
+
+            # The modified date is only set when asked to be.
+            modified = { 'modifiedDate': "2014-05-10T12:34:56.000Z" }
+            info = self.drive.create("drive://a/new2", modified)
+            self.assertFalse('modifiedDate' in info)
+
+            info = self.drive.create("drive://a/new3", modified, options={
+                'setModifiedDate': True,
+            })
+            self.assertEqual(info['modifiedDate'], modified['modifiedDate'])
+
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+    def test_upload_in_one_request(self):
+        progress = []
+        req = FakeRequest({ 'id': "f", 'fileSize': "10" })
+
+        res = self.drive._upload(req, progress.append)
+
+        self.assertEqual(res['id'], "f")
+        self.assertEqual([
+            (p.resumable_progress, p.total_size) for p in progress
+        ], [ (10, 10) ])
+
+    def test_upload_in_adaptive_chunks(self):
+        progress = []
+        req = FakeResumableRequest(size=CHUNK_UNIT * 7)
+
+        self.drive.set_chunk_size(CHUNK_UNIT, adaptive=True)
+        try:
+            res = self.drive._upload(req, progress.append)
+        finally:
+            self.drive.set_chunk_size()
+
+        self.assertEqual(res['id'], "f")
+        self.assertEqual(req.sizes, [ 1, 2, 4 ])
+        self.assertEqual([ p.resumable_progress for p in progress ], [
+            CHUNK_UNIT, CHUNK_UNIT * 3, CHUNK_UNIT * 7
+        ])
+
+    @contextmanager
+    def partial_dir(self):
+        tempdir = tempfile.mkdtemp()
+        self.drive._sessions = DriveUploadSessions(tempdir)
+        try:
+            yield tempdir
+        finally:
+            self.drive._sessions = None
+            shutil.rmtree(tempdir)
+
+    def test_upload_resumed(self):
+        identity = { 'path': u"drive://f", 'source': { 'size': 3 } }
+
+        with self.partial_dir() as tempdir:
+            req = FakeResumableRequest(interrupt_at=CHUNK_UNIT * 2)
+            self.assertRaises(
+                KeyboardInterrupt, self.drive._upload, req, None, identity
+            )
+
+            self.assertEqual(
+                self.drive._sessions.get(identity),
+                ("http://upload/0", CHUNK_UNIT * 2)
+            )
+
+            progress = []
+            req = FakeResumableRequest()
+            res = self.drive._upload(req, progress.append, identity)
+
+            self.assertEqual(res['id'], "f")
+            self.assertEqual(req.queried, [ "http://upload/0" ])
+            self.assertEqual(len(progress), 1)
+            self.assertEqual(os.listdir(tempdir), [])
+
+    def test_upload_resumed_without_error_state(self):
+        identity = { 'path': u"drive://f", 'source': { 'size': 3 } }
+
+        with self.partial_dir():
+            self.drive._sessions.put(identity, "http://upload/old", 42)
+
+            req = FakeResumableRequest()
+            del req._in_error_state
+
+            self.assertRaises(NotImplementedError,
+                self.drive._upload, req, None, identity
+            )
+
+    def test_upload_restarted_after_session_expired(self):
+        identity = { 'path': u"drive://f", 'source': { 'size': 3 } }
+
+        with self.partial_dir():
+            self.drive._sessions.put(identity, "http://upload/old", 42)
+
+            req = FakeResumableRequest(expired=True)
+            res = self.drive._upload(req, None, identity)
+
+            self.assertEqual(res['id'], "f")
+            self.assertEqual(req.queried, [ "http://upload/old" ])
+            self.assertEqual(req.resumable_uri, "http://upload/1")
+            self.assertEqual(self.drive._sessions.get(identity), None)
+
+    def test_upload_failure_is_raised(self):
+        req = FakeResumableRequest(expired=True)
+        req.resumable_uri = "http://upload/old"
+        req._in_error_state = True
+
+        self.assertRaises(HttpError, self.drive._upload, req)
+
+    def test_patch(self):
+        with self.fake_service() as fake:
+            info = self.drive.patch("drive://a/f2", {
+                'id': "ignored", 'description': "desc",
+            }, options={ 'setModifiedDate': True })
+
+        self.assertEqual(fake.calls, [
+            ("patch", "f2", { 'description': "desc" }, True),
+        ])
+        self.assertEqual(info['description'], "desc")
+        self.assertEqual(self.drive.stat("drive://a/f2").description, "desc")
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+    def test_prefetch(self):
+        self.drive.prefetch("drive://a")
+        self.assertTrue(self.drive._listings.expecting("a"))
+
+        self.assertEqual(self.drive.stat("drive://a/f2").id, "f2")
+        self.assertIsNone(self.drive.stat("drive://a/missing"))
+        self.assertFalse(self.drive._listings.expecting("a"))
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+        # Folders already listed are not listed again.
+        self.drive.prefetch("drive://a")
+        self.drive.prefetch("drive://f1")
+        self.assertFalse(self.drive._listings.expecting("a"))
+        self.assertEqual(self.queries, [ "root", "a" ])
+
+    def test_prefetch_failed(self):
+        def _query(**kwargs):
+            if kwargs['parent_id'] == "a":
+                raise IOError("failed")
+            return [ dict(ent) for ent in self.listing[kwargs['parent_id']] ]
+
+        self.drive._iquery = _query
+        self.drive.prefetch("drive://a")
+
+        self.drive._iquery = lambda **kwargs: self.listing[kwargs['parent_id']]
+        self.assertEqual(self.drive.stat("drive://a/f2").id, "f2")
+        self.assertTrue(self.drive._listings.complete("a"))
+
+    def test_snapshot(self):
+        def parents(parent_id):
+            if parent_id == "root":
+                return [ { 'id': "root_id", 'isRoot': True } ]
+            return [ { 'id': parent_id, 'isRoot': False } ]
+
+        ents = [
+            dict(ent, parents=parents(parent_id))
+            for parent_id, listing in self.listing.iteritems()
+            for ent in listing
+        ]
+
+        def _query(**kwargs):
+            self.queries.append(kwargs.get('parent_id'))
+            return ents
+
+        self.drive._iquery = _query
+        self.drive.snapshot()
+        try:
+            walked = list(self.drive.walk("drive://"))
+
+            self.assertEqual(walked, [
+                ("drive://", [ "a" ], [ "f1" ]),
+                ("drive://a", [ "b" ], [ "f2" ]),
+                ("drive://a/b", [], []),
+            ])
+            self.assertEqual(self.drive.listdir("drive://a"), [ "b", "f2" ])
+            self.assertEqual(self.drive.stat("drive://a/f2").id, "f2")
+            self.assertIsNone(self.drive.stat("drive://a/b/missing"))
+            self.assertEqual(self.queries, [ None ])
+        finally:
+            self.drive._snapshot = False
+
+    def test_scan(self):
+        scanned = [
+            (ent.path, ent.id) for ent in self.drive.scan("drive://", True)
+        ]
+
+        self.assertEqual(scanned, [
+            ("drive://", "root"),
+            ("drive://a", "a"),
+            ("drive://f1", "f1"),
+            ("drive://a/b", "b"),
+            ("drive://a/f2", "f2"),
+        ])
+        self.assertEqual(self.queries, [ "root", "a", "b" ])
+
+        # Scans are neither cached nor held as complete listings.
+        self.assertIsNone(self.drive._pcache.get("drive://a/f2"))
+        self.assertFalse(self.drive._listings.complete("a"))
+
+        scanned = [ ent.path for ent in self.drive.scan("drive://a") ]
+        self.assertEqual(scanned, [
+            "drive://a", "drive://a/b", "drive://a/f2",
+        ])
+
+    def test_stat_large_folder_by_title(self):
+        self.drive.LARGE_FOLDER_SIZE = 1
+        try:
+            self.assertEqual(self.drive.stat("drive://a/f2").id, "f2")
+            self.assertEqual(self.drive._folder_size("root"), 2)
+            self.assertEqual(self.drive._folder_size("a"), 2)
+
+            self.drive._pcache = DrivePathCache()
+            self.drive._listings = DriveListingCache()
+            queries = []
+
+            def _query(**kwargs):
+                queries.append(kwargs)
+                yield { 'id': kwargs['title'], 'title': kwargs['title'] }
+
+            self.drive._iquery = _query
+            self.assertEqual(self.drive.stat("drive://a/f2").id, "f2")
+
+            # Both folders are now known to be large.
+            self.assertEqual(queries, [
+                { 'parent_id': "root", 'title': "a" },
+                { 'parent_id': "a", 'title': "f2" },
+            ])
+        finally:
+            del self.drive.LARGE_FOLDER_SIZE
+
+    def test_batched_operations_are_sent_before_stat(self):
+        with self.fake_service() as fake:
+            with self.drive.batch():
+                self.assertIsNone(self.drive.mkdir("drive://a/new"))
+                self.drive.delete("drive://f1")
+                self.assertEqual(fake.batches, [])
+
+                self.assertEqual(self.drive.stat("drive://a/new").id, "new")
+                self.assertEqual(fake.batches, [ 2 ])
+
+                self.drive.delete("drive://a/new")
+
+            self.assertEqual(fake.batches, [ 2, 1 ])
+            self.assertIsNone(self.drive._batch)
+
+    def test_sibling_folders_are_created_in_one_batch(self):
+        with self.fake_service() as fake:
+            with self.drive.batch():
+                for name in ("x", "y"):
+                    self.drive.mkdir("drive://a/%s" % name, {
+                        'description': name, 'modifiedDate': "ignored",
+                    })
+                self.assertEqual(fake.batches, [])
+
+                self.assertEqual(
+                    self.drive.stat("drive://a/y").description, "y"
+                )
+                self.assertEqual(fake.batches, [ 2 ])
+
+        self.assertIsNone(self.drive.stat("drive://a/x").modifiedDate)
+
+    def test_batched_operations_are_sent_before_listing(self):
+        with self.fake_service() as fake:
+            with self.drive.batch():
+                self.drive.delete("drive://a/f2")
+                self.assertEqual(fake.batches, [])
+
+                self.drive.listdir_entities("drive://")
+                self.assertEqual(fake.batches, [ 1 ])
+
+    def test_create_in_folder_that_failed_to_be_batched(self):
+        with self.fake_service() as fake:
+            fake.failing.add("new")
+
+            def create():
+                with self.drive.batch():
+                    self.drive.mkdir("drive://a/new")
+                    self.drive.create("drive://a/new/f3", {})
+
+            self.assertRaises(DriveBatchError, create)
+            self.assertEqual(fake.calls, [ ("insert", "new", None) ])
+
+    def test_batch_left_by_exception_is_sent(self):
+        stderr = sys.stderr
+        sys.stderr = StringIO()
+
+        try:
+            with self.fake_service() as fake:
+                fake.failing.add("y")
+
+                def fail():
+                    with self.drive.batch():
+                        self.drive.mkdir("drive://a/x")
+                        self.drive.mkdir("drive://a/y")
+                        raise KeyError("failed")
+
+                self.assertRaises(KeyError, fail)
+                self.assertEqual(fake.batches, [ 2 ])
+                self.assertIsNone(self.drive._batch)
+
+            self.assertEqual(sys.stderr.getvalue(),
+                "gsync: batched operation failed: drive://a/y "
+                "(insert failed)\n"
+            )
+        finally:
+            sys.stderr = stderr
+
+    def test_download_is_retried(self):
+        delays = []
+        self.drive.set_retry_policy(
+            DriveRetryPolicy(sleep=delays.append, rand=lambda: 1.0)
+        )
+
+        try:
+            with self.fake_service() as fake:
+                fake._http = FakeHttp([
+                    (503, ""), (429, ""), (206, "data"), (404, ""),
+                ])
+
+                fd = self.drive.open("drive://f1")
+                self.assertEqual(fd.read(4), "data")
+                self.assertEqual(fd.tell(), 4)
+                self.assertEqual(delays, [ 1.0, 2.0 ])
+                self.assertEqual(len(fake._http.requests), 3)
+
+                self.assertRaises(HttpError, fd.read, 4)
+                self.assertEqual(fd.tell(), 4)
+        finally:
+            self.drive.set_retry_policy(DriveRetryPolicy())
+
+    def test_listdir(self):
+        self.assertEqual(self.drive.listdir("drive://"), [ "a", "f1" ])
+
+    def test_walk_lists_each_folder_once(self):
+        walked = list(self.drive.walk("drive://"))
+
+        self.assertEqual(walked, [
+            ("drive://", [ "a" ], [ "f1" ]),
+            ("drive://a", [ "b" ], [ "f2" ]),
+            ("drive://a/b", [], []),
+        ])
+        self.assertEqual(self.queries, [ "root", "a", "b" ])
+
+    def test_walk_bottomup(self):
+        walked = [ vals[0] for vals in self.drive.walk("drive://", False) ]
+        self.assertEqual(walked, [ "drive://a/b", "drive://a", "drive://" ])
+
+    def test_walk_prunes_removed_directories(self):
+        walked = []
+        for dirpath, dirs, _ in self.drive.walk("drive://"):
+            walked.append(dirpath)
+            if "b" in dirs:
+                dirs.remove("b")
+
+        self.assertEqual(walked, [ "drive://", "drive://a" ])
+
+    def test_walk_onerror(self):
+        errors = []
+        walked = list(self.drive.walk("drive://missing", onerror=errors.append))
+
+        self.assertEqual(walked, [])
+        self.assertEqual(len(errors), 1)
+
+    def test_walk_lists_folders_concurrently(self):
+        lock = threading.Lock()
+        active = [ 0, 0 ]
+
+        listing = {
+            'root': [
+                { 'id': 'd%d' % i, 'title': 'd%d' % i,
+                  'mimeType': MimeTypes.FOLDER }
+                for i in xrange(6)
+            ],
+        }
+
+        def _query(**kwargs):
+            parent_id = kwargs['parent_id']
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+
+            time.sleep(0.05)
+
+            with lock:
+                active[0] -= 1
+
+            if parent_id == "d3":
+                raise Exception("listing failed")
+
+            return [ dict(ent) for ent in listing.get(parent_id, []) ]
+
+        self.drive._iquery = _query
+        self.drive.set_list_workers(3)
+        try:
+            errors = []
+            walked = [
+                vals[0] for vals in
+                self.drive.walk("drive://", onerror=errors.append)
+            ]
+        finally:
+            self.drive.set_list_workers(Drive.LIST_WORKERS)
+
+        self.assertEqual(walked, [
+            "drive://", "drive://d0", "drive://d1", "drive://d2",
+            "drive://d4", "drive://d5",
+        ])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(active[1], 3)
+
+    def test_walk_bounds_listings_held(self):
+        lock = threading.Lock()
+        listed = []
+
+        listing = {
+            'root': [
+                { 'id': 'd%d' % i, 'title': 'd%d' % i,
+                  'mimeType': MimeTypes.FOLDER }
+                for i in xrange(20)
+            ],
+        }
+
+        def _query(**kwargs):
+            with lock:
+                listed.append(kwargs['parent_id'])
+            return [ dict(ent) for ent in listing.get(kwargs['parent_id'], []) ]
+
+        self.drive._iquery = _query
+        self.drive.set_list_workers(2)
+        try:
+            walked = 0
+            for breadth_first in (False, True):
+                del listed[:]
+                walker = self.drive.walk(
+                    "drive://", breadth_first=breadth_first
+                )
+                # Besides the root, no more than two listings per worker
+                # are fetched ahead of the folders walked.
+                for walked, _ in enumerate(walker):
+                    time.sleep(0.005)
+                    with lock:
+                        self.assertTrue(len(listed) - 1 - walked <= 4)
+
+                self.assertEqual(walked, 20)
+                self.assertEqual(len(listed), 21)
+        finally:
+            self.drive.set_list_workers(Drive.LIST_WORKERS)
+
+    def test_walk_breadth_first(self):
+        self.listing = {
+            'root': [
+                { 'id': 'a', 'title': 'a', 'mimeType': MimeTypes.FOLDER },
+                { 'id': 'c', 'title': 'c', 'mimeType': MimeTypes.FOLDER },
+            ],
+            'a': [ { 'id': 'b', 'title': 'b', 'mimeType': MimeTypes.FOLDER } ],
+            'b': [],
+            'c': [ { 'id': 'd', 'title': 'd', 'mimeType': MimeTypes.FOLDER } ],
+            'd': [],
+        }
+
+        walked = [
+            vals[0] for vals in self.drive.walk("drive://", breadth_first=True)
+        ]
+        self.assertEqual(walked, [
+            "drive://", "drive://a", "drive://c", "drive://a/b", "drive://c/d"
+        ])
+
+        walked = [
+            vals[0] for vals in
+            self.drive.walk("drive://", False, breadth_first=True)
+        ]
+        self.assertEqual(walked, [
+            "drive://c/d", "drive://a/b", "drive://c", "drive://a", "drive://"
+        ])
+
+        walked = []
+        for dirpath, dirs, _ in self.drive.walk("drive://", breadth_first=True):
+            walked.append(dirpath)
+            if "a" in dirs:
+                dirs.remove("a")
+
+        self.assertEqual(walked, [ "drive://", "drive://c", "drive://c/d" ])
+
+    def test_walk_deep_tree(self):
+        depth = sys.getrecursionlimit() + 100
+        self.listing = dict([
+            (str(i), [ {
+                'id': str(i + 1), 'title': 'd', 'mimeType': MimeTypes.FOLDER
+            } ])
+            for i in xrange(depth)
+        ])
+        self.listing['root'] = self.listing.pop('0')
+        self.listing[str(depth)] = []
+
+        walked = list(self.drive.walk("drive://", False))
+
+        self.assertEqual(len(walked), depth + 1)
+        self.assertEqual(walked[-1][0], "drive://")
+        self.assertEqual(walked[0][0].count("/d"), depth)
+
+    def test_walk_sequentially(self):
+        self.drive.set_list_workers(1)
+        try:
+            walked = [ vals[0] for vals in self.drive.walk("drive://") ]
+        finally:
+            self.drive.set_list_workers(Drive.LIST_WORKERS)
+
+        self.assertIsNone(self.drive._pool)
+        self.assertEqual(walked, [ "drive://", "drive://a", "drive://a/b" ])
+        self.assertEqual(self.queries, [ "root", "a", "b" ])
+
+
+class TestDriveQuery(unittest.TestCase):
+    class FakeService(object):
+        def __init__(self, pages):
+            self.pages = pages
+            self.params = []
+
+        def files(self):
+            return self
+
+        def list(self, **param):
+            self.params.append(dict(param))
+            return self
+
+        def execute(self):
+            return self.pages.pop(0)
+
+    def setUp(self):
+        self.drive = Drive()
+        self.fake = self.FakeService([
+            { 'items': [ { 'id': '1' } ], 'nextPageToken': 'page2' },
+            { 'items': [ { 'id': '2' } ] },
+        ])
+
+        @contextmanager
+        def service():
+            yield self.fake
+
+        self.drive.service = service
+
+    def tearDown(self):
+        del self.drive.service
+
+    def test_query_requests_used_fields_in_large_pages(self):
+        ents = self.drive._query(parent_id="root")
+
+        self.assertEqual(ents, [ { 'id': '1' }, { 'id': '2' } ])
+        self.assertEqual(len(self.fake.params), 2)
+
+        for param in self.fake.params:
+            self.assertEqual(param['maxResults'], 1000)
+            self.assertEqual(param['fields'],
+                "nextPageToken,items(%s)" % FILE_FIELDS
+            )
+            self.assertEqual(param['q'],
+                '"root" in parents and trashed = false'
+            )
+
+        self.assertEqual(self.fake.params[1]['pageToken'], 'page2')
+
+    def test_query_by_title_is_escaped(self):
+        self.drive._query(parent_id="root", title='a "quoted" \\ title')
+
+        self.assertEqual(self.fake.params[0]['q'],
+            '"root" in parents and title = "a \\"quoted\\" \\\\ title" '
+            'and trashed = false'
+        )
+
+    def test_iquery_prefetches_following_pages(self):
+        threads = []
+        pages = [
+            { 'items': [ { 'id': '1' }, { 'id': '2' } ], 'nextPageToken': 'p2' },
+            { 'items': [ { 'id': '3' } ], 'nextPageToken': 'p3' },
+            { 'items': [ { 'id': '4' } ] },
+        ]
+
+        def execute():
+            threads.append(threading.current_thread())
+            return pages.pop(0)
+
+        self.fake.execute = execute
+        ents = self.drive._iquery(parent_id="root")
+
+        self.assertEqual(ents.next(), { 'id': '1' })
+        self.assertEqual([ ent['id'] for ent in ents ], [ '2', '3', '4' ])
+
+        self.assertEqual(len(threads), 3)
+        self.assertEqual(threads[0], threading.current_thread())
+        self.assertFalse(threading.current_thread() in threads[1:])
+
+    def test_iquery_stops_early(self):
+        fetched = threading.Event()
+        execute = self.fake.execute
+
+        def execute_page():
+            try:
+                return execute()
+            finally:
+                if not self.fake.pages:
+                    fetched.set()
+
+        self.fake.execute = execute_page
+        ents = self.drive._iquery(parent_id="root")
+
+        self.assertEqual(ents.next(), { 'id': '1' })
+        ents.close()
+
+        # The page fetched in the background is discarded.
+        self.assertTrue(fetched.wait(5))
+
+    def test_query_pages_are_rate_limited(self):
+        self.drive.set_rate_limit(1000)
+        try:
+            self.drive._query(parent_id="root")
+            self.assertEqual(self.drive.rate_limit_stats().requests, 2)
+        finally:
+            self.drive.set_rate_limit(None)
+
+        self.assertIsNone(self.drive.rate_limit_stats())
+
+
+class TestDriveDiscovery(unittest.TestCase):
+    class FakeResponse(object):
+        def __init__(self, status):
+            self.status = status
+
+    class FakeHttp(object):
+        def __init__(self, *responses):
+            self.responses = list(responses)
+            self.urls = []
+
+        def request(self, url):
+            self.urls.append(url)
+            res = self.responses.pop(0)
+            if isinstance(res, Exception):
+                raise res
+            return res
+
+    def setUp(self):
+        self.drive = Drive()
+        self.tempdir = tempfile.mkdtemp()
+        self.config_dir = os.getenv("GSYNC_CONFIG_DIR")
+        os.environ["GSYNC_CONFIG_DIR"] = self.tempdir
+        self.docfile = os.path.join(self.tempdir, "discovery.json")
+
+    def tearDown(self):
+        if self.config_dir is None:
+            del os.environ["GSYNC_CONFIG_DIR"]
+        else:
+            os.environ["GSYNC_CONFIG_DIR"] = self.config_dir
+
+        self.drive.set_discovery_ttl(Drive.DISCOVERY_TTL)
+        shutil.rmtree(self.tempdir)
+
+    def test_document_is_cached(self):
+        http = self.FakeHttp((self.FakeResponse(200), "{}"))
+        uri = "https://example.com/{api}/{apiVersion}"
+
+        self.assertEqual(self.drive._get_discovery_document(http, uri), "{}")
+        self.assertEqual(self.drive._get_discovery_document(http, uri), "{}")
+        self.assertEqual(http.urls, [ "https://example.com/drive/v2" ])
+        self.assertTrue(os.path.exists(self.docfile))
+
+    def test_expired_document_is_downloaded(self):
+        with open(self.docfile, "w") as fd:
+            fd.write("old")
+
+        self.drive.set_discovery_ttl(0)
+        http = self.FakeHttp((self.FakeResponse(200), "new"))
+
+        self.assertEqual(self.drive._get_discovery_document(http, ""), "new")
+        with open(self.docfile, "r") as fd:
+            self.assertEqual(fd.read(), "new")
+
+    def test_expired_document_is_used_offline(self):
+        with open(self.docfile, "w") as fd:
+            fd.write("old")
+
+        self.drive.set_discovery_ttl(0)
+        http = self.FakeHttp(IOError("offline"), (self.FakeResponse(500), ""))
+
+        self.assertEqual(self.drive._get_discovery_document(http, ""), "old")
+        self.assertEqual(self.drive._get_discovery_document(http, ""), "old")
+
+    def test_no_document(self):
+        http = self.FakeHttp(IOError("offline"))
+
+        self.assertRaises(NoServiceError,
+            self.drive._get_discovery_document, http, ""
+        )
+
+
 class TestDriveFileObject(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2014 Craig Phillips.  All rights reserved.
+
+import unittest, os, sys, stat, time, tempfile, shutil
+from StringIO import StringIO
+from libgsync.options import GsyncOptions
+from libgsync.drive import Drive, DriveFile
+from libgsync.drive.mimetypes import MimeTypes
+from libgsync.drive.cache import DriveCacheStore
+from libgsync.drive.query import DriveCacheQuery
+from libgsync.lister import Lister, filemode, format_entry
+
+
+class TestLister(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.stdout = sys.stdout
+        self.recursive = GsyncOptions.recursive
+        self.cached = GsyncOptions.cached
+        self.stats = GsyncOptions.stats
+        sys.stdout = StringIO()
+
+    def tearDown(self):
+        sys.stdout = self.stdout
+        GsyncOptions.recursive = self.recursive
+        GsyncOptions.cached = self.cached
+        GsyncOptions.stats = self.stats
+        shutil.rmtree(self.tempdir)
+
+        drive = Drive()
+        for name in ("scan", "cache_query"):
+            if name in drive.__dict__:
+                delattr(drive, name)
+
+    def names(self):
+        return [
+            line.split()[-1] for line in sys.stdout.getvalue().splitlines()
+        ]
+
+    def test_filemode(self):
+        self.assertEqual(filemode(stat.S_IFDIR | 0755), "drwxr-xr-x")
+        self.assertEqual(filemode(stat.S_IFREG | 0640), "-rw-r-----")
+        self.assertEqual(filemode(stat.S_IFLNK | 0777), "lrwxrwxrwx")
+
+    def test_format_entry(self):
+        mtime = time.mktime((2014, 5, 10, 12, 34, 56, 0, 0, -1))
+
+        self.assertEqual(
+            format_entry(stat.S_IFREG | 0644, 1234, mtime, "a/b"),
+            u"-rw-r--r--        1234 2014/05/10 12:34:56 a/b\n"
+        )
+
+    def test_local(self):
+        os.mkdir(os.path.join(self.tempdir, "d"))
+        open(os.path.join(self.tempdir, "d", "f"), "w").close()
+        open(os.path.join(self.tempdir, "g"), "w").close()
+
+        GsyncOptions.recursive = True
+        Lister(self.tempdir + "/").run()
+
+        self.assertEqual(self.names(), [ ".", "d", "g", "d/f" ])
+
+        sys.stdout = StringIO()
+        GsyncOptions.recursive = False
+        Lister(os.path.join(self.tempdir, "d")).run()
+
+        self.assertEqual(self.names(), [ "d", "d/f" ])
+
+    def test_remote(self):
+        scanned = []
+
+        def scan(top, recursive=False):
+            scanned.append((top, recursive))
+            for title, mimetype in [
+                ("folder", MimeTypes.FOLDER),
+                ("folder/file", MimeTypes.BINARY_FILE),
+            ]:
+                yield DriveFile(
+                    id=title, title=os.path.basename(title),
+                    path="drive://big/%s" % title, mimeType=mimetype,
+                    modifiedDate="2014-05-10T12:34:56.000Z", fileSize="10"
+                )
+
+        drive = Drive()
+        drive.scan = scan
+
+        GsyncOptions.recursive = True
+        Lister("drive://big/folder").run()
+
+        lines = sys.stdout.getvalue().splitlines()
+        self.assertEqual(scanned, [ ("drive://big/folder", True) ])
+        self.assertEqual(self.names(), [ "folder", "folder/file" ])
+        self.assertTrue(lines[0].startswith("drwxr-xr-x          10 "))
+        self.assertTrue(lines[1].startswith("-rw-r--r--          10 "))
+
+    def test_remote_without_stat_info(self):
+        def scan(top, recursive=False):
+            yield DriveFile(
+                id="notes", title="notes", path="drive://notes",
+                mimeType=MimeTypes.BINARY_FILE, fileSize="7",
+                description="Notes written by hand",
+                modifiedDate="2014-05-10T12:34:56.000Z"
+            )
+
+        drive = Drive()
+        drive.scan = scan
+
+        self.assertTrue(Lister("drive://notes").run())
+
+        lines = sys.stdout.getvalue().splitlines()
+        self.assertEqual(self.names(), [ "notes" ])
+        self.assertTrue(lines[0].startswith("-rw-r--r--           7 "))
+
+    def test_failed_listing(self):
+        def scan(top, recursive=False):
+            raise IOError("Listing failed")
+            yield
+
+        drive = Drive()
+        drive.scan = scan
+
+        self.assertFalse(Lister("drive://folder").run())
+        self.assertEqual(
+            sys.stdout.getvalue().splitlines()[-1],
+            "Error: IOError('Listing failed',)"
+        )
+
+    def test_cached(self):
+        store = DriveCacheStore(os.path.join(self.tempdir, "pcache"))
+        for title, mimetype, size in [
+            ("folder", MimeTypes.FOLDER, None),
+            ("folder/file", MimeTypes.BINARY_FILE, "10"),
+            ("folder/other", MimeTypes.BINARY_FILE, "5"),
+        ]:
+            ent = {
+                'id': title, 'title': os.path.basename(title),
+                'mimeType': mimetype,
+                'modifiedDate': "2014-05-10T12:34:56.000Z",
+            }
+            if size is not None:
+                ent['fileSize'] = size
+
+            store.put("drive://%s" % title, ent)
+
+        drive = Drive()
+        drive.scan = None
+        drive.cache_query = lambda ttl=None: DriveCacheQuery(store)
+
+        GsyncOptions.cached = True
+        GsyncOptions.stats = True
+        GsyncOptions.recursive = True
+        try:
+            Lister("drive://folder").run()
+        finally:
+            store.close()
+
+        lines = sys.stdout.getvalue().splitlines()
+        self.assertEqual(self.names()[:3], [
+            "folder", "folder/file", "folder/other",
+        ])
+        self.assertEqual(lines[3:5], [
+            "Number of files: 2", "Total file size: 15 bytes",
+        ])
+        self.assertTrue(lines[5].startswith("Cached metadata age: "))
+
+
+if __name__ == "__main__":
+    unittest.main()
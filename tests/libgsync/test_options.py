@@ -65,5 +65,29 @@ class TestGsyncOptions(unittest.TestCase):
         )
 
 
+
+class TestParseSize(unittest.TestCase):
+    def test_parse_size(self):
+        from libgsync.options import parse_size
+
+        self.assertEqual(parse_size("100"), 100)
+        self.assertEqual(parse_size("4k"), 4096)
+        self.assertEqual(parse_size("1.5M"), 1572864)
+        self.assertEqual(parse_size("2GB"), 2 * 1024 ** 3)
+        self.assertRaises(ValueError, parse_size, "lots")
+
+
+class TestParseTime(unittest.TestCase):
+    def test_parse_time(self):
+        import time
+        from libgsync.options import parse_time
+
+        self.assertEqual(parse_time("1970-01-02T00:00:00Z"), 86400)
+        self.assertEqual(
+            parse_time("2014-05-10 12:34:56"),
+            time.mktime((2014, 5, 10, 12, 34, 56, 0, 0, -1))
+        )
+        self.assertRaises(ValueError, parse_time, "whenever")
+
 if __name__ == "__main__":
     unittest.main()